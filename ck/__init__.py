@@ -2,9 +2,16 @@ from ck import query
 from ck import session
 
 
+ExternalTable = query.ExternalTable
+
 sql_render = query.sql_render
+sql_render_parameters = query.sql_render_parameters
 sql_template = query.sql_template
 
+Fleet = session.Fleet
+LocalCluster = session.LocalCluster
 LocalSession = session.LocalSession
+LocalSessionPool = session.LocalSessionPool
 PassiveSession = session.PassiveSession
+QueryCache = session.QueryCache
 RemoteSession = session.RemoteSession
@@ -6,3 +6,6 @@ binary_file = lookup.binary_file
 default_data_dir = lookup.default_data_dir
 
 create_config = setup.create_config
+detect_cpu_count = setup.detect_cpu_count
+detect_memory_size = setup.detect_memory_size
+detect_numa_nodes = setup.detect_numa_nodes
@@ -0,0 +1,283 @@
+import ast
+import http.client
+import os
+import pathlib
+import shutil
+import subprocess
+import tempfile
+import time
+import typing
+
+from ck import exception
+from ck.clickhouse import setup
+
+
+def status(
+        data_dir: str
+) -> typing.Optional[int]:
+    pid_path = pathlib.Path(data_dir).joinpath('pid')
+
+    # get pid
+
+    try:
+        pid_text, = pid_path.open().read().splitlines()
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        # notice: the pid file may be empty while the server starts
+        return None
+
+    pid = int(pid_text)
+
+    # find process
+
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return None
+
+    return pid
+
+
+def write_config(
+        tcp_port: int,
+        http_port: int,
+        user: str,
+        password: str,
+        data_dir: str,
+        memory_limit: int,
+        # notice: recursive type
+        config: typing.Dict[str, typing.Any],
+        storage: typing.Optional[typing.Dict[str, typing.List[str]]] = None
+) -> None:
+    pathlib.Path(data_dir).mkdir(parents=True, exist_ok=True)
+
+    setup.create_config(
+        tcp_port,
+        http_port,
+        user,
+        password,
+        data_dir,
+        memory_limit,
+        config,
+        storage
+    )
+
+
+def ping(
+        http_port: int
+) -> bool:
+    connection = http.client.HTTPConnection('localhost', http_port, timeout=1)
+
+    try:
+        connection.request('GET', '/ping')
+
+        return connection.getresponse().read() == b'Ok.\n'
+    except OSError:
+        return False
+    finally:
+        connection.close()
+
+
+def _backoff(
+        ping_interval: float
+) -> typing.Generator[float, None, None]:
+    # notice: start in the millisecond range, since the server is usually
+    #         ready quickly, and back off exponentially up to ping_interval
+    interval = 0.001
+
+    while True:
+        yield min(interval, ping_interval)
+
+        interval *= 2
+
+
+def wait_ready(
+        data_dir: str,
+        http_port: int,
+        ping_interval: float = 0.1,
+        ping_retry: int = 50
+) -> int:
+    deadline = time.monotonic() + ping_interval * ping_retry
+
+    # wait for pid
+
+    intervals = _backoff(ping_interval)
+    pid = status(data_dir)
+
+    while pid is None:
+        if time.monotonic() > deadline:
+            raise exception.ServiceError('pid')
+
+        time.sleep(next(intervals))
+        pid = status(data_dir)
+
+    # wait for http
+
+    intervals = _backoff(ping_interval)
+
+    while not ping(http_port):
+        if status(data_dir) is None:
+            raise exception.ServiceError(f'pid_{pid}')
+
+        time.sleep(next(intervals))
+
+    return pid
+
+
+def start(
+        binary_file: str,
+        config_kwargs: typing.Dict[str, typing.Any],
+        ping_interval: float = 0.1,
+        ping_retry: int = 50
+) -> typing.Optional[int]:
+    data_dir = config_kwargs['data_dir']
+
+    if status(data_dir) is not None:
+        return None
+
+    config_path = pathlib.Path(data_dir).joinpath('config.xml')
+    pid_path = pathlib.Path(data_dir).joinpath('pid')
+
+    # setup
+
+    write_config(**config_kwargs)
+
+    # run
+
+    if subprocess.run(
+            [
+                binary_file,
+                'server',
+                '--daemon',
+                f'--config-file={config_path}',
+                f'--pid-file={pid_path}',
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False
+    ).returncode:
+        raise exception.ServiceError('daemon')
+
+    # wait for server initialization
+
+    return wait_ready(
+        data_dir,
+        config_kwargs['http_port'],
+        ping_interval,
+        ping_retry
+    )
+
+
+def stop(
+        data_dir: str,
+        ping_interval: float = 0.1,
+        ping_retry: int = 50
+) -> typing.Optional[int]:
+    pid = status(data_dir)
+
+    if pid is None:
+        return None
+
+    # kill process
+
+    os.kill(pid, 15)
+
+    deadline = time.monotonic() + ping_interval * ping_retry
+    intervals = _backoff(ping_interval)
+
+    while status(data_dir) is not None:
+        if time.monotonic() > deadline:
+            os.kill(pid, 9)
+
+            deadline = float('inf')
+
+        time.sleep(next(intervals))
+
+    return pid
+
+
+def _link_or_copy(
+        source: str,
+        target: str
+) -> None:
+    # notice: data parts are immutable, so their files can be shared
+    if pathlib.Path(source).parent.joinpath('checksums.txt').exists():
+        try:
+            os.link(source, target)
+
+            return
+        except OSError:
+            pass
+
+    shutil.copy2(source, target)
+
+
+def clone_dir(
+        source_dir: str,
+        target_dir: str
+) -> None:
+    target_path = pathlib.Path(target_dir)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # notice: clone next to the target, so a failed clone leaves the
+    #         target untouched and the swap is a rename
+    work_path = pathlib.Path(tempfile.mkdtemp(
+        prefix=f'.{target_path.name}_',
+        dir=target_path.parent
+    ))
+    clone_path = work_path.joinpath('clone')
+    old_path = work_path.joinpath('old')
+
+    try:
+        # notice: reflinks are copy-on-write, so where the filesystem
+        #         supports them, the clone costs neither time nor space
+        if shutil.which('cp') is None or subprocess.run(
+                ['cp', '-a', '--reflink=always', source_dir, str(clone_path)],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=False
+        ).returncode:
+            shutil.rmtree(clone_path, ignore_errors=True)
+            shutil.copytree(
+                source_dir,
+                clone_path,
+                symlinks=True,
+                copy_function=_link_or_copy
+            )
+
+        if target_path.exists():
+            target_path.rename(old_path)
+
+        clone_path.rename(target_path)
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+
+
+_COMMANDS: typing.Dict[str, typing.Callable[..., typing.Any]] = {
+    'status': status,
+    'write_config': write_config,
+    'wait_ready': wait_ready,
+    'start': start,
+    'stop': stop,
+}
+
+
+def run_commands(
+        commands: typing.List[typing.Tuple[str, typing.Dict[str, typing.Any]]]
+) -> typing.Tuple[typing.List[typing.Any], typing.Optional[str]]:
+    results: typing.List[typing.Any] = []
+
+    for name, kwargs in commands:
+        try:
+            results.append(_COMMANDS[name](**kwargs))
+        except exception.ServiceError as error:
+            return results, str(error)
+
+    return results, None
+
+
+if __name__ == '__main__':
+    print(repr(run_commands(ast.literal_eval(input()))))
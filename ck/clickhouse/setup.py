@@ -1,10 +1,99 @@
 import ast
+import math
 import os
 import pathlib
 import typing
 import xml.etree.ElementTree
 
 
+def _read_text(path: str) -> typing.Optional[str]:
+    try:
+        return pathlib.Path(path).read_text().strip()
+    except OSError:
+        return None
+
+
+def detect_cpu_count() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        cpu_count = len(os.sched_getaffinity(0))
+    else:
+        cpu_count = os.cpu_count() or 1
+
+    # cgroup v2
+
+    cpu_max = _read_text('/sys/fs/cgroup/cpu.max')
+
+    if cpu_max is not None:
+        quota_text, period_text = cpu_max.split()
+
+        if quota_text != 'max':
+            cpu_count = min(
+                cpu_count,
+                math.ceil(int(quota_text) / int(period_text))
+            )
+
+    # cgroup v1
+
+    quota_us_text = _read_text('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    period_us_text = _read_text('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+
+    if quota_us_text is not None and period_us_text is not None:
+        if int(quota_us_text) > 0:
+            cpu_count = min(
+                cpu_count,
+                math.ceil(int(quota_us_text) / int(period_us_text))
+            )
+
+    return max(1, cpu_count)
+
+
+def detect_memory_size() -> int:
+    memory_size = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+
+    # notice: cgroup v1 reports a huge number if there is no limit
+    for limit_path in (
+            '/sys/fs/cgroup/memory.max',
+            '/sys/fs/cgroup/memory/memory.limit_in_bytes',
+    ):
+        limit_text = _read_text(limit_path)
+
+        if limit_text is not None and limit_text.isdigit():
+            memory_size = min(memory_size, int(limit_text))
+
+    return memory_size
+
+
+def detect_numa_nodes() -> int:
+    node_path = pathlib.Path('/sys/devices/system/node')
+
+    try:
+        numa_nodes = sum(
+            1
+            for path in node_path.iterdir()
+            if path.name.startswith('node') and path.name[4:].isdigit()
+        )
+    except OSError:
+        return 1
+
+    return max(1, numa_nodes)
+
+
+def _merge_config(
+        # notice: recursive type
+        base: typing.Dict[str, typing.Any],
+        override: typing.Dict[str, typing.Any]
+) -> typing.Dict[str, typing.Any]:
+    result = dict(base)
+
+    for key, value in override.items():
+        if isinstance(result.get(key), dict) and isinstance(value, dict):
+            result[key] = _merge_config(result[key], value)
+        else:
+            result[key] = value
+
+    return result
+
+
 def create_config(
         tcp_port: int,
         http_port: int,
@@ -13,7 +102,8 @@ def create_config(
         data_dir: str,
         memory_limit: int,
         # notice: recursive type
-        config: typing.Dict[str, typing.Any]
+        config: typing.Dict[str, typing.Any],
+        storage: typing.Optional[typing.Dict[str, typing.List[str]]] = None
 ) -> None:
     path = pathlib.Path(data_dir)
 
@@ -25,13 +115,60 @@ def create_config(
     errorlog_path = path.joinpath('stderr.log')
     config_path = path.joinpath('config.xml')
 
-    memory_size = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    cpu_count = detect_cpu_count()
+    memory_size = detect_memory_size()
+
     memory_limit = memory_limit or int(memory_size * 0.8)
     memory_bound_0 = memory_limit
     memory_bound_1 = int(0.95 * memory_limit)
     memory_bound_2 = int(0.9 * memory_limit)
     memory_bound_3 = int(0.45 * memory_size)
     memory_bound_4 = int(0.1 * memory_size)
+    memory_bound_5 = int(0.1 * memory_limit)
+    memory_bound_6 = int(0.05 * memory_limit)
+
+    # add storage policy
+
+    storage_data: typing.Dict[str, typing.Any] = {}
+
+    if storage:
+        disks: typing.Dict[str, typing.Any] = {}
+        volumes: typing.Dict[str, typing.Any] = {}
+
+        # notice: tiers are ordered from hot to cold, and parts move to
+        #         the next tier when free space drops below move_factor
+        for tier_name, tier_dirs in storage.items():
+            # notice: existing tables keep their parts on the default disk
+            disk_names: typing.List[str] = [] if volumes else ['default']
+
+            for index, tier_dir in enumerate(tier_dirs):
+                disk_name = f'{tier_name}_{index}'
+                disk_path = pathlib.Path(tier_dir)
+                disk_path.mkdir(parents=True, exist_ok=True)
+
+                disks[disk_name] = {
+                    'path': f'{disk_path.absolute()}/',
+                }
+                disk_names.append(disk_name)
+
+            volumes[tier_name] = {
+                'disk': disk_names,
+            }
+
+        storage_data = {
+            'storage_configuration': {
+                'disks': disks,
+                'policies': {
+                    'tiered': {
+                        'volumes': volumes,
+                        'move_factor': '0.1',
+                    },
+                },
+            },
+            'merge_tree': {
+                'storage_policy': 'tiered',
+            },
+        }
 
     # add server settings
 
@@ -42,7 +179,17 @@ def create_config(
         'user_files_path': str(user_files_path),
         'access_control_path': str(access_control_path),
         'max_server_memory_usage': str(memory_bound_0),
-        'mark_cache_size': '5368709120',
+        'max_concurrent_queries': str(max(100, 8 * cpu_count)),
+        'background_pool_size': str(max(2, cpu_count)),
+        'background_fetches_pool_size': str(max(2, cpu_count // 4)),
+        'mark_cache_size': str(memory_bound_5),
+        'uncompressed_cache_size': str(memory_bound_6),
+        'query_cache': {
+            'max_size_in_bytes': str(memory_bound_6),
+            'max_entries': '1024',
+            'max_entry_size_in_bytes': str(memory_bound_6 // 64),
+            'max_entry_size_in_rows': '30000000',
+        },
         'logger': {
             'log': str(log_path),
             'errorlog': str(errorlog_path),
@@ -54,7 +201,8 @@ def create_config(
         'profiles': {},
         'users': {},
         'quotas': {},
-        **config.copy(),
+        # notice: storage sections are merged with the user config
+        **_merge_config(storage_data, config),
         'tcp_port': str(tcp_port),
         'http_port': str(http_port),
         'path': str(path),
@@ -75,6 +223,7 @@ def create_config(
             raise TypeError()
 
         data['profiles'][profile_name] = {
+            'max_threads': str(cpu_count),
             'max_memory_usage_for_user': str(memory_bound_1),
             'max_memory_usage': str(memory_bound_2),
             'max_bytes_before_external_group_by': str(memory_bound_3),
@@ -142,8 +291,10 @@ def create_config(
                 if not isinstance(key, str):
                     raise TypeError()
 
-                subnode = xml.etree.ElementTree.SubElement(node, key)
-                build_xml(value, subnode)
+                # notice: a list repeats the element
+                for item in value if isinstance(value, list) else [value]:
+                    subnode = xml.etree.ElementTree.SubElement(node, key)
+                    build_xml(item, subnode)
         elif isinstance(data, str):
             node.text = data
         else:
@@ -151,9 +302,7 @@ def create_config(
 
     root = xml.etree.ElementTree.Element('yandex')
 
-    for key, value in data.items():
-        subnode = xml.etree.ElementTree.SubElement(root, key)
-        build_xml(value, subnode)
+    build_xml(data, root)
 
     # write xml
 
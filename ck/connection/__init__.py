@@ -3,9 +3,12 @@ from ck.connection import process
 from ck.connection import ssh
 
 
+HTTPPool = http.HTTPPool
 run_http = http.run_http
 
+run_fifo = process.run_fifo
 run_process = process.run_process
 
 connect_ssh = ssh.connect_ssh
+open_tunnel = ssh.open_tunnel
 run_ssh = ssh.run_ssh
@@ -1,8 +1,83 @@
 import http.client
 import threading
+import time
 import typing
 
 
+class _SocketConnection(http.client.HTTPConnection):
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            create_socket: typing.Callable[[], typing.Any]
+    ) -> None:
+        super().__init__(host, port)
+
+        self._create_socket = create_socket
+
+    def connect(self) -> None:
+        self.sock = self._create_socket()
+
+
+class HTTPPool:
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            create_socket: typing.Optional[
+                typing.Callable[[], typing.Any]
+            ] = None,
+            max_idle: int = 8,
+            max_idle_time: float = 1.0
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._create_socket = create_socket
+        self._max_idle = max_idle
+        self._max_idle_time = max_idle_time
+
+        self._lock = threading.Lock()
+        self._idle: typing.List[
+            typing.Tuple[float, http.client.HTTPConnection]
+        ] = []
+
+    def acquire(self) -> http.client.HTTPConnection:
+        with self._lock:
+            while self._idle:
+                release_time, connection = self._idle.pop()
+
+                # notice: the server closes idle keep-alive connections
+                #         after a few seconds, so old ones are dropped
+                if time.monotonic() - release_time < self._max_idle_time:
+                    return connection
+
+                connection.close()
+
+        if self._create_socket is None:
+            return http.client.HTTPConnection(self._host, self._port)
+
+        return _SocketConnection(self._host, self._port, self._create_socket)
+
+    def release(
+            self,
+            connection: http.client.HTTPConnection
+    ) -> None:
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append((time.monotonic(), connection))
+
+                return
+
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            for _, connection in self._idle:
+                connection.close()
+
+            self._idle.clear()
+
+
 def run_http(
         host: str,
         port: int,
@@ -12,7 +87,8 @@ def run_http(
         gen_stdout: typing.Generator[None, bytes, None],
         gen_stderr: typing.Generator[None, bytes, None],
         buffer_size: int = 1 << 20,
-        join_interval: float = 0.1
+        join_interval: float = 0.1,
+        pool: typing.Optional[HTTPPool] = None
 ) -> typing.Callable[[], int]:
     connection = None
     response = None
@@ -25,8 +101,14 @@ def run_http(
         nonlocal response
         nonlocal error
 
+        reusable = False
+
         try:
-            connection = http.client.HTTPConnection(host, port)
+            if pool is None:
+                connection = http.client.HTTPConnection(host, port)
+            else:
+                connection = pool.acquire()
+
             connection.request('POST', path, gen_stdin, headers)
 
             response = connection.getresponse()
@@ -47,13 +129,18 @@ def run_http(
 
             gen_stdout.send(b'')
             gen_stderr.send(b'')
+
+            reusable = not response.will_close
         except BaseException as raw_error:  # pylint: disable=broad-except
             error = raw_error
             gen_stdout.close()
             gen_stderr.close()
         finally:
             if connection:
-                connection.close()
+                if pool is not None and reusable:
+                    pool.release(connection)
+                else:
+                    connection.close()
 
     thread = threading.Thread(target=post_request)
 
@@ -1,3 +1,4 @@
+import os
 import subprocess
 import threading
 import typing
@@ -105,3 +106,53 @@ def run_process(
         return process.wait()
 
     return join
+
+
+def run_fifo(
+        path: str,
+        gen_stdin: typing.Generator[bytes, None, None],
+        join_interval: float = 0.1
+) -> typing.Callable[[], None]:
+    error = None
+
+    # connect
+
+    os.mkfifo(path)
+
+    # create thread
+
+    def send_stdin() -> None:
+        nonlocal error
+
+        try:
+            with open(path, 'wb') as stream:
+                for data in gen_stdin:
+                    stream.write(data)
+        except BrokenPipeError:
+            # notice: the reader may stop early, e.g. on query errors
+            pass
+        except BaseException as raw_error:  # pylint: disable=broad-except
+            error = raw_error
+
+    stdin_thread = threading.Thread(target=send_stdin, daemon=True)
+
+    stdin_thread.start()
+
+    # join thread
+
+    def join() -> None:
+        while error is None and stdin_thread.is_alive():
+            # notice: unblock the writer if the fifo is never opened
+            try:
+                os.close(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+            except OSError:
+                pass
+
+            stdin_thread.join(join_interval)
+
+        os.unlink(path)
+
+        if error is not None:
+            raise error  # pylint: disable=raising-bad-type
+
+    return join
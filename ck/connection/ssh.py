@@ -3,7 +3,8 @@ import threading
 import typing
 
 # third-party
-import paramiko
+if typing.TYPE_CHECKING:
+    import paramiko
 
 
 def connect_ssh(
@@ -11,24 +12,65 @@ def connect_ssh(
         port: int,
         username: typing.Optional[str] = None,
         password: typing.Optional[str] = None,
-        public_key: typing.Optional[str] = None
-) -> paramiko.SSHClient:
+        public_key: typing.Optional[str] = None,
+        keepalive_interval: int = 30,
+        window_size: int = 1 << 26,
+        max_packet_size: int = 1 << 18,
+        compress: bool = False,
+        timeout: typing.Optional[float] = None
+) -> 'paramiko.SSHClient':
+    # notice: paramiko is slow to import, so it is imported on demand
+    import paramiko  # pylint: disable=import-outside-toplevel
+
     client = paramiko.SSHClient()
 
     client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    client.connect(host, port, username, password, public_key)
+    client.connect(
+        host,
+        port,
+        username,
+        password,
+        public_key,
+        timeout=timeout,
+        compress=compress,
+        banner_timeout=timeout,
+        auth_timeout=timeout
+    )
+
+    transport = client.get_transport()
+
+    assert transport is not None
+
+    # notice: large windows keep high-latency links busy
+    transport.default_window_size = window_size
+    transport.default_max_packet_size = max_packet_size
+    transport.set_keepalive(keepalive_interval)
 
     return client
 
 
+def open_tunnel(
+        client: 'paramiko.SSHClient',
+        host: str,
+        port: int
+) -> 'paramiko.Channel':
+    transport = client.get_transport()
+
+    assert transport is not None
+
+    return transport.open_channel('direct-tcpip', (host, port), ('', 0))
+
+
 def run_ssh(
-        client: paramiko.SSHClient,
+        client: 'paramiko.SSHClient',
         args: typing.List[str],
         gen_stdin: typing.Generator[bytes, None, None],
         gen_stdout: typing.Generator[None, bytes, None],
         gen_stderr: typing.Generator[None, bytes, None],
         buffer_size: int = 1 << 20,
-        join_interval: float = 0.1
+        join_interval: float = 0.1,
+        window_size: typing.Optional[int] = None,
+        max_packet_size: typing.Optional[int] = None
 ) -> typing.Callable[[], int]:
     error = None
 
@@ -38,7 +80,7 @@ def run_ssh(
 
     assert transport is not None
 
-    channel = transport.open_session()
+    channel = transport.open_session(window_size, max_packet_size)
     channel.exec_command(' '.join(
         shlex.quote(arg)
         for arg in args
@@ -1,4 +1,5 @@
 from ck.iteration import adhoc
+from ck.iteration import binary
 from ck.iteration import io
 
 
@@ -8,6 +9,15 @@ empty_in = adhoc.empty_in
 empty_out = adhoc.empty_out
 given_in = adhoc.given_in
 ignore_out = adhoc.ignore_out
+multipart_in = adhoc.multipart_in
+tee_out = adhoc.tee_out
+timed_out = adhoc.timed_out
+zstd_in = adhoc.zstd_in
+zstd_out = adhoc.zstd_out
+
+iterate_columns = binary.iterate_columns
+native_in = binary.native_in
+rowbinary_in = binary.rowbinary_in
 
 echo_io = io.echo_io
 file_in = io.file_in
@@ -1,3 +1,4 @@
+import time
 import typing
 
 
@@ -19,6 +20,45 @@ def concat_in(
     yield from gen_2
 
 
+def multipart_in(
+        boundary: str,
+        parts: typing.List[
+            typing.Tuple[str, typing.Generator[bytes, None, None]]
+        ]
+) -> typing.Generator[bytes, None, None]:
+    for name, gen_part in parts:
+        yield (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; '
+            f'name="{name}"; filename="{name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n'
+            f'\r\n'
+        ).encode()
+        yield from gen_part
+        yield b'\r\n'
+
+    yield f'--{boundary}--\r\n'.encode()
+
+
+def zstd_in(
+        gen_in: typing.Generator[bytes, None, None],
+        level: int = 3
+) -> typing.Generator[bytes, None, None]:
+    # notice: zstandard is an optional dependency
+    # pylint: disable=import-error,import-outside-toplevel
+    import zstandard  # type: ignore[import]
+
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    for data in gen_in:
+        compressed_data = compressor.compress(data)
+
+        if compressed_data:
+            yield compressed_data
+
+    yield compressor.flush()
+
+
 def empty_out() -> typing.Generator[None, bytes, None]:
     data = yield
 
@@ -48,3 +88,79 @@ def collect_out(
         data = yield
 
     yield
+
+
+def tee_out(
+        gen_out: typing.Generator[None, bytes, None],
+        data_list: typing.List[bytes]
+) -> typing.Generator[None, bytes, None]:
+    try:
+        next(gen_out)
+        data = yield
+
+        while data:
+            data_list.append(data)
+            gen_out.send(data)
+
+            data = yield
+
+        gen_out.send(b'')
+    except GeneratorExit:
+        gen_out.close()
+
+        raise
+
+    yield
+
+
+def timed_out(
+        gen_out: typing.Generator[None, bytes, None],
+        time_list: typing.List[float]
+) -> typing.Generator[None, bytes, None]:
+    try:
+        next(gen_out)
+        data = yield
+
+        while data:
+            gen_out.send(data)
+
+            data = yield
+
+        gen_out.send(b'')
+        time_list.append(time.perf_counter())
+    except GeneratorExit:
+        gen_out.close()
+
+        raise
+
+    yield
+
+
+def zstd_out(
+        gen_out: typing.Generator[None, bytes, None]
+) -> typing.Generator[None, bytes, None]:
+    # notice: zstandard is an optional dependency
+    # pylint: disable=import-error,import-outside-toplevel
+    import zstandard  # type: ignore[import]
+
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    try:
+        next(gen_out)
+        data = yield
+
+        while data:
+            decompressed_data = decompressor.decompress(data)
+
+            if decompressed_data:
+                gen_out.send(decompressed_data)
+
+            data = yield
+
+        gen_out.send(b'')
+    except GeneratorExit:
+        gen_out.close()
+
+        raise
+
+    yield
@@ -0,0 +1,427 @@
+import datetime
+import itertools
+import struct
+import typing
+
+# third-party
+if typing.TYPE_CHECKING:
+    import numpy
+
+
+_FIXED_CODES = {
+    'Bool': '<u1',
+    'Int8': '<i1',
+    'Int16': '<i2',
+    'Int32': '<i4',
+    'Int64': '<i8',
+    'UInt8': '<u1',
+    'UInt16': '<u2',
+    'UInt32': '<u4',
+    'UInt64': '<u8',
+    'Float32': '<f4',
+    'Float64': '<f8',
+    'Date': '<u2',
+    'Date32': '<i4',
+    'DateTime': '<u4',
+}
+
+_STRUCT_CODES = {
+    'Bool': '?',
+    'Int8': 'b',
+    'Int16': 'h',
+    'Int32': 'i',
+    'Int64': 'q',
+    'UInt8': 'B',
+    'UInt16': 'H',
+    'UInt32': 'I',
+    'UInt64': 'Q',
+    'Float32': 'f',
+    'Float64': 'd',
+}
+
+_EPOCH_DATE = datetime.date(1970, 1, 1)
+
+# notice: varints of small lengths are precomputed
+_VARINTS = [bytes((size,)) for size in range(0x80)]
+
+
+def _encode_varint(size: int) -> bytes:
+    if size < 0x80:
+        return _VARINTS[size]
+
+    if size < 1 << 14:
+        return bytes((size & 0x7f | 0x80, size >> 7))
+
+    result = bytearray()
+
+    while size >= 0x80:
+        result.append(size & 0x7f | 0x80)
+        size >>= 7
+
+    result.append(size)
+
+    return bytes(result)
+
+
+def _encode_string(value: typing.Any) -> bytes:
+    if isinstance(value, str):
+        value = value.encode()
+
+    return _encode_varint(len(value)) + value
+
+
+def _base_type(type_text: str) -> str:
+    # notice: drop parameters such as timezones
+    return type_text.split('(', 1)[0]
+
+
+def _inner_type(type_text: str) -> str:
+    return type_text.split('(', 1)[1][:-1]
+
+
+def _convert_date(value: typing.Any) -> int:
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+
+    if isinstance(value, datetime.date):
+        return (value - _EPOCH_DATE).days
+
+    return int(value)
+
+
+def _convert_datetime(value: typing.Any) -> int:
+    if isinstance(value, datetime.datetime):
+        return int(value.timestamp())
+
+    if isinstance(value, datetime.date):
+        return (value - _EPOCH_DATE).days * 86400
+
+    return int(value)
+
+
+def _fixed_array(
+        type_text: str,
+        values: typing.Sequence[typing.Any]
+) -> 'numpy.ndarray':
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    base_type = _base_type(type_text)
+    array = numpy.asarray(values)
+
+    if array.dtype.kind == 'M':
+        if base_type in ('Date', 'Date32'):
+            array = array.astype('datetime64[D]').astype('<i8')
+        else:
+            array = array.astype('datetime64[s]').astype('<i8')
+    elif array.dtype.kind == 'O':
+        if base_type in ('Date', 'Date32'):
+            array = numpy.fromiter(
+                (_convert_date(value) for value in values),
+                '<i8',
+                len(values)
+            )
+        elif base_type == 'DateTime':
+            array = numpy.fromiter(
+                (_convert_datetime(value) for value in values),
+                '<i8',
+                len(values)
+            )
+
+    return array.astype(_FIXED_CODES[base_type], copy=False)
+
+
+def _value_encoder(
+        type_text: str
+) -> typing.Callable[[typing.Any], bytes]:
+    base_type = _base_type(type_text)
+
+    if base_type == 'Nullable':
+        encode_inner = _value_encoder(_inner_type(type_text))
+
+        def encode_nullable(value: typing.Any) -> bytes:
+            if value is None:
+                return b'\x01'
+
+            return b'\x00' + encode_inner(value)
+
+        return encode_nullable
+
+    if base_type == 'Array':
+        encode_member = _value_encoder(_inner_type(type_text))
+
+        def encode_array(value: typing.Any) -> bytes:
+            return _encode_varint(len(value)) + b''.join(
+                encode_member(member)
+                for member in value
+            )
+
+        return encode_array
+
+    if base_type == 'String':
+        return _encode_string
+
+    if base_type == 'FixedString':
+        size = int(_inner_type(type_text))
+
+        def encode_fixed_string(value: typing.Any) -> bytes:
+            if isinstance(value, str):
+                value = value.encode()
+
+            if len(value) > size:
+                raise ValueError()
+
+            return value.ljust(size, b'\x00')
+
+        return encode_fixed_string
+
+    if base_type in ('Date', 'Date32'):
+        pack_date = struct.Struct(_FIXED_CODES[base_type]).pack
+
+        return lambda value: pack_date(_convert_date(value))
+
+    if base_type == 'DateTime':
+        pack_datetime = struct.Struct(_FIXED_CODES[base_type]).pack
+
+        return lambda value: pack_datetime(_convert_datetime(value))
+
+    if base_type in _STRUCT_CODES:
+        return struct.Struct(f'<{_STRUCT_CODES[base_type]}').pack
+
+    raise TypeError(type_text)
+
+
+def _column_encoder(
+        type_text: str
+) -> typing.Callable[[typing.Sequence[typing.Any]], bytes]:
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    base_type = _base_type(type_text)
+
+    if base_type == 'Nullable':
+        inner_type = _inner_type(type_text)
+        encode_inner = _column_encoder(inner_type)
+
+        if _base_type(inner_type) in ('String', 'FixedString'):
+            default: typing.Any = b''
+        else:
+            default = 0
+
+        def encode_nullable(values: typing.Sequence[typing.Any]) -> bytes:
+            null_map = bytes(value is None for value in values)
+
+            if not any(null_map):
+                return null_map + encode_inner(values)
+
+            return null_map + encode_inner([
+                default if value is None else value
+                for value in values
+            ])
+
+        return encode_nullable
+
+    if base_type == 'Array':
+        encode_members = _column_encoder(_inner_type(type_text))
+
+        def encode_array(values: typing.Sequence[typing.Any]) -> bytes:
+            offsets = numpy.cumsum(
+                numpy.fromiter(
+                    (len(value) for value in values),
+                    '<u8',
+                    len(values)
+                ),
+                dtype='<u8'
+            )
+
+            return offsets.tobytes() + encode_members([
+                member
+                for value in values
+                for member in value
+            ])
+
+        return encode_array
+
+    if base_type == 'String':
+        return lambda values: b''.join([
+            _encode_string(value)
+            for value in values
+        ])
+
+    if base_type == 'FixedString':
+        size = int(_inner_type(type_text))
+
+        def encode_fixed_string(values: typing.Sequence[typing.Any]) -> bytes:
+            array = numpy.asarray([
+                value.encode() if isinstance(value, str) else value
+                for value in values
+            ], dtype=numpy.bytes_)
+
+            if array.dtype.itemsize > size:
+                raise ValueError()
+
+            return array.astype(f'S{size}').tobytes()
+
+        return encode_fixed_string
+
+    if base_type in _FIXED_CODES:
+        return lambda values: _fixed_array(type_text, values).tobytes()
+
+    raise TypeError(type_text)
+
+
+def _frame_column(series: typing.Any) -> typing.Any:
+    # notice: extension dtypes (with na_value) and objects may hold nan or
+    #         pandas.NA, which become None here
+    if (
+            series.dtype.kind in ('i', 'u', 'f', 'b', 'M')
+            and not hasattr(series.dtype, 'na_value')
+    ):
+        return series.to_numpy()
+
+    return series.to_numpy(dtype=object, na_value=None)
+
+
+def iterate_columns(
+        data: typing.Any,
+        names: typing.Optional[typing.List[str]],
+        block_size: int
+) -> typing.Generator[typing.List[typing.Sequence[typing.Any]], None, None]:
+    if names is not None and not names:
+        raise ValueError('structure has no columns')
+
+    # notice: numpy arrays are detected without importing numpy
+    if isinstance(data, dict):
+        columns = [
+            data[name]
+            for name in (data if names is None else names)
+        ]
+    elif getattr(getattr(data, 'dtype', None), 'names', None):
+        columns = [
+            data[name]
+            for name in (data.dtype.names if names is None else names)
+        ]
+    elif getattr(data, 'ndim', None) == 2 and hasattr(data, 'columns'):
+        # notice: pandas dataframes are read by their columns
+        columns = [
+            _frame_column(data[name])
+            for name in (data.columns if names is None else names)
+        ]
+    elif getattr(data, 'ndim', None) == 2:
+        columns = [data[:, index] for index in range(data.shape[1])]
+    else:
+        # notice: lazy iterables of rows are consumed block by block
+        iterator = iter(data)
+        rows = list(itertools.islice(iterator, block_size))
+        width = None if names is None else len(names)
+
+        while rows:
+            # notice: zip() would silently drop values of ragged rows
+            for row in rows:
+                if width is None:
+                    width = len(row)
+                elif len(row) != width:
+                    raise ValueError(
+                        f'row has {len(row)} values, expected {width}'
+                    )
+
+            yield [list(column) for column in zip(*rows)]
+
+            rows = list(itertools.islice(iterator, block_size))
+
+        return
+
+    if names is not None and len(columns) != len(names):
+        raise ValueError(
+            f'data has {len(columns)} columns, structure has {len(names)}'
+        )
+
+    sizes = {len(column) for column in columns}
+
+    if len(sizes) > 1:
+        raise ValueError(f'columns have different lengths: {sorted(sizes)}')
+
+    size = sizes.pop() if sizes else 0
+
+    for offset in range(0, size, block_size):
+        yield [
+            column[offset:offset + block_size]
+            for column in columns
+        ]
+
+
+def rowbinary_in(
+        data: typing.Any,
+        structure: typing.Dict[str, str],
+        block_size: int = 1 << 16,
+        buffer_size: int = 1 << 20
+) -> typing.Generator[bytes, None, None]:
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    names = list(structure)
+    types = list(structure.values())
+
+    if all(_base_type(type_text) in _FIXED_CODES for type_text in types):
+        # fast path: pack whole blocks as packed records
+
+        dtype = numpy.dtype([
+            (f'f{index}', _FIXED_CODES[_base_type(type_text)])
+            for index, type_text in enumerate(types)
+        ])
+
+        for columns in iterate_columns(data, names, block_size):
+            records = numpy.empty(len(columns[0]), dtype)
+
+            for index, (type_text, column) in enumerate(zip(types, columns)):
+                records[f'f{index}'] = _fixed_array(type_text, column)
+
+            yield records.tobytes()
+
+        return
+
+    encoders = [_value_encoder(type_text) for type_text in types]
+
+    buffer: typing.List[bytes] = []
+    buffered_size = 0
+
+    for columns in iterate_columns(data, names, block_size):
+        for row in zip(*columns):
+            row_data = b''.join([
+                encoder(value)
+                for encoder, value in zip(encoders, row)
+            ])
+
+            buffer.append(row_data)
+            buffered_size += len(row_data)
+
+            if buffered_size >= buffer_size:
+                yield b''.join(buffer)
+
+                buffer = []
+                buffered_size = 0
+
+    if buffer:
+        yield b''.join(buffer)
+
+
+def native_in(
+        data: typing.Any,
+        structure: typing.Dict[str, str],
+        block_size: int = 1 << 16
+) -> typing.Generator[bytes, None, None]:
+    names = list(structure)
+    types = list(structure.values())
+
+    encoders = [_column_encoder(type_text) for type_text in types]
+    headers = [
+        _encode_string(name) + _encode_string(type_text)
+        for name, type_text in structure.items()
+    ]
+
+    for columns in iterate_columns(data, names, block_size):
+        yield b''.join([
+            _encode_varint(len(columns)),
+            _encode_varint(len(columns[0])),
+            *(
+                header + encoder(column)
+                for header, encoder, column in zip(headers, encoders, columns)
+            ),
+        ])
@@ -7,14 +7,26 @@ BaseExpression = ast.BaseExpression
 BaseStatement = ast.BaseStatement
 Call = ast.Call
 escape_buffer = ast.escape_buffer
+escape_parameter = ast.escape_parameter
+escape_rows = ast.escape_rows
 escape_text = ast.escape_text
 escape_value = ast.escape_value
+ExternalTable = ast.ExternalTable
+extract_common = ast.extract_common
+fingerprint = ast.fingerprint
 Identifier = ast.Identifier
+infer_type = ast.infer_type
 Initial = ast.Initial
 ListClause = ast.ListClause
+normalize_pattern = ast.normalize_pattern
+normalize_space = ast.normalize_space
+pattern_fingerprint = ast.pattern_fingerprint
+Parameter = ast.Parameter
 Raw = ast.Raw
+Rows = ast.Rows
 SimpleClause = ast.SimpleClause
 Value = ast.Value
 
 sql_render = sql.sql_render
+sql_render_parameters = sql.sql_render_parameters
 sql_template = sql.sql_template
@@ -1,40 +1,53 @@
 import abc
+import datetime
+import hashlib
 import inspect
+import math
+import re
 import types
 import typing
 
+from ck.iteration import binary
 
-def escape_text(
+
+_ESCAPES = (
+    ('\x00', '\\0'),
+    ('\a', '\\a'),
+    ('\b', '\\b'),
+    ('\f', '\\f'),
+    ('\n', '\\n'),
+    ('\r', '\\r'),
+    ('\t', '\\t'),
+    ('\v', '\\v'),
+)
+_ESCAPED_CHARS = frozenset(char for char, _ in _ESCAPES)
+
+
+def _escape(
         text: str,
         quote: str
 ) -> str:
-    result = ''
-
-    for char in text:
-        if char == '\x00':
-            result += '\\0'
-        elif char == '\\':
-            result += '\\\\'
-        elif char == '\a':
-            result += '\\a'
-        elif char == '\b':
-            result += '\\b'
-        elif char == '\f':
-            result += '\\f'
-        elif char == '\n':
-            result += '\\n'
-        elif char == '\r':
-            result += '\\r'
-        elif char == '\t':
-            result += '\\t'
-        elif char == '\v':
-            result += '\\v'
-        elif char == quote:
-            result += f'\\{quote}'
-        else:
-            result += char
+    # notice: one str.replace pass per escaped char is much faster than
+    #         str.translate or re.sub in cpython, and keeps it linear
+    #         backslash goes first, so that it is not escaped twice
+    if '\\' in text:
+        text = text.replace('\\', '\\\\')
+
+    if quote in text and quote not in _ESCAPED_CHARS and quote != '\\':
+        text = text.replace(quote, f'\\{quote}')
+
+    for char, escaped_char in _ESCAPES:
+        if char in text:
+            text = text.replace(char, escaped_char)
+
+    return text
 
-    return f'{quote}{result}{quote}'
+
+def escape_text(
+        text: str,
+        quote: str
+) -> str:
+    return f'{quote}{_escape(text, quote)}{quote}'
 
 
 def escape_buffer(
@@ -45,33 +58,14 @@ def escape_buffer(
         ],
         quote: str
 ) -> str:
-    result = ''
-
-    for char in buffer:
-        if char == 0:
-            result += '\\0'
-        elif char == ord('\\'):
-            result += '\\\\'
-        elif char == ord('\a'):
-            result += '\\a'
-        elif char == ord('\b'):
-            result += '\\b'
-        elif char == ord('\f'):
-            result += '\\f'
-        elif char == ord('\n'):
-            result += '\\n'
-        elif char == ord('\r'):
-            result += '\\r'
-        elif char == ord('\t'):
-            result += '\\t'
-        elif char == ord('\v'):
-            result += '\\v'
-        elif char == ord(quote):
-            result += f'\\{quote}'
-        elif char >= 128:
-            result += f'\\x{char:02x}'
-        else:
-            result += chr(char)
+    # notice: latin-1 maps every byte to the code point of the same value
+    #         and backslashreplace turns the non-ascii ones into \xNN
+    text = _escape(bytes(buffer).decode('latin-1'), quote)
+
+    if text.isascii():
+        return f'{quote}{text}{quote}'
+
+    result = text.encode('ascii', 'backslashreplace').decode('ascii')
 
     return f'{quote}{result}{quote}'
 
@@ -152,6 +146,17 @@ def escape_value(
 
         return f'array({members_text})'
 
+    if isinstance(value, datetime.datetime):
+        text = value.strftime('%Y-%m-%d %H:%M:%S')
+
+        if value.microsecond:
+            text = f'{text}.{value.microsecond:06d}'
+
+        return f"'{text}'"
+
+    if isinstance(value, datetime.date):
+        return f"'{value.isoformat()}'"
+
     if isinstance(value, BaseAST):
         return value.render_expression()
 
@@ -172,61 +177,374 @@ def escape_value(
 
         return f'lambda(tuple({args_text}), {body_text})'
 
+    # notice: numpy scalars and arrays, without importing numpy
+    if type(value).__module__ == 'numpy' and hasattr(value, 'tolist'):
+        return escape_value(value.tolist())
+
+    raise TypeError()
+
+
+def _escape_column(
+        column: typing.Any
+) -> typing.List[str]:
+    dtype = getattr(column, 'dtype', None)
+    kind = getattr(dtype, 'kind', None)
+
+    # fast path: format numpy (or pandas) columns as a whole
+    # notice: tolist() and map(str) run in c, and beat numpy's astype(str)
+
+    if kind in ('i', 'u', 'f'):
+        return list(map(str, column.tolist()))
+
+    if kind == 'b':
+        return [
+            'true' if value else 'false'
+            for value in column.tolist()
+        ]
+
+    if kind == 'M':
+        import numpy  # pylint: disable=import-outside-toplevel
+
+        array = numpy.asarray(column)
+        seconds = array.astype('datetime64[s]')
+
+        # notice: keep sub-second digits only when there are any, so that
+        #         plain DateTime columns still parse
+        if not (seconds == array)[~numpy.isnat(array)].all():
+            seconds = array
+
+        return [
+            'null' if value == 'NaT' else f"'{value.replace('T', ' ')}'"
+            for value in numpy.datetime_as_string(seconds).tolist()
+        ]
+
+    if kind is not None:
+        column = column.tolist()
+
+    return [
+        escape_value(value)
+        for value in column
+    ]
+
+
+def escape_rows(
+        data: typing.Any,
+        block_size: int = 1 << 14
+) -> typing.Generator[str, None, None]:
+    separator = ''
+
+    for columns in binary.iterate_columns(data, None, block_size):
+        rows_text = '), ('.join(map(', '.join, zip(*(
+            _escape_column(column)
+            for column in columns
+        ))))
+
+        yield f'{separator}({rows_text})'
+
+        separator = ', '
+
+
+def infer_type(
+        value: typing.Any
+) -> typing.Optional[str]:
+    if isinstance(value, bool):
+        return 'Bool'
+
+    if isinstance(value, int):
+        if -1 << 63 <= value < 1 << 63:
+            return 'Int64'
+
+        if 0 <= value < 1 << 64:
+            return 'UInt64'
+
+        return None
+
+    if isinstance(value, float):
+        return 'Float64'
+
+    if isinstance(value, str):
+        return 'String'
+
+    if isinstance(value, datetime.datetime):
+        # notice: aware values are passed in utc, see escape_parameter
+        if value.tzinfo is None:
+            return 'DateTime64(6)' if value.microsecond else 'DateTime'
+
+        if value.microsecond:
+            return 'DateTime64(6, \'UTC\')'
+
+        return 'DateTime(\'UTC\')'
+
+    if isinstance(value, datetime.date):
+        return 'Date'
+
+    if isinstance(value, list) and value:
+        member_types = {
+            infer_type(member)
+            for member in value
+        }
+
+        if len(member_types) != 1 or None in member_types:
+            return None
+
+        member_type, = member_types
+
+        return f'Array({member_type})'
+
+    if isinstance(value, tuple) and value:
+        member_type_list = [
+            infer_type(member)
+            for member in value
+        ]
+
+        if None in member_type_list:
+            return None
+
+        members_text = ', '.join(
+            typing.cast(typing.List[str], member_type_list)
+        )
+
+        return f'Tuple({members_text})'
+
+    return None
+
+
+def escape_parameter(
+        value: typing.Any,
+        nested: bool = False
+) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+
+    if isinstance(value, (int, float)):
+        return str(value)
+
+    if isinstance(value, str):
+        if nested:
+            return escape_text(value, '\'')
+
+        # notice: top-level strings use the escaped (tsv) format
+        #         tab is always escaped, so it works as a neutral quote
+        return escape_text(value, '\t')[1:-1]
+
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+
+        text = value.strftime('%Y-%m-%d %H:%M:%S')
+
+        if value.microsecond:
+            text = f'{text}.{value.microsecond:06d}'
+
+        return f"'{text}'" if nested else text
+
+    if isinstance(value, datetime.date):
+        text = value.isoformat()
+
+        return f"'{text}'" if nested else text
+
+    if isinstance(value, list):
+        members_text = ', '.join(
+            escape_parameter(member, True)
+            for member in value
+        )
+
+        return f'[{members_text}]'
+
+    if isinstance(value, tuple):
+        members_text = ', '.join(
+            escape_parameter(member, True)
+            for member in value
+        )
+
+        return f'({members_text})'
+
     raise TypeError()
 
 
 class BaseAST(abc.ABC):
+    # notice: nodes are immutable, so their text is rendered at most once
+    #         and two nodes are equal if they have the same type and text
+
+    __slots__ = ('_expression_text', '_statement_text')
+
+    _expression_text: str
+    _statement_text: str
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        if hasattr(self, name):
+            raise AttributeError(name)
+
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(name)
+
+    def __eq__(self, other: typing.Any) -> bool:
+        if type(self) is not type(other):
+            return False
+
+        return self.render_expression() == other.render_expression()
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.render_expression()))
+
     @abc.abstractmethod
-    def render_expression(self) -> str:
+    def _render_expression(self) -> str:
         pass
 
     @abc.abstractmethod
-    def render_statement(self) -> str:
+    def _render_statement(self) -> str:
         pass
 
+    def render_expression(self) -> str:
+        try:
+            return self._expression_text
+        except AttributeError:
+            text = self._render_expression()
+            object.__setattr__(self, '_expression_text', text)
+
+            return text
+
+    def render_statement(self) -> str:
+        try:
+            return self._statement_text
+        except AttributeError:
+            text = self._render_statement()
+            object.__setattr__(self, '_statement_text', text)
+
+            return text
+
 
 class Raw(BaseAST):
+    __slots__ = ('_query',)
+
     def __init__(
             self,
             query: str
     ):
         self._query = query
 
-    def render_expression(self) -> str:
+    def _render_expression(self) -> str:
         return self._query
 
-    def render_statement(self) -> str:
+    def _render_statement(self) -> str:
         return self._query
 
 
 class BaseExpression(BaseAST):
-    def render_statement(self) -> str:
+    __slots__ = ()
+
+    def _render_statement(self) -> str:
         return f'select {self.render_expression()}'
 
 
 class Value(BaseExpression):
+    __slots__ = ('_value',)
+
     def __init__(
             self,
             value: typing.Any
     ) -> None:
         self._value = value
 
-    def render_expression(self) -> str:
+    def _render_expression(self) -> str:
         return escape_value(self._value)
 
 
+class Rows(BaseExpression):
+    __slots__ = ('_data',)
+
+    def __init__(
+            self,
+            data: typing.Any
+    ) -> None:
+        self._data = data
+
+    def iterate_expression(self) -> typing.Generator[str, None, None]:
+        # notice: stream the text block by block, unless it is rendered
+        try:
+            yield self._expression_text
+        except AttributeError:
+            yield from escape_rows(self._data)
+
+    def _render_expression(self) -> str:
+        return ''.join(escape_rows(self._data))
+
+
 class Identifier(BaseExpression):
+    __slots__ = ('_name',)
+
     def __init__(
             self,
             name: str
     ) -> None:
         self._name = name
 
-    def render_expression(self) -> str:
+    def _render_expression(self) -> str:
+        return escape_text(self._name, '`')
+
+
+class Parameter(BaseExpression):
+    __slots__ = ('_name', '_type_text')
+
+    def __init__(
+            self,
+            name: str,
+            type_text: str
+    ) -> None:
+        self._name = name
+        self._type_text = type_text
+
+    def _render_expression(self) -> str:
+        return f'{{{self._name}:{self._type_text}}}'
+
+
+class ExternalTable(BaseExpression):
+    __slots__ = ('_name', '_structure', '_gen_data', '_data_format')
+
+    def __init__(
+            self,
+            name: str,
+            structure: typing.Dict[str, str],
+            gen_data: typing.Generator[bytes, None, None],
+            data_format: str = 'TabSeparated'
+    ) -> None:
+        self._name = name
+        self._structure = structure
+        self._gen_data = gen_data
+        self._data_format = data_format
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def structure(self) -> typing.Dict[str, str]:
+        return dict(self._structure)
+
+    @property
+    def structure_text(self) -> str:
+        return ', '.join(
+            f'{name} {type_text}'
+            for name, type_text in self._structure.items()
+        )
+
+    @property
+    def gen_data(self) -> typing.Generator[bytes, None, None]:
+        return self._gen_data
+
+    @property
+    def data_format(self) -> str:
+        return self._data_format
+
+    def _render_expression(self) -> str:
         return escape_text(self._name, '`')
 
 
 class Call(BaseExpression):
+    __slots__ = ('_function', '_args')
+
     def __init__(
             self,
             function: typing.Any,
@@ -235,7 +553,7 @@ class Call(BaseExpression):
         self._function = function
         self._args = args
 
-    def render_expression(self) -> str:
+    def _render_expression(self) -> str:
         function_text = escape_value(self._function)
 
         args_text = ', '.join(
@@ -247,18 +565,22 @@ class Call(BaseExpression):
 
 
 class BaseStatement(BaseAST):
-    def render_expression(self) -> str:
+    __slots__ = ()
+
+    def _render_expression(self) -> str:
         return f'({self.render_statement()})'
 
 
 class Initial(BaseStatement):
+    __slots__ = ('_name',)
+
     def __init__(
             self,
             name: str
     ) -> None:
         self._name = name
 
-    def render_statement(self) -> str:
+    def _render_statement(self) -> str:
         name_text = ' '.join(
             part
             for part in self._name.split('_')
@@ -268,7 +590,29 @@ class Initial(BaseStatement):
         return name_text
 
 
+def _render_clauses(
+        statement: BaseStatement
+) -> str:
+    # notice: walk the chain back to the nearest rendered statement and join
+    #         once, so that long chains render in linear time without deep
+    #         recursion
+    clause_texts: typing.List[str] = []
+
+    while (
+            isinstance(statement, (SimpleClause, ListClause))
+            and not hasattr(statement, '_statement_text')
+    ):
+        clause_texts.append(statement.render_clause())
+        statement = statement.previous
+
+    clause_texts.append(statement.render_statement())
+
+    return ''.join(reversed(clause_texts))
+
+
 class SimpleClause(BaseStatement):
+    __slots__ = ('_previous', '_name')
+
     def __init__(
             self,
             previous: BaseStatement,
@@ -277,8 +621,11 @@ class SimpleClause(BaseStatement):
         self._previous = previous
         self._name = name
 
-    def render_statement(self) -> str:
-        previous_text = self._previous.render_statement()
+    @property
+    def previous(self) -> BaseStatement:
+        return self._previous
+
+    def render_clause(self) -> str:
         name_text = ' '.join(
             part
             for part in self._name.split('_')
@@ -288,10 +635,15 @@ class SimpleClause(BaseStatement):
         if name_text.lower() == 'engine':
             name_text += ' ='
 
-        return f'{previous_text} {name_text}'
+        return f' {name_text}'
+
+    def _render_statement(self) -> str:
+        return _render_clauses(self)
 
 
 class ListClause(BaseStatement):
+    __slots__ = ('_previous', '_args', '_kwargs')
+
     def __init__(
             self,
             previous: BaseStatement,
@@ -302,8 +654,11 @@ class ListClause(BaseStatement):
         self._args = args
         self._kwargs = kwargs
 
-    def render_statement(self) -> str:
-        previous_text = self._previous.render_statement()
+    @property
+    def previous(self) -> BaseStatement:
+        return self._previous
+
+    def render_clause(self) -> str:
         args_kwargs_text = ', '.join(
             (
                 *(
@@ -319,9 +674,356 @@ class ListClause(BaseStatement):
 
         # TODO: handle "create table" separately
         if isinstance(self._previous, ListClause):
-            return f'{previous_text} ({args_kwargs_text})'
+            return f' ({args_kwargs_text})'
 
         if args_kwargs_text:
-            return f'{previous_text} {args_kwargs_text}'
+            return f' {args_kwargs_text}'
+
+        return ''
+
+    def _render_statement(self) -> str:
+        return _render_clauses(self)
+
+
+def _count_calls(
+        value: typing.Any,
+        counts: typing.Dict[Call, int]
+) -> None:
+    if isinstance(value, (list, tuple)):
+        for member in value:
+            _count_calls(member, counts)
+    elif isinstance(value, Call):
+        counts[value] = counts.get(value, 0) + 1
+
+        # notice: the function itself is not an expression, e.g. quantile(0.5)
+        _count_calls(value._args, counts)  # pylint: disable=protected-access
+
+
+def _replace_calls(
+        value: typing.Any,
+        aliases: typing.Dict[Call, Identifier]
+) -> typing.Any:
+    if isinstance(value, list):
+        return [
+            _replace_calls(member, aliases)
+            for member in value
+        ]
+
+    if isinstance(value, tuple):
+        return tuple(
+            _replace_calls(member, aliases)
+            for member in value
+        )
+
+    if isinstance(value, Call):
+        if value in aliases:
+            return aliases[value]
+
+        # pylint: disable=protected-access
+        return Call(value._function, *_replace_calls(value._args, aliases))
+
+    return value
+
+
+def extract_common(
+        statement: BaseStatement,
+        min_length: int = 64
+) -> typing.Tuple[BaseStatement, int]:
+    # pylint: disable=protected-access
+
+    clauses: typing.List[BaseStatement] = []
+    initial: BaseStatement = statement
+
+    while isinstance(initial, (SimpleClause, ListClause)):
+        clauses.append(initial)
+        initial = initial.previous
+
+    clauses.reverse()
+
+    if not isinstance(initial, Initial):
+        return statement, 0
+
+    if initial._name == 'with':
+        if not clauses or not isinstance(clauses[0], ListClause):
+            return statement, 0
+    elif initial._name not in ('select', 'select_distinct'):
+        return statement, 0
+
+    # notice: with only binds the first select of a compound statement
+    for clause in clauses:
+        if isinstance(clause, SimpleClause) and {
+                part.lower()
+                for part in clause._name.split('_')
+        } & {'union', 'except', 'intersect'}:
+            return statement, 0
+
+    # notice: subqueries are left as they are, since they may be evaluated
+    #         in another scope
+    definitions: typing.Dict[str, Call] = {}
+
+    while True:
+        counts: typing.Dict[Call, int] = {}
+
+        for clause in clauses:
+            if isinstance(clause, ListClause):
+                _count_calls(clause._args, counts)
+                _count_calls(tuple(clause._kwargs.values()), counts)
+
+        candidates = [
+            ((count - 1) * len(call.render_expression()), call)
+            for call, count in counts.items()
+            if count > 1 and len(call.render_expression()) >= min_length
+        ]
+
+        if not candidates:
+            break
+
+        _, common_call = max(candidates, key=lambda candidate: candidate[0])
+        alias = f'_common_{len(definitions)}'
+        definitions[alias] = common_call
+
+        aliases = {common_call: Identifier(alias)}
+        clauses = [
+            ListClause(
+                clause._previous,
+                *_replace_calls(clause._args, aliases),
+                **{
+                    name: _replace_calls(value, aliases)
+                    for name, value in clause._kwargs.items()
+                }
+            )
+            if isinstance(clause, ListClause)
+            else clause
+            for clause in clauses
+        ]
+
+    if not definitions:
+        return statement, 0
+
+    # rebuild the chain
+
+    result: BaseStatement
+
+    if initial._name == 'with':
+        first_clause = typing.cast(ListClause, clauses[0])
+        result = ListClause(
+            initial,
+            *first_clause._args,
+            **first_clause._kwargs,
+            **definitions
+        )
+        clauses = clauses[1:]
+    else:
+        result = SimpleClause(
+            ListClause(Initial('with'), **definitions),
+            initial._name
+        )
+
+    for clause in clauses:
+        if isinstance(clause, ListClause):
+            result = ListClause(result, *clause._args, **clause._kwargs)
+        else:
+            result = SimpleClause(
+                result,
+                typing.cast(SimpleClause, clause)._name
+            )
+
+    saved_size = len(statement.render_statement()) \
+        - len(result.render_statement())
+
+    return result, saved_size
+
+
+_KEYWORDS = frozenset((
+    'all', 'and', 'any', 'array', 'as', 'asc', 'between', 'by', 'case',
+    'create', 'cross', 'database', 'default', 'delete', 'desc', 'distinct',
+    'drop', 'else', 'end', 'engine', 'exists', 'false', 'final', 'first',
+    'format', 'from', 'full', 'global', 'group', 'having', 'if', 'ilike',
+    'in', 'inner', 'insert', 'interval', 'into', 'is', 'join', 'key', 'last',
+    'left', 'like', 'limit', 'materialized', 'not', 'null', 'nulls',
+    'offset', 'on', 'or', 'order', 'outer', 'partition', 'prewhere',
+    'primary', 'replace', 'right', 'sample', 'select', 'settings', 'table',
+    'then', 'totals', 'true', 'union', 'using', 'values', 'view', 'when',
+    'where', 'with',
+))
+
+_PATTERN_TOKEN = re.compile(
+    r'(\'(?:[^\'\\]|\\.)*\')'
+    r'|("(?:[^"\\]|\\.)*"|`(?:[^`\\]|\\.)*`)'
+    r'|([0-9](?:[eE][+-]?[0-9]|[0-9A-Za-z_.])*)'
+    r'|([A-Za-z_][0-9A-Za-z_]*)'
+    r'|(\s+)',
+    re.DOTALL
+)
+_PATTERN_PUNCTUATION = re.compile(r' ?([(\[]) ?| ?([)\]])| ?, ?')
+_PATTERN_LIST = re.compile(r'\?(?:, \?)+')
+
+
+def _pattern_token(match: typing.Match[str]) -> str:
+    _, quoted, _, word, space = match.groups()
+
+    if quoted is not None:
+        return quoted
+
+    if word is not None:
+        lower_word = word.lower()
+
+        return lower_word if lower_word in _KEYWORDS else word
+
+    if space is not None:
+        return ' '
+
+    # notice: strings and numbers
+    return '?'
+
+
+def _pattern_text(text: str) -> str:
+    return _PATTERN_TOKEN.sub(_pattern_token, text)
+
 
-        return previous_text
+def _space_token(match: typing.Match[str]) -> str:
+    return ' ' if match.group(5) is not None else match.group(0)
+
+
+def _pattern_value(value: typing.Any) -> str:
+    if value is None:
+        return 'null'
+
+    if value is Ellipsis:
+        return '*'
+
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+
+    if isinstance(value, int):
+        return '?' if value >= 0 else '-?'
+
+    if isinstance(value, float) and math.isfinite(value):
+        return '?' if math.copysign(1, value) > 0 else '-?'
+
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return '?'
+
+    if isinstance(value, (list, set, frozenset)):
+        members_text = ', '.join(
+            _pattern_value(member)
+            for member in value
+        )
+
+        return f'array({members_text})'
+
+    if isinstance(value, tuple):
+        members_text = ', '.join(
+            _pattern_value(member)
+            for member in value
+        )
+
+        return f'tuple({members_text})'
+
+    if isinstance(value, BaseAST):
+        return _pattern_expression(value)
+
+    return _pattern_text(escape_value(value))
+
+
+def _pattern_expression(node: BaseAST) -> str:
+    # pylint: disable=protected-access
+
+    if isinstance(node, Raw):
+        return _pattern_text(node._query)
+
+    if isinstance(node, Value):
+        return _pattern_value(node._value)
+
+    if isinstance(node, Rows):
+        return '?'
+
+    if isinstance(node, Call):
+        function_text = _pattern_value(node._function)
+
+        args_text = ', '.join(
+            _pattern_value(arg)
+            for arg in node._args
+        )
+
+        return f'{function_text}({args_text})'
+
+    if isinstance(node, BaseStatement):
+        return f'({_pattern_statement(node)})'
+
+    return _pattern_text(node.render_expression())
+
+
+def _pattern_statement(node: BaseAST) -> str:
+    # pylint: disable=protected-access
+
+    if isinstance(node, Raw):
+        return _pattern_text(node._query)
+
+    if isinstance(node, BaseExpression):
+        return f'select {_pattern_expression(node)}'
+
+    # notice: clause chains are walked iteratively, see _render_clauses
+    clause_texts: typing.List[str] = []
+
+    while isinstance(node, (SimpleClause, ListClause)):
+        if isinstance(node, SimpleClause):
+            clause_texts.append(_pattern_text(node.render_clause()))
+        else:
+            args_kwargs_text = ', '.join(
+                (
+                    *(
+                        _pattern_value(arg)
+                        for arg in node._args
+                    ),
+                    *(
+                        f'{_pattern_value(value)} as {escape_text(name, "`")}'
+                        for name, value in node._kwargs.items()
+                    ),
+                )
+            )
+
+            if isinstance(node.previous, ListClause):
+                clause_texts.append(f' ({args_kwargs_text})')
+            elif args_kwargs_text:
+                clause_texts.append(f' {args_kwargs_text}')
+
+        node = node.previous
+
+    clause_texts.append(_pattern_text(node.render_statement()))
+
+    return ''.join(reversed(clause_texts))
+
+
+def _pattern_finish(text: str) -> str:
+    text = _PATTERN_PUNCTUATION.sub(
+        lambda match: match.group(1) or match.group(2) or ', ',
+        text.strip()
+    )
+
+    # notice: lists of literals of any length share a pattern
+    return _PATTERN_LIST.sub('?', text)
+
+
+def normalize_space(query: str) -> str:
+    # notice: unlike patterns, literals and names are kept as they are
+    return _PATTERN_TOKEN.sub(_space_token, query).strip()
+
+
+def normalize_pattern(
+        query: typing.Union[str, BaseAST]
+) -> str:
+    if isinstance(query, BaseAST):
+        return _pattern_finish(_pattern_statement(query))
+
+    return _pattern_finish(_pattern_text(query))
+
+
+def pattern_fingerprint(pattern_text: str) -> str:
+    return hashlib.blake2b(pattern_text.encode(), digest_size=8).hexdigest()
+
+
+def fingerprint(
+        query: typing.Union[str, BaseAST]
+) -> str:
+    return pattern_fingerprint(normalize_pattern(query))
@@ -1,534 +1,1274 @@
 import dis
 import functools
 import inspect
+import re
 import types
 import typing
+import weakref
 
 from ck import exception
 from ck.query import ast
 
 
-def _run(
+# TODO
+# pylint: disable=trailing-comma-tuple
+# pylint: disable=unused-argument
+
+# TODO: use types.CellType
+_Handler = typing.Callable[
+    [
+        typing.Dict[str, typing.Any],
+        typing.Dict[str, typing.Any],
+        typing.Tuple[typing.Any, ...],
+        typing.List[typing.Any],
+        typing.Any,
+        typing.Any,
+    ],
+    None
+]
+_Plan = typing.Tuple[
+    typing.List[typing.Tuple[_Handler, typing.Any, typing.Any]],
+    bool
+]
+_Skeleton = typing.List[typing.Union[str, int]]
+
+
+def _call_named(
+        name: str,
+        *args: typing.Any
+) -> ast.BaseAST:
+    return ast.Call(ast.Raw(name), *args)
+
+
+def _unsupported(opname: str) -> _Handler:
+    def handle(
+            global_dict: typing.Dict[str, typing.Any],
+            local_dict: typing.Dict[str, typing.Any],
+            cells: typing.Tuple[typing.Any, ...],
+            stack: typing.List[typing.Any],
+            arg: typing.Any,
+            argval: typing.Any
+    ) -> None:
+        raise exception.DisError(opname)
+
+    return handle
+
+
+def _unary(name: str) -> _Handler:
+    def handle(
+            global_dict: typing.Dict[str, typing.Any],
+            local_dict: typing.Dict[str, typing.Any],
+            cells: typing.Tuple[typing.Any, ...],
+            stack: typing.List[typing.Any],
+            arg: typing.Any,
+            argval: typing.Any
+    ) -> None:
+        stack[-1] = _call_named(name, stack[-1])
+
+    return handle
+
+
+def _binary(name: str) -> _Handler:
+    def handle(
+            global_dict: typing.Dict[str, typing.Any],
+            local_dict: typing.Dict[str, typing.Any],
+            cells: typing.Tuple[typing.Any, ...],
+            stack: typing.List[typing.Any],
+            arg: typing.Any,
+            argval: typing.Any
+    ) -> None:
+        stack[-2:] = _call_named(name, *stack[-2:]),
+
+    return handle
+
+
+def _nop(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    pass
+
+
+def _pop_top(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack.pop()
+
+
+def _rot_two(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[-2:] = stack[-1], stack[-2]
+
+
+def _rot_three(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[-3:] = stack[-1], *stack[-3:-1]
+
+
+def _rot_four(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[-4:] = stack[-1], *stack[-4:-1]
+
+
+def _dup_top(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack.append(stack[-1])
+
+
+def _dup_top_two(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack.extend(stack[-2:])
+
+
+def _unary_positive(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[-1] = _call_named('negate', _call_named('negate', stack[-1]))
+
+
+def _get_iter(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[-1] = iter(stack[-1])
+
+
+def _get_yield_from_iter(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    # TODO: more accurate semantic
+    stack[-1] = iter(stack[-1])
+
+
+def _binary_subscr(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    # TODO: subscr for slices?
+    # TODO: general element access for array, tuple, and string?
+    stack[-2:] = _call_named('arrayElement', *stack[-2:]),
+
+
+def _store_subscr(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[-3:] = _call_named(
+        'arrayConcat',
+        _call_named(
+            'arraySlice',
+            stack[-2],
+            1,
+            _call_named('minus', stack[-1], 1)
+        ),
+        _call_named('array', stack[-3]),
+        _call_named(
+            'arraySlice',
+            stack[-2],
+            _call_named('plus', stack[-1], 1)
+        )
+    ),
+
+
+def _delete_subscr(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[-2:] = _call_named(
+        'arrayConcat',
+        _call_named(
+            'arraySlice',
+            stack[-2],
+            1,
+            _call_named('minus', stack[-1], 1)
+        ),
+        _call_named(
+            'arraySlice',
+            stack[-2],
+            _call_named('plus', stack[-1], 1)
+        )
+    ),
+
+
+def _print_expr(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    print(stack.pop())
+
+
+def _set_add(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    value = stack.pop()
+
+    stack[-arg].add(value)
+
+
+def _list_append(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    value = stack.pop()
+
+    stack[-arg].append(value)
+
+
+def _map_add(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    name, value = stack[-2:]
+    del stack[-2:]
+
+    stack[-arg][name] = value
+
+
+def _setup_annotations(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if '__annotations__' not in local_dict:
+        local_dict['__annotations__'] = {}
+
+
+def _import_star(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    module = stack.pop()
+
+    local_dict.update({
+        name: getattr(module, name)
+        for name in dir(module)
+        if not name.startswith('_')
+    })
+
+
+def _load_build_class(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack.append(__build_class__)  # type: ignore[name-defined]
+
+
+def _store_name(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    local_dict[argval] = stack.pop()
+
+
+def _delete_name(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    del local_dict[argval]
+
+
+def _unpack_sequence(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if len(stack[-1]) != arg:
+        raise ValueError()
+
+    stack[-1:] = stack[-1][::-1]
+
+
+def _unpack_ex(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    lo = arg % 256  # pylint: disable=invalid-name
+    hi = arg // 256  # pylint: disable=invalid-name
+
+    if hi:
+        stack[-1:] = *stack[-1][:lo], stack[-1][lo:-hi], *stack[-1][-hi:]
+    else:
+        stack[-1:] = *stack[-1][:lo], stack[-1][lo:]
+
+
+def _store_global(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    global_dict[argval] = stack.pop()
+
+
+def _delete_global(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    del global_dict[argval]
+
+
+def _load_const(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack.append(argval)
+
+
+def _load_name(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if argval in local_dict:
+        stack.append(local_dict[argval])
+    elif argval in global_dict:
+        stack.append(global_dict[argval])
+    else:
+        stack.append(ast.Identifier(argval))
+
+
+def _build_tuple(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = tuple(stack[len(stack) - arg:]),
+
+
+def _build_list(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = stack[len(stack) - arg:],
+
+
+def _build_set(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = set(stack[len(stack) - arg:]),
+
+
+def _build_map(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - 2 * arg:] = dict(
+        zip(
+            stack[len(stack) - 2 * arg::2],
+            stack[len(stack) - 2 * arg + 1::2]
+        )
+    ),
+
+
+def _build_const_key_map(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[-arg - 1:] = dict(zip(stack[-1], stack[-arg - 1:-1])),
+
+
+def _build_string(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = ''.join(stack[len(stack) - arg:]),
+
+
+def _build_tuple_unpack(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = tuple(
+        member
+        for value in stack[len(stack) - arg:]
+        for member in value
+    ),
+
+
+def _build_tuple_unpack_with_call(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = tuple(
+        member
+        for value in stack[len(stack) - arg:]
+        for member in value
+    ),
+
+
+def _build_list_unpack(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = [
+        member
+        for value in stack[len(stack) - arg:]
+        for member in value
+    ],
+
+
+def _build_set_unpack(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = {
+        member
+        for value in stack[len(stack) - arg:]
+        for member in value
+    },
+
+
+def _build_map_unpack(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = dict(
+        member
+        for value in stack[len(stack) - arg:]
+        for member in value.items()
+    ),
+
+
+def _build_map_unpack_with_call(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = dict(
+        member
+        for value in stack[len(stack) - arg:]
+        for member in value.items()
+    ),
+
+
+def _load_attr(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if isinstance(stack[-1], ast.BaseStatement):
+        stack[-1] = ast.SimpleClause(stack[-1], argval)
+    else:
+        stack[-1] = _call_named('tupleElement', stack[-1], argval)
+
+
+def _compare_op(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    # notice: see dis.cmp_op
+    if argval == '<':
+        stack[-2:] = _call_named('less', *stack[-2:]),
+    elif argval == '<=':
+        stack[-2:] = _call_named('lessOrEquals', *stack[-2:]),
+    elif argval == '==':
+        stack[-2:] = _call_named('equals', *stack[-2:]),
+    elif argval == '!=':
+        stack[-2:] = _call_named('notEquals', *stack[-2:]),
+    elif argval == '>':
+        stack[-2:] = _call_named('greater', *stack[-2:]),
+    elif argval == '>=':
+        stack[-2:] = _call_named('greaterOrEquals', *stack[-2:]),
+    elif argval == 'in':
+        stack[-2:] = _call_named('in', *stack[-2:]),
+    elif argval == 'not in':
+        stack[-2:] = _call_named('notIn', *stack[-2:]),
+    elif argval == 'is':
+        stack[-2:] = _call_named(
+            'and',
+            _call_named(
+                'equals',
+                _call_named('toTypeName', stack[-2]),
+                _call_named('toTypeName', stack[-1])
+            ),
+            _call_named('equals', *stack[-2:])
+        ),
+    elif argval == 'is not':
+        stack[-2:] = _call_named(
+            'or',
+            _call_named(
+                'notEquals',
+                _call_named('toTypeName', stack[-2]),
+                _call_named('toTypeName', stack[-1])
+            ),
+            _call_named('notEquals', *stack[-2:])
+        ),
+    elif argval == 'exception match':
+        raise exception.DisError('COMPARE_OP')
+    elif argval == 'BAD':
+        raise exception.DisError('COMPARE_OP')
+    else:
+        raise exception.DisError('COMPARE_OP')
+
+
+def _import_name(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[-2:] = __import__(argval, fromlist=stack[-2], level=stack[-1]),
+
+
+def _import_from(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    local_dict[argval] = getattr(stack[-1], argval)
+
+
+def _load_global(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if argval in global_dict:
+        stack.append(global_dict[argval])
+    else:
+        stack.append(ast.Identifier(argval))
+
+
+def _load_fast(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack.append(local_dict[argval])
+
+
+def _store_fast(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    local_dict[argval] = stack.pop()
+
+
+def _delete_fast(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    del local_dict[argval]
+
+
+def _load_closure(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack.append(cells[arg])
+
+
+def _load_deref(
         global_dict: typing.Dict[str, typing.Any],
         local_dict: typing.Dict[str, typing.Any],
-        # TODO: use types.CellType
         cells: typing.Tuple[typing.Any, ...],
         stack: typing.List[typing.Any],
-        opname: str,
-        # TODO: int?
         arg: typing.Any,
         argval: typing.Any
-) -> bool:
-    # TODO
-    # pylint: disable=trailing-comma-tuple
+) -> None:
+    stack.append(cells[arg].cell_contents)
 
-    def call_named(
-            name: str,
-            *args: typing.Any
-    ) -> ast.BaseAST:
-        return ast.Call(ast.Raw(name), *args)
 
-    if opname == 'NOP':
-        pass
-    elif opname == 'POP_TOP':
-        stack.pop()
-    elif opname == 'ROT_TWO':
-        stack[-2:] = stack[-1], stack[-2]
-    elif opname == 'ROT_THREE':
-        stack[-3:] = stack[-1], *stack[-3:-1]
-    elif opname == 'ROT_FOUR':
-        stack[-4:] = stack[-1], *stack[-4:-1]
-    elif opname == 'DUP_TOP':
-        stack.append(stack[-1])
-    elif opname == 'DUP_TOP_TWO':
-        stack.extend(stack[-2:])
-    elif opname == 'UNARY_POSITIVE':
-        stack[-1] = call_named('negate', call_named('negate', stack[-1]))
-    elif opname == 'UNARY_NEGATIVE':
-        stack[-1] = call_named('negate', stack[-1])
-    elif opname == 'UNARY_NOT':
-        stack[-1] = call_named('not', stack[-1])
-    elif opname == 'UNARY_INVERT':
-        stack[-1] = call_named('bitNot', stack[-1])
-    elif opname == 'GET_ITER':
-        stack[-1] = iter(stack[-1])
-    elif opname == 'GET_YIELD_FROM_ITER':
-        # TODO: more accurate semantic
-        stack[-1] = iter(stack[-1])
-    elif opname == 'BINARY_POWER':
-        stack[-2:] = call_named('pow', *stack[-2:]),
-    elif opname == 'BINARY_MULTIPLY':
-        stack[-2:] = call_named('multiply', *stack[-2:]),
-    elif opname == 'BINARY_MATRIX_MULTIPLY':
-        stack[-2:] = call_named('cast', *stack[-2:]),
-    elif opname == 'BINARY_FLOOR_DIVIDE':
-        stack[-2:] = call_named('intDiv', *stack[-2:]),
-    elif opname == 'BINARY_TRUE_DIVIDE':
-        stack[-2:] = call_named('divide', *stack[-2:]),
-    elif opname == 'BINARY_MODULO':
-        stack[-2:] = call_named('modulo', *stack[-2:]),
-    elif opname == 'BINARY_ADD':
-        stack[-2:] = call_named('plus', *stack[-2:]),
-    elif opname == 'BINARY_SUBTRACT':
-        stack[-2:] = call_named('minus', *stack[-2:]),
-    elif opname == 'BINARY_SUBSCR':
-        # TODO: subscr for slices?
-        # TODO: general element access for array, tuple, and string?
-        stack[-2:] = call_named('arrayElement', *stack[-2:]),
-    elif opname == 'BINARY_LSHIFT':
-        stack[-2:] = call_named('bitShiftLeft', *stack[-2:]),
-    elif opname == 'BINARY_RSHIFT':
-        stack[-2:] = call_named('bitShiftRight', *stack[-2:]),
-    elif opname == 'BINARY_AND':
-        stack[-2:] = call_named('bitAnd', *stack[-2:]),
-    elif opname == 'BINARY_XOR':
-        stack[-2:] = call_named('bitXor', *stack[-2:]),
-    elif opname == 'BINARY_OR':
-        stack[-2:] = call_named('bitOr', *stack[-2:]),
-    elif opname == 'INPLACE_POWER':
-        stack[-2:] = call_named('pow', *stack[-2:]),
-    elif opname == 'INPLACE_MULTIPLY':
-        stack[-2:] = call_named('multiply', *stack[-2:]),
-    elif opname == 'INPLACE_MATRIX_MULTIPLY':
-        stack[-2:] = call_named('cast', *stack[-2:]),
-    elif opname == 'INPLACE_FLOOR_DIVIDE':
-        stack[-2:] = call_named('intDiv', *stack[-2:]),
-    elif opname == 'INPLACE_TRUE_DIVIDE':
-        stack[-2:] = call_named('divide', *stack[-2:]),
-    elif opname == 'INPLACE_MODULO':
-        stack[-2:] = call_named('modulo', *stack[-2:]),
-    elif opname == 'INPLACE_ADD':
-        stack[-2:] = call_named('plus', *stack[-2:]),
-    elif opname == 'INPLACE_SUBTRACT':
-        stack[-2:] = call_named('minus', *stack[-2:]),
-    elif opname == 'INPLACE_LSHIFT':
-        stack[-2:] = call_named('bitShiftLeft', *stack[-2:]),
-    elif opname == 'INPLACE_RSHIFT':
-        stack[-2:] = call_named('bitShiftRight', *stack[-2:]),
-    elif opname == 'INPLACE_AND':
-        stack[-2:] = call_named('bitAnd', *stack[-2:]),
-    elif opname == 'INPLACE_XOR':
-        stack[-2:] = call_named('bitXor', *stack[-2:]),
-    elif opname == 'INPLACE_OR':
-        stack[-2:] = call_named('bitOr', *stack[-2:]),
-    elif opname == 'STORE_SUBSCR':
-        stack[-3:] = call_named(
-            'arrayConcat',
-            call_named(
-                'arraySlice',
-                stack[-2],
-                1,
-                call_named('minus', stack[-1], 1)
-            ),
-            call_named('array', stack[-3]),
-            call_named(
-                'arraySlice',
-                stack[-2],
-                call_named('plus', stack[-1], 1)
-            )
-        ),
-    elif opname == 'DELETE_SUBSCR':
-        stack[-2:] = call_named(
-            'arrayConcat',
-            call_named(
-                'arraySlice',
-                stack[-2],
-                1,
-                call_named('minus', stack[-1], 1)
-            ),
-            call_named(
-                'arraySlice',
-                stack[-2],
-                call_named('plus', stack[-1], 1)
-            )
-        ),
-    elif opname == 'GET_AWAITABLE':
-        raise exception.DisError(opname)
-    elif opname == 'GET_AITER':
-        raise exception.DisError(opname)
-    elif opname == 'GET_ANEXT':
-        raise exception.DisError(opname)
-    elif opname == 'END_ASYNC_FOR':
-        raise exception.DisError(opname)
-    elif opname == 'BEFORE_ASYNC_WITH':
-        raise exception.DisError(opname)
-    elif opname == 'SETUP_ASYNC_WITH':
-        raise exception.DisError(opname)
-    elif opname == 'PRINT_EXPR':
-        print(stack.pop())
-    elif opname == 'SET_ADD':
-        value = stack.pop()
-
-        stack[-arg].add(value)
-    elif opname == 'LIST_APPEND':
-        value = stack.pop()
-
-        stack[-arg].append(value)
-    elif opname == 'MAP_ADD':
-        name, value = stack[-2:]
-        del stack[-2:]
+def _load_classderef(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack.append(cells[arg].cell_contents)
 
-        stack[-arg][name] = value
-    elif opname == 'RETURN_VALUE':
-        return True
-    elif opname == 'YIELD_VALUE':
-        raise exception.DisError(opname)
-    elif opname == 'YIELD_FROM':
-        raise exception.DisError(opname)
-    elif opname == 'SETUP_ANNOTATIONS':
-        if '__annotations__' not in local_dict:
-            local_dict['__annotations__'] = {}
-    elif opname == 'IMPORT_STAR':
-        module = stack.pop()
-
-        local_dict.update({
-            name: getattr(module, name)
-            for name in dir(module)
-            if not name.startswith('_')
-        })
-    elif opname == 'POP_BLOCK':
-        raise exception.DisError(opname)
-    elif opname == 'POP_EXCEPT':
-        raise exception.DisError(opname)
-    elif opname == 'POP_FINALLY':
-        raise exception.DisError(opname)
-    elif opname == 'BEGIN_FINALLY':
-        raise exception.DisError(opname)
-    elif opname == 'END_FINALLY':
-        raise exception.DisError(opname)
-    elif opname == 'LOAD_BUILD_CLASS':
-        stack.append(__build_class__)  # type: ignore[name-defined]
-    elif opname == 'SETUP_WITH':
-        raise exception.DisError(opname)
-    elif opname == 'WITH_CLEANUP_START':
-        raise exception.DisError(opname)
-    elif opname == 'WITH_CLEANUP_FINISH':
-        raise exception.DisError(opname)
-    elif opname == 'STORE_NAME':
-        local_dict[argval] = stack.pop()
-    elif opname == 'DELETE_NAME':
-        del local_dict[argval]
-    elif opname == 'UNPACK_SEQUENCE':
-        if len(stack[-1]) != arg:
-            raise ValueError()
-
-        stack[-1:] = stack[-1][::-1]
-    elif opname == 'UNPACK_EX':
-        lo = arg % 256  # pylint: disable=invalid-name
-        hi = arg // 256  # pylint: disable=invalid-name
-
-        if hi:
-            stack[-1:] = *stack[-1][:lo], stack[-1][lo:-hi], *stack[-1][-hi:]
-        else:
-            stack[-1:] = *stack[-1][:lo], stack[-1][lo:]
-    elif opname == 'STORE_ATTR':
-        # TODO
-        raise exception.DisError(opname)
-    elif opname == 'DELETE_ATTR':
-        # TODO
-        raise exception.DisError(opname)
-    elif opname == 'STORE_GLOBAL':
-        global_dict[argval] = stack.pop()
-    elif opname == 'DELETE_GLOBAL':
-        del global_dict[argval]
-    elif opname == 'LOAD_CONST':
-        stack.append(argval)
-    elif opname == 'LOAD_NAME':
-        if argval in local_dict:
-            stack.append(local_dict[argval])
-        elif argval in global_dict:
-            stack.append(global_dict[argval])
-        else:
-            stack.append(ast.Identifier(argval))
-    elif opname == 'BUILD_TUPLE':
-        stack[len(stack) - arg:] = tuple(stack[len(stack) - arg:]),
-    elif opname == 'BUILD_LIST':
-        stack[len(stack) - arg:] = stack[len(stack) - arg:],
-    elif opname == 'BUILD_SET':
-        stack[len(stack) - arg:] = set(stack[len(stack) - arg:]),
-    elif opname == 'BUILD_MAP':
-        stack[len(stack) - 2 * arg:] = dict(
-            zip(
-                stack[len(stack) - 2 * arg::2],
-                stack[len(stack) - 2 * arg + 1::2]
-            )
+
+def _store_deref(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    cells[arg].cell_contents = stack.pop()
+
+
+def _delete_deref(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    del cells[arg].cell_contents
+
+
+def _call_function(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if isinstance(stack[-arg - 1], ast.Identifier):
+        stack[-arg - 1:] = ast.Call(
+            stack[-arg - 1],
+            *stack[len(stack) - arg:]
         ),
-    elif opname == 'BUILD_CONST_KEY_MAP':
-        stack[-arg - 1:] = dict(zip(stack[-1], stack[-arg - 1:-1])),
-    elif opname == 'BUILD_STRING':
-        stack[len(stack) - arg:] = ''.join(stack[len(stack) - arg:]),
-    elif opname == 'BUILD_TUPLE_UNPACK':
-        stack[len(stack) - arg:] = tuple(
-            member
-            for value in stack[len(stack) - arg:]
-            for member in value
+    elif isinstance(stack[-arg - 1], ast.Call):
+        stack[-arg - 1:] = ast.Call(
+            stack[-arg - 1],
+            *stack[len(stack) - arg:]
         ),
-    elif opname == 'BUILD_TUPLE_UNPACK_WITH_CALL':
-        stack[len(stack) - arg:] = tuple(
-            member
-            for value in stack[len(stack) - arg:]
-            for member in value
+    elif isinstance(stack[-arg - 1], ast.BaseStatement):
+        stack[-arg - 1:] = ast.ListClause(
+            stack[-arg - 1],
+            *stack[len(stack) - arg:]
         ),
-    elif opname == 'BUILD_LIST_UNPACK':
-        stack[len(stack) - arg:] = [
-            member
-            for value in stack[len(stack) - arg:]
-            for member in value
-        ],
-    elif opname == 'BUILD_SET_UNPACK':
-        stack[len(stack) - arg:] = {
-            member
-            for value in stack[len(stack) - arg:]
-            for member in value
-        },
-    elif opname == 'BUILD_MAP_UNPACK':
-        stack[len(stack) - arg:] = dict(
-            member
-            for value in stack[len(stack) - arg:]
-            for member in value.items()
+    else:
+        stack[-arg - 1:] = stack[-arg - 1](*stack[len(stack) - arg:]),
+
+
+def _call_function_kw(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if isinstance(stack[-arg - 2], ast.Identifier):
+        if stack[-1]:
+            raise TypeError()
+
+        stack[-arg - 2:] = ast.Call(stack[-arg - 2], *stack[-arg - 1:-1]),
+    elif isinstance(stack[-arg - 2], ast.Call):
+        if stack[-1]:
+            raise TypeError()
+
+        stack[-arg - 2:] = ast.Call(stack[-arg - 2], *stack[-arg - 1:-1]),
+    elif isinstance(stack[-arg - 2], ast.BaseStatement):
+        stack[-arg - 2:] = ast.ListClause(
+            stack[-arg - 2],
+            *stack[-arg - 1:-len(stack[-1]) - 1],
+            **dict(zip(stack[-1], stack[-len(stack[-1]) - 1:-1]))
         ),
-    elif opname == 'BUILD_MAP_UNPACK_WITH_CALL':
-        stack[len(stack) - arg:] = dict(
-            member
-            for value in stack[len(stack) - arg:]
-            for member in value.items()
+    else:
+        stack[-arg - 2:] = stack[-arg - 2](
+            *stack[-arg - 1:-len(stack[-1]) - 1],
+            **dict(zip(stack[-1], stack[-len(stack[-1]) - 1:-1]))
         ),
-    elif opname == 'LOAD_ATTR':
-        if isinstance(stack[-1], ast.BaseStatement):
-            stack[-1] = ast.SimpleClause(stack[-1], argval)
-        else:
-            stack[-1] = call_named('tupleElement', stack[-1], argval)
-    elif opname == 'COMPARE_OP':
-        # notice: see dis.cmp_op
-        if argval == '<':
-            stack[-2:] = call_named('less', *stack[-2:]),
-        elif argval == '<=':
-            stack[-2:] = call_named('lessOrEquals', *stack[-2:]),
-        elif argval == '==':
-            stack[-2:] = call_named('equals', *stack[-2:]),
-        elif argval == '!=':
-            stack[-2:] = call_named('notEquals', *stack[-2:]),
-        elif argval == '>':
-            stack[-2:] = call_named('greater', *stack[-2:]),
-        elif argval == '>=':
-            stack[-2:] = call_named('greaterOrEquals', *stack[-2:]),
-        elif argval == 'in':
-            stack[-2:] = call_named('in', *stack[-2:]),
-        elif argval == 'not in':
-            stack[-2:] = call_named('notIn', *stack[-2:]),
-        elif argval == 'is':
-            stack[-2:] = call_named(
-                'and',
-                call_named(
-                    'equals',
-                    call_named('toTypeName', stack[-2]),
-                    call_named('toTypeName', stack[-1])
-                ),
-                call_named('equals', *stack[-2:])
-            ),
-        elif argval == 'is not':
-            stack[-2:] = call_named(
-                'or',
-                call_named(
-                    'notEquals',
-                    call_named('toTypeName', stack[-2]),
-                    call_named('toTypeName', stack[-1])
-                ),
-                call_named('notEquals', *stack[-2:])
-            ),
-        elif argval == 'exception match':
-            raise exception.DisError(opname)
-        elif argval == 'BAD':
-            raise exception.DisError(opname)
-        else:
-            raise exception.DisError(opname)
-    elif opname == 'IMPORT_NAME':
-        stack[-2:] = __import__(argval, fromlist=stack[-2], level=stack[-1]),
-    elif opname == 'IMPORT_FROM':
-        local_dict[argval] = getattr(stack[-1], argval)
-    elif opname == 'JUMP_FORWARD':
-        # TODO
-        raise exception.DisError(opname)
-    elif opname == 'POP_JUMP_IF_TRUE':
-        # TODO
-        raise exception.DisError(opname)
-    elif opname == 'POP_JUMP_IF_FALSE':
-        # TODO
-        raise exception.DisError(opname)
-    elif opname == 'JUMP_IF_TRUE_OR_POP':
-        # TODO
-        raise exception.DisError(opname)
-    elif opname == 'JUMP_IF_FALSE_OR_POP':
-        # TODO
-        raise exception.DisError(opname)
-    elif opname == 'JUMP_ABSOLUTE':
-        # TODO
-        raise exception.DisError(opname)
-    elif opname == 'FOR_ITER':
-        # TODO
-        raise exception.DisError(opname)
-    elif opname == 'LOAD_GLOBAL':
-        if argval in global_dict:
-            stack.append(global_dict[argval])
-        else:
-            stack.append(ast.Identifier(argval))
-    elif opname == 'SETUP_FINALLY':
-        raise exception.DisError(opname)
-    elif opname == 'CALL_FINALLY':
-        raise exception.DisError(opname)
-    elif opname == 'LOAD_FAST':
-        stack.append(local_dict[argval])
-    elif opname == 'STORE_FAST':
-        local_dict[argval] = stack.pop()
-    elif opname == 'DELETE_FAST':
-        del local_dict[argval]
-    elif opname == 'LOAD_CLOSURE':
-        stack.append(cells[arg])
-    elif opname == 'LOAD_DEREF':
-        stack.append(cells[arg].cell_contents)
-    elif opname == 'LOAD_CLASSDEREF':
-        stack.append(cells[arg].cell_contents)
-    elif opname == 'STORE_DEREF':
-        cells[arg].cell_contents = stack.pop()
-    elif opname == 'DELETE_DEREF':
-        del cells[arg].cell_contents
-    elif opname == 'RAISE_VARARGS':
-        raise exception.DisError(opname)
-    elif opname == 'CALL_FUNCTION':
-        if isinstance(stack[-arg - 1], ast.Identifier):
-            stack[-arg - 1:] = ast.Call(
-                stack[-arg - 1],
-                *stack[len(stack) - arg:]
-            ),
-        elif isinstance(stack[-arg - 1], ast.Call):
-            stack[-arg - 1:] = ast.Call(
-                stack[-arg - 1],
-                *stack[len(stack) - arg:]
-            ),
-        elif isinstance(stack[-arg - 1], ast.BaseStatement):
-            stack[-arg - 1:] = ast.ListClause(
-                stack[-arg - 1],
-                *stack[len(stack) - arg:]
-            ),
-        else:
-            stack[-arg - 1:] = stack[-arg - 1](*stack[len(stack) - arg:]),
-    elif opname == 'CALL_FUNCTION_KW':
-        if isinstance(stack[-arg - 2], ast.Identifier):
-            if stack[-1]:
-                raise TypeError()
-
-            stack[-arg - 2:] = ast.Call(stack[-arg - 2], *stack[-arg - 1:-1]),
-        elif isinstance(stack[-arg - 2], ast.Call):
-            if stack[-1]:
-                raise TypeError()
-
-            stack[-arg - 2:] = ast.Call(stack[-arg - 2], *stack[-arg - 1:-1]),
-        elif isinstance(stack[-arg - 2], ast.BaseStatement):
-            stack[-arg - 2:] = ast.ListClause(
-                stack[-arg - 2],
-                *stack[-arg - 1:-len(stack[-1]) - 1],
-                **dict(zip(stack[-1], stack[-len(stack[-1]) - 1:-1]))
-            ),
-        else:
-            stack[-arg - 2:] = stack[-arg - 2](
-                *stack[-arg - 1:-len(stack[-1]) - 1],
-                **dict(zip(stack[-1], stack[-len(stack[-1]) - 1:-1]))
-            ),
-    elif opname == 'CALL_FUNCTION_EX':
-        if arg & 1:
-            kwargs = stack[-1]
-            stack.pop()
-        else:
-            kwargs = {}
-
-        if isinstance(stack[-2], ast.Identifier):
-            if kwargs:
-                raise TypeError()
-
-            stack[-2:] = ast.Call(stack[-2], *stack[-1]),
-        elif isinstance(stack[-2], ast.Call):
-            if kwargs:
-                raise TypeError()
-
-            stack[-2:] = ast.Call(stack[-2], *stack[-1]),
-        elif isinstance(stack[-2], ast.BaseStatement):
-            stack[-2:] = ast.ListClause(stack[-2], *stack[-1], **kwargs),
-        else:
-            stack[-2:] = stack[-2](*stack[-1], **kwargs),
-    elif opname == 'LOAD_METHOD':
-        if isinstance(stack[-1], ast.BaseStatement):
-            stack[-1:] = ast.SimpleClause(stack[-1], argval), stack[-1]
-        else:
-            stack[-1:] = getattr(stack[-1], argval).__func__, stack[-1]
-    elif opname == 'CALL_METHOD':
-        if isinstance(stack[-arg - 2], ast.BaseStatement):
-            stack[-arg - 2:] = ast.ListClause(
-                stack[-arg - 2],
-                *stack[len(stack) - arg:]
-            ),
-        else:
-            stack[-arg - 2:] = stack[-arg - 2](*stack[-arg - 1:]),
-    elif opname == 'MAKE_FUNCTION':
-        # TODO
-        if arg & 8:
-            function = sql_template(
-                types.FunctionType(
-                    stack[-2],
-                    global_dict,
-                    stack[-1],
-                    closure=stack[-3]
-                )
-            )
-            del stack[-3:]
-        else:
-            function = sql_template(
-                types.FunctionType(stack[-2], global_dict, stack[-1])
+
+
+def _call_function_ex(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if arg & 1:
+        kwargs = stack[-1]
+        stack.pop()
+    else:
+        kwargs = {}
+
+    if isinstance(stack[-2], ast.Identifier):
+        if kwargs:
+            raise TypeError()
+
+        stack[-2:] = ast.Call(stack[-2], *stack[-1]),
+    elif isinstance(stack[-2], ast.Call):
+        if kwargs:
+            raise TypeError()
+
+        stack[-2:] = ast.Call(stack[-2], *stack[-1]),
+    elif isinstance(stack[-2], ast.BaseStatement):
+        stack[-2:] = ast.ListClause(stack[-2], *stack[-1], **kwargs),
+    else:
+        stack[-2:] = stack[-2](*stack[-1], **kwargs),
+
+
+def _load_method(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if isinstance(stack[-1], ast.BaseStatement):
+        stack[-1:] = ast.SimpleClause(stack[-1], argval), stack[-1]
+    else:
+        stack[-1:] = getattr(stack[-1], argval).__func__, stack[-1]
+
+
+def _call_method(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if isinstance(stack[-arg - 2], ast.BaseStatement):
+        stack[-arg - 2:] = ast.ListClause(
+            stack[-arg - 2],
+            *stack[len(stack) - arg:]
+        ),
+    else:
+        stack[-arg - 2:] = stack[-arg - 2](*stack[-arg - 1:]),
+
+
+def _make_function(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    # TODO
+    if arg & 8:
+        function = sql_template(
+            types.FunctionType(
+                stack[-2],
+                global_dict,
+                stack[-1],
+                closure=stack[-3]
             )
-            del stack[-2:]
+        )
+        del stack[-3:]
+    else:
+        function = sql_template(
+            types.FunctionType(stack[-2], global_dict, stack[-1])
+        )
+        del stack[-2:]
 
-        if arg & 4:
-            # notice: annotation is not used
-            stack.pop()
+    if arg & 4:
+        # notice: annotation is not used
+        stack.pop()
 
-        if arg & 2:
-            function.__kwdefaults__ = stack.pop()
+    if arg & 2:
+        function.__kwdefaults__ = stack.pop()
 
-        if arg & 1:
-            function.__defaults__ = stack.pop()
+    if arg & 1:
+        function.__defaults__ = stack.pop()
 
-        stack.append(function)
-    elif opname == 'BUILD_SLICE':
-        stack[len(stack) - arg:] = slice(stack[len(stack) - arg:]),
-    elif opname == 'EXTENDED_ARG':
-        raise exception.DisError(opname)
-    elif opname == 'FORMAT_VALUE':
-        if arg & 4:
-            spec = stack[-1]
-            stack.pop()
-        else:
-            spec = ''
-
-        if arg & 3 == 0:
-            stack[-1] = format(stack[-1], spec)
-        elif arg & 3 == 1:
-            stack[-1] = format(str(stack[-1]), spec)
-        elif arg & 3 == 2:
-            stack[-1] = format(repr(stack[-1]), spec)
-        elif arg & 3 == 3:
-            stack[-1] = format(ascii(stack[-1]), spec)
-    elif opname == 'HAVE_ARGUMENT':
-        raise exception.DisError(opname)
+    stack.append(function)
+
+
+def _build_slice(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    stack[len(stack) - arg:] = slice(stack[len(stack) - arg:]),
+
+
+def _format_value(
+        global_dict: typing.Dict[str, typing.Any],
+        local_dict: typing.Dict[str, typing.Any],
+        cells: typing.Tuple[typing.Any, ...],
+        stack: typing.List[typing.Any],
+        arg: typing.Any,
+        argval: typing.Any
+) -> None:
+    if arg & 4:
+        spec = stack[-1]
+        stack.pop()
     else:
-        raise exception.DisError(opname)
+        spec = ''
+
+    if arg & 3 == 0:
+        stack[-1] = format(stack[-1], spec)
+    elif arg & 3 == 1:
+        stack[-1] = format(str(stack[-1]), spec)
+    elif arg & 3 == 2:
+        stack[-1] = format(repr(stack[-1]), spec)
+    elif arg & 3 == 3:
+        stack[-1] = format(ascii(stack[-1]), spec)
+
+
+# notice: see dis.opmap
+#         opcodes missing here raise DisError, see _unsupported
+_HANDLERS: typing.Dict[str, _Handler] = {
+    'NOP': _nop,
+    'POP_TOP': _pop_top,
+    'ROT_TWO': _rot_two,
+    'ROT_THREE': _rot_three,
+    'ROT_FOUR': _rot_four,
+    'DUP_TOP': _dup_top,
+    'DUP_TOP_TWO': _dup_top_two,
+    'UNARY_POSITIVE': _unary_positive,
+    'UNARY_NEGATIVE': _unary('negate'),
+    'UNARY_NOT': _unary('not'),
+    'UNARY_INVERT': _unary('bitNot'),
+    'GET_ITER': _get_iter,
+    'GET_YIELD_FROM_ITER': _get_yield_from_iter,
+    'BINARY_POWER': _binary('pow'),
+    'BINARY_MULTIPLY': _binary('multiply'),
+    'BINARY_MATRIX_MULTIPLY': _binary('cast'),
+    'BINARY_FLOOR_DIVIDE': _binary('intDiv'),
+    'BINARY_TRUE_DIVIDE': _binary('divide'),
+    'BINARY_MODULO': _binary('modulo'),
+    'BINARY_ADD': _binary('plus'),
+    'BINARY_SUBTRACT': _binary('minus'),
+    'BINARY_SUBSCR': _binary_subscr,
+    'BINARY_LSHIFT': _binary('bitShiftLeft'),
+    'BINARY_RSHIFT': _binary('bitShiftRight'),
+    'BINARY_AND': _binary('bitAnd'),
+    'BINARY_XOR': _binary('bitXor'),
+    'BINARY_OR': _binary('bitOr'),
+    'INPLACE_POWER': _binary('pow'),
+    'INPLACE_MULTIPLY': _binary('multiply'),
+    'INPLACE_MATRIX_MULTIPLY': _binary('cast'),
+    'INPLACE_FLOOR_DIVIDE': _binary('intDiv'),
+    'INPLACE_TRUE_DIVIDE': _binary('divide'),
+    'INPLACE_MODULO': _binary('modulo'),
+    'INPLACE_ADD': _binary('plus'),
+    'INPLACE_SUBTRACT': _binary('minus'),
+    'INPLACE_LSHIFT': _binary('bitShiftLeft'),
+    'INPLACE_RSHIFT': _binary('bitShiftRight'),
+    'INPLACE_AND': _binary('bitAnd'),
+    'INPLACE_XOR': _binary('bitXor'),
+    'INPLACE_OR': _binary('bitOr'),
+    'STORE_SUBSCR': _store_subscr,
+    'DELETE_SUBSCR': _delete_subscr,
+    'PRINT_EXPR': _print_expr,
+    'SET_ADD': _set_add,
+    'LIST_APPEND': _list_append,
+    'MAP_ADD': _map_add,
+    'SETUP_ANNOTATIONS': _setup_annotations,
+    'IMPORT_STAR': _import_star,
+    'LOAD_BUILD_CLASS': _load_build_class,
+    'STORE_NAME': _store_name,
+    'DELETE_NAME': _delete_name,
+    'UNPACK_SEQUENCE': _unpack_sequence,
+    'UNPACK_EX': _unpack_ex,
+    'STORE_GLOBAL': _store_global,
+    'DELETE_GLOBAL': _delete_global,
+    'LOAD_CONST': _load_const,
+    'LOAD_NAME': _load_name,
+    'BUILD_TUPLE': _build_tuple,
+    'BUILD_LIST': _build_list,
+    'BUILD_SET': _build_set,
+    'BUILD_MAP': _build_map,
+    'BUILD_CONST_KEY_MAP': _build_const_key_map,
+    'BUILD_STRING': _build_string,
+    'BUILD_TUPLE_UNPACK': _build_tuple_unpack,
+    'BUILD_TUPLE_UNPACK_WITH_CALL': _build_tuple_unpack_with_call,
+    'BUILD_LIST_UNPACK': _build_list_unpack,
+    'BUILD_SET_UNPACK': _build_set_unpack,
+    'BUILD_MAP_UNPACK': _build_map_unpack,
+    'BUILD_MAP_UNPACK_WITH_CALL': _build_map_unpack_with_call,
+    'LOAD_ATTR': _load_attr,
+    'COMPARE_OP': _compare_op,
+    'IMPORT_NAME': _import_name,
+    'IMPORT_FROM': _import_from,
+    'LOAD_GLOBAL': _load_global,
+    'LOAD_FAST': _load_fast,
+    'STORE_FAST': _store_fast,
+    'DELETE_FAST': _delete_fast,
+    'LOAD_CLOSURE': _load_closure,
+    'LOAD_DEREF': _load_deref,
+    'LOAD_CLASSDEREF': _load_classderef,
+    'STORE_DEREF': _store_deref,
+    'DELETE_DEREF': _delete_deref,
+    'CALL_FUNCTION': _call_function,
+    'CALL_FUNCTION_KW': _call_function_kw,
+    'CALL_FUNCTION_EX': _call_function_ex,
+    'LOAD_METHOD': _load_method,
+    'CALL_METHOD': _call_method,
+    'MAKE_FUNCTION': _make_function,
+    'BUILD_SLICE': _build_slice,
+    'FORMAT_VALUE': _format_value,
+}
+
+_GLOBALS: typing.Dict[str, typing.Any] = {
+    # supported queries:
+    #     with ... select ...
+    #     select ...
+    #     insert into ... select ...
+    #     create table ... engine = ... as select ...
+    #     create view ... as select ...
+    #     create materialized view ... as select ...
+    'with_': ast.Initial('with'),
+    'select': ast.Initial('select'),
+    'select_distinct': ast.Initial('select_distinct'),
+    'insert': ast.Initial('insert'),
+    'insert_into': ast.Initial('insert_into'),
+    'create': ast.Initial('create'),
+    'create_table': ast.Initial('create_table'),
+    'create_table_if_not_exists':
+        ast.Initial('create_table_if_not_exists'),
+    'create_view': ast.Initial('create_view'),
+    'create_or_replace_view': ast.Initial('create_or_replace_view'),
+    'create_view_if_not_exists':
+        ast.Initial('create_view_if_not_exists'),
+    'create_materialized_view':
+        ast.Initial('create_materialized_view'),
+    'create_materialized_view_if_not_exists':
+        ast.Initial('create_materialized_view_if_not_exists'),
+}
+
+
+@functools.lru_cache(maxsize=1 << 12)
+def _compile(
+        code: types.CodeType
+) -> _Plan:
+    steps: typing.List[typing.Tuple[_Handler, typing.Any, typing.Any]] = []
+
+    for instruction in dis.get_instructions(code):
+        if instruction.opname == 'RETURN_VALUE':
+            return steps, True
+
+        steps.append((
+            _HANDLERS.get(instruction.opname)
+            or _unsupported(instruction.opname),
+            instruction.arg,
+            instruction.argval,
+        ))
+
+    return steps, False
+
+
+def _execute(
+        function: types.FunctionType,
+        arguments: typing.Mapping[str, typing.Any]
+) -> typing.Any:
+    steps, returns = _compile(function.__code__)
+
+    # notice: STORE_GLOBAL may write to the globals
+    global_dict = dict(_GLOBALS)
+    local_dict = dict(arguments)
+
+    # TODO: use types.CellType in type annotation
+    cells: typing.Tuple[typing.Any, ...] = (
+        *(function.__closure__ or ()),
+        *(
+            types.CellType()  # type: ignore[attr-defined]
+            for _ in function.__code__.co_cellvars or ()
+        ),
+    )
+
+    stack: typing.List[typing.Any] = []
+
+    for handler, arg, argval in steps:
+        handler(global_dict, local_dict, cells, stack, arg, argval)
+
+    if returns:
+        assert len(stack) == 1
+
+        return stack.pop()
+
+    return None
+
+
+_signatures: typing.MutableMapping[
+    types.FunctionType,
+    inspect.Signature
+] = weakref.WeakKeyDictionary()
+
+
+def _signature(
+        function: types.FunctionType
+) -> inspect.Signature:
+    signature = _signatures.get(function)
+
+    if signature is None:
+        signature = inspect.signature(function)
+        _signatures[function] = signature
+
+    return signature
+
+
+class _Slot(ast.BaseExpression):
+    # notice: a placeholder of an argument when building skeletons
+    #         any use of it on the python side gives up the skeleton
+
+    __slots__ = ('_index',)
+
+    def __init__(
+            self,
+            index: int
+    ) -> None:
+        self._index = index
+
+    def __format__(self, spec: str) -> str:
+        raise TypeError()
+
+    def __str__(self) -> str:
+        raise TypeError()
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        raise TypeError()
+
+    def __hash__(self) -> int:
+        raise TypeError()
+
+    def _render_expression(self) -> str:
+        return f'\x00{self._index}\x00'
+
+
+_SLOT_PATTERN = re.compile('\x00([0-9]+)\x00')
+
+# notice: code objects of temporary lambdas should not stay alive here
+_skeletons: typing.MutableMapping[
+    types.CodeType,
+    typing.Optional[_Skeleton]
+] = weakref.WeakKeyDictionary()
 
-    return False
+
+def _skeleton(
+        function: types.FunctionType,
+        signature: inspect.Signature
+) -> typing.Optional[_Skeleton]:
+    code = function.__code__
+
+    if code in _skeletons:
+        return _skeletons[code]
+
+    skeleton: typing.Optional[_Skeleton] = None
+
+    # notice: closures may change between calls
+    if not function.__closure__:
+        try:
+            result = _execute(function, {
+                name: _Slot(index)
+                for index, name in enumerate(signature.parameters)
+            })
+
+            if isinstance(result, ast.BaseAST):
+                text = result.render_statement()
+            else:
+                text = ast.Value(result).render_statement()
+
+            parts = _SLOT_PATTERN.split(text)
+            skeleton = [
+                part if index % 2 == 0 else int(part)
+                for index, part in enumerate(parts)
+            ]
+
+            if set(parts[1::2]) != {
+                    str(index)
+                    for index in range(len(signature.parameters))
+            }:
+                skeleton = None
+        except Exception:  # pylint: disable=broad-except
+            skeleton = None
+
+    _skeletons[code] = skeleton
+
+    return skeleton
 
 
 def sql_template(
         function: types.FunctionType
 ) -> types.FunctionType:
-    signature = inspect.signature(function)
-    instructions = list(dis.get_instructions(function))
+    signature = _signature(function)
 
     @functools.wraps(function)
     def build(
@@ -538,66 +1278,7 @@ def sql_template(
         bound_arguments = signature.bind(*args, **kwargs)
         bound_arguments.apply_defaults()
 
-        global_dict: typing.Dict[str, typing.Any] = {
-            # supported queries:
-            #     with ... select ...
-            #     select ...
-            #     insert into ... select ...
-            #     create table ... engine = ... as select ...
-            #     create view ... as select ...
-            #     create materialized view ... as select ...
-            'with_': ast.Initial('with'),
-            'select': ast.Initial('select'),
-            'select_distinct': ast.Initial('select_distinct'),
-            'insert': ast.Initial('insert'),
-            'insert_into': ast.Initial('insert_into'),
-            'create': ast.Initial('create'),
-            'create_table': ast.Initial('create_table'),
-            'create_table_if_not_exists':
-                ast.Initial('create_table_if_not_exists'),
-            'create_view': ast.Initial('create_view'),
-            'create_or_replace_view': ast.Initial('create_or_replace_view'),
-            'create_view_if_not_exists':
-                ast.Initial('create_view_if_not_exists'),
-            'create_materialized_view':
-                ast.Initial('create_materialized_view'),
-            'create_materialized_view_if_not_exists':
-                ast.Initial('create_materialized_view_if_not_exists'),
-        }
-
-        local_dict: typing.Dict[str, typing.Any] = {
-            **bound_arguments.arguments,
-        }
-
-        # TODO: use types.CellType in type annotation
-        cells: typing.Tuple[typing.Any, ...] = (
-            *(function.__closure__ or ()),
-            *(
-                types.CellType()  # type: ignore[attr-defined]
-                for _ in function.__code__.co_cellvars or ()
-            ),
-        )
-
-        stack: typing.List[typing.Any] = []
-
-        # notice: see dis.opmap
-        for instruction in instructions:
-            done = _run(
-                global_dict,
-                local_dict,
-                cells,
-                stack,
-                instruction.opname,
-                instruction.arg,
-                instruction.argval
-            )
-
-            if done:
-                assert len(stack) == 1
-
-                return stack.pop()
-
-        return None
+        return _execute(function, bound_arguments.arguments)
 
     # TODO
     return typing.cast(types.FunctionType, build)
@@ -608,9 +1289,95 @@ def sql_render(
         *args: typing.Any,
         **kwargs: typing.Any
 ) -> str:
-    result = sql_template(function)(*args, **kwargs)
+    signature = _signature(function)
+    bound_arguments = signature.bind(*args, **kwargs)
+    bound_arguments.apply_defaults()
+
+    # fast path: fill the escaped arguments into the rendered skeleton
+
+    skeleton = _skeleton(function, signature)
+    values = list(bound_arguments.arguments.values())
+
+    if skeleton is not None and not any(
+            isinstance(value, ast.BaseAST) or callable(value)
+            for value in values
+    ):
+        return ''.join([
+            ast.escape_value(values[part]) if isinstance(part, int) else part
+            for part in skeleton
+        ])
+
+    result = _execute(function, bound_arguments.arguments)
 
     if isinstance(result, ast.BaseAST):
         return result.render_statement()
 
     return ast.Value(result).render_statement()
+
+
+_parameterized_cache: typing.Dict[typing.Tuple[typing.Any, ...], str] = {}
+
+
+def sql_render_parameters(
+        function: types.FunctionType,
+        *args: typing.Any,
+        **kwargs: typing.Any
+) -> typing.Tuple[str, typing.Dict[str, str]]:
+    signature = inspect.signature(function)
+    bound_arguments = signature.bind(*args, **kwargs)
+    bound_arguments.apply_defaults()
+
+    parameters: typing.Dict[str, str] = {}
+    type_list: typing.List[typing.Tuple[str, str]] = []
+
+    for name, value in bound_arguments.arguments.items():
+        if signature.parameters[name].kind in (
+                inspect.Parameter.VAR_POSITIONAL,
+                inspect.Parameter.VAR_KEYWORD,
+        ):
+            continue
+
+        type_text = ast.infer_type(value)
+
+        if type_text is not None:
+            bound_arguments.arguments[name] = ast.Parameter(name, type_text)
+            parameters[f'param_{name}'] = ast.escape_parameter(value)
+            type_list.append((name, type_text))
+
+    # notice: the text only depends on the types if every value is a parameter
+    cache_key: typing.Optional[typing.Tuple[typing.Any, ...]] = None
+
+    if len(type_list) == len(bound_arguments.arguments):
+        try:
+            cache_key = (
+                function.__code__,
+                *(
+                    cell.cell_contents
+                    for cell in function.__closure__ or ()
+                ),
+                *type_list,
+            )
+            hash(cache_key)
+        except (TypeError, ValueError):
+            cache_key = None
+
+    if cache_key is not None and cache_key in _parameterized_cache:
+        return _parameterized_cache[cache_key], parameters
+
+    result = sql_template(function)(
+        *bound_arguments.args,
+        **bound_arguments.kwargs
+    )
+
+    if isinstance(result, ast.BaseAST):
+        text = result.render_statement()
+    else:
+        text = ast.Value(result).render_statement()
+
+    if cache_key is not None:
+        if len(_parameterized_cache) >= 1 << 12:
+            _parameterized_cache.clear()
+
+        _parameterized_cache[cache_key] = text
+
+    return text, parameters
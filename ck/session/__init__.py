@@ -1,10 +1,22 @@
+from ck.session import cache
+from ck.session import cluster
+from ck.session import fleet
 from ck.session import local
 from ck.session import passive
+from ck.session import pool
 from ck.session import remote
 
 
+Fleet = fleet.Fleet
+
+LocalCluster = cluster.LocalCluster
+
 LocalSession = local.LocalSession
 
+LocalSessionPool = pool.LocalSessionPool
+
 PassiveSession = passive.PassiveSession
 
 RemoteSession = remote.RemoteSession
+
+QueryCache = cache.QueryCache
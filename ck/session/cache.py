@@ -0,0 +1,263 @@
+import collections
+import hashlib
+import pathlib
+import threading
+import time
+import typing
+
+from ck.query import ast
+
+
+def is_cacheable(query: str) -> bool:
+    keyword = query.lstrip()[:6].lower()
+
+    return keyword.startswith('select') or keyword.startswith('with')
+
+
+def make_key(
+        query: str,
+        settings: typing.Dict[str, str],
+        method: str,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        data_list: typing.List[bytes]
+) -> str:
+    # notice: comments end at line breaks, so keep their text as given
+    if not any(marker in query for marker in ('--', '#', '/*')):
+        query = ast.normalize_space(query)
+
+    key_hash = hashlib.sha256(repr((
+        query,
+        sorted(settings.items()),
+        method,
+        host,
+        port,
+        user,
+        password,
+    )).encode())
+
+    for data in data_list:
+        key_hash.update(data)
+
+    return key_hash.hexdigest()
+
+
+def replay(
+        data: bytes,
+        gen_stdin: typing.Generator[bytes, None, None],
+        gen_stdout: typing.Generator[None, bytes, None],
+        join_interval: float = 0.1
+) -> typing.Callable[[], None]:
+    error = None
+
+    # create thread
+
+    def send_data() -> None:
+        nonlocal error
+
+        try:
+            gen_stdin.close()
+
+            next(gen_stdout)
+
+            if data:
+                gen_stdout.send(data)
+
+            gen_stdout.send(b'')
+        except BaseException as raw_error:  # pylint: disable=broad-except
+            error = raw_error
+            gen_stdout.close()
+
+    thread = threading.Thread(target=send_data)
+
+    thread.start()
+
+    # join thread
+
+    def join() -> None:
+        while error is None and thread.is_alive():
+            thread.join(join_interval)
+
+        if error is not None:
+            raise error  # pylint: disable=raising-bad-type
+
+    return join
+
+
+class QueryCache:
+    def __init__(
+            self,
+            max_bytes: int = 1 << 28,
+            ttl: typing.Optional[float] = None,
+            disk_dir: typing.Optional[str] = None,
+            disk_max_bytes: int = 1 << 32
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._disk_path = pathlib.Path(disk_dir) if disk_dir else None
+        self._disk_max_bytes = disk_max_bytes
+
+        self._lock = threading.Lock()
+        self._entries: typing.OrderedDict[
+            str,
+            typing.Tuple[float, bytes]
+        ] = collections.OrderedDict()
+        self._size = 0
+        self._disk_entries: typing.OrderedDict[
+            str,
+            int
+        ] = collections.OrderedDict()
+        self._disk_size = 0
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        if self._disk_path is not None:
+            self._disk_path.mkdir(parents=True, exist_ok=True)
+
+            # notice: scan once, then keep a running size, oldest first
+            stats = sorted(
+                (path.stat().st_mtime, path.name, path.stat().st_size)
+                for path in self._disk_path.iterdir()
+                if not path.name.endswith('.tmp')
+            )
+
+            for _, key, size in stats:
+                self._disk_entries[key] = size
+                self._disk_size += size
+
+    def _expired(self, created: float) -> bool:
+        return self._ttl is not None and time.time() - created > self._ttl
+
+    def _put_memory(
+            self,
+            key: str,
+            created: float,
+            data: bytes
+    ) -> None:
+        if len(data) > self._max_bytes:
+            return
+
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key)[1])
+
+        self._entries[key] = created, data
+        self._size += len(data)
+
+        while self._size > self._max_bytes:
+            _, (_, evicted_data) = self._entries.popitem(last=False)
+            self._size -= len(evicted_data)
+            self._evictions += 1
+
+    def _get_disk(
+            self,
+            key: str
+    ) -> typing.Optional[typing.Tuple[float, bytes]]:
+        if self._disk_path is None:
+            return None
+
+        path = self._disk_path.joinpath(key)
+
+        try:
+            created = path.stat().st_mtime
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        if self._expired(created):
+            path.unlink(missing_ok=True)
+            self._disk_size -= self._disk_entries.pop(key, 0)
+
+            return None
+
+        if key in self._disk_entries:
+            self._disk_entries.move_to_end(key)
+
+        return created, data
+
+    def _put_disk(
+            self,
+            key: str,
+            data: bytes
+    ) -> None:
+        if self._disk_path is None or len(data) > self._disk_max_bytes:
+            return
+
+        # notice: write then rename so readers never see partial files
+        tmp_path = self._disk_path.joinpath(f'{key}.tmp')
+        tmp_path.write_bytes(data)
+        tmp_path.replace(self._disk_path.joinpath(key))
+
+        self._disk_size -= self._disk_entries.pop(key, 0)
+        self._disk_entries[key] = len(data)
+        self._disk_size += len(data)
+
+        while self._disk_size > self._disk_max_bytes:
+            evicted_key, evicted_size = self._disk_entries.popitem(last=False)
+            self._disk_path.joinpath(evicted_key).unlink(missing_ok=True)
+            self._disk_size -= evicted_size
+            self._evictions += 1
+
+    def get(
+            self,
+            key: str
+    ) -> typing.Optional[bytes]:
+        with self._lock:
+            if key in self._entries:
+                created, data = self._entries[key]
+
+                if not self._expired(created):
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+
+                    return data
+
+                self._size -= len(self._entries.pop(key)[1])
+
+            entry = self._get_disk(key)
+
+            if entry is not None:
+                self._put_memory(key, *entry)
+                self._disk_hits += 1
+
+                return entry[1]
+
+            self._misses += 1
+
+            return None
+
+    def put(
+            self,
+            key: str,
+            data: bytes
+    ) -> None:
+        with self._lock:
+            self._put_memory(key, time.time(), data)
+            self._put_disk(key, data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+            if self._disk_path is not None:
+                for path in self._disk_path.iterdir():
+                    path.unlink(missing_ok=True)
+
+            self._disk_entries.clear()
+            self._disk_size = 0
+
+    def metrics(self) -> typing.Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
@@ -0,0 +1,199 @@
+import concurrent.futures
+import pathlib
+import typing
+
+# third-party
+import typing_extensions
+
+from ck import clickhouse
+from ck.session import local
+
+
+class LocalCluster:
+    def __init__(
+            self,
+            shards: int = 2,
+            replicas: int = 1,
+            host: str = 'localhost',
+            tcp_port: int = 9000,
+            http_port: int = 8123,
+            interserver_http_port: int = 9500,
+            user: str = 'default',
+            password: str = '',
+            method: typing_extensions.Literal['tcp', 'http', 'ssh'] = 'http',
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            data_dir: typing.Optional[str] = None,
+            memory_limit: typing.Optional[int] = None,
+            config: typing.Optional[typing.Dict[str, typing.Any]] = None,
+            cluster_name: str = 'ck',
+            keeper: bool = False,
+            keeper_port: int = 9181,
+            keeper_raft_port: int = 9234,
+            auto_start: bool = True,
+            stop: bool = False,
+            start: bool = False
+    ) -> None:
+        if data_dir is None:
+            path = pathlib.Path(f'{clickhouse.default_data_dir()}_cluster')
+        else:
+            path = pathlib.Path(data_dir)
+
+        node_count = shards * replicas
+
+        # notice: the servers share the memory of the host
+        node_memory_limit = (
+            memory_limit
+            or int(clickhouse.detect_memory_size() * 0.8)
+        ) // node_count
+
+        self._cluster_name = cluster_name
+        self._executor = concurrent.futures.ThreadPoolExecutor(node_count)
+        self._sessions: typing.List[local.LocalSession] = []
+
+        # generate cluster config
+
+        cluster_data: typing.Dict[str, typing.Any] = {
+            'remote_servers': {
+                cluster_name: {
+                    'shard': [
+                        {
+                            'internal_replication': 'true',
+                            'replica': [
+                                {
+                                    'host': host,
+                                    'port': str(
+                                        tcp_port + shard * replicas + replica
+                                    ),
+                                    'user': user,
+                                    'password': password,
+                                }
+                                for replica in range(replicas)
+                            ],
+                        }
+                        for shard in range(shards)
+                    ],
+                },
+            },
+        }
+
+        if keeper:
+            cluster_data['zookeeper'] = {
+                'node': {
+                    'host': host,
+                    'port': str(keeper_port),
+                },
+            }
+            cluster_data['distributed_ddl'] = {
+                'path': '/clickhouse/task_queue/ddl',
+            }
+
+        # create sessions
+
+        for shard in range(shards):
+            for replica in range(replicas):
+                index = shard * replicas + replica
+                node_path = path.joinpath(f'shard_{shard}_replica_{replica}')
+
+                keeper_data: typing.Dict[str, typing.Any] = {}
+
+                # notice: the first server runs the embedded keeper
+                if keeper and index == 0:
+                    coordination_path = node_path.joinpath('coordination')
+
+                    keeper_data['keeper_server'] = {
+                        'tcp_port': str(keeper_port),
+                        'server_id': '1',
+                        'log_storage_path':
+                            str(coordination_path.joinpath('log')),
+                        'snapshot_storage_path':
+                            str(coordination_path.joinpath('snapshot')),
+                        'raft_configuration': {
+                            'server': {
+                                'id': '1',
+                                'hostname': host,
+                                'port': str(keeper_raft_port),
+                            },
+                        },
+                    }
+
+                node_config = {
+                    **cluster_data,
+                    'macros': {
+                        'cluster': cluster_name,
+                        'shard': str(shard),
+                        'replica': str(replica),
+                    },
+                    'interserver_http_host': host,
+                    'interserver_http_port': str(
+                        interserver_http_port + index
+                    ),
+                    **keeper_data,
+                    **(config or {}),
+                }
+
+                self._sessions.append(local.LocalSession(
+                    host=host,
+                    tcp_port=tcp_port + index,
+                    http_port=http_port + index,
+                    user=user,
+                    password=password,
+                    method=method,
+                    settings=settings,
+                    data_dir=str(node_path),
+                    memory_limit=node_memory_limit,
+                    config=node_config,
+                    auto_start=auto_start
+                ))
+
+        if stop:
+            self.stop()
+
+        if start:
+            self.start()
+
+    def _map(
+            self,
+            function: typing.Callable[[local.LocalSession], typing.Any]
+    ) -> typing.List[typing.Any]:
+        futures = [
+            self._executor.submit(function, session)
+            for session in self._sessions
+        ]
+
+        return [future.result() for future in futures]
+
+    @property
+    def cluster_name(self) -> str:
+        return self._cluster_name
+
+    @property
+    def sessions(self) -> typing.List[local.LocalSession]:
+        return list(self._sessions)
+
+    @property
+    def session(self) -> local.LocalSession:
+        return self._sessions[0]
+
+    def get_pid(self) -> typing.List[typing.Optional[int]]:
+        return self._map(lambda session: session.get_pid())
+
+    def start(
+            self,
+            ping_interval: float = 0.1,
+            ping_retry: int = 50
+    ) -> typing.List[typing.Optional[int]]:
+        return self._map(
+            lambda session: session.start(ping_interval, ping_retry)
+        )
+
+    def stop(
+            self,
+            ping_interval: float = 0.1,
+            ping_retry: int = 50
+    ) -> typing.List[typing.Optional[int]]:
+        return self._map(
+            lambda session: session.stop(ping_interval, ping_retry)
+        )
+
+    def close(self) -> None:
+        self._executor.shutdown()
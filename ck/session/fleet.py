@@ -0,0 +1,213 @@
+import concurrent.futures
+import sys
+import time
+import typing
+
+# third-party
+import typing_extensions
+
+from ck import exception
+from ck.session import remote
+
+
+T = typing.TypeVar('T')
+
+FleetResults = typing.Dict[
+    str,
+    typing.Tuple[typing.Any, typing.Optional[BaseException]]
+]
+
+
+class Fleet:
+    def __init__(
+            self,
+            hosts: typing.Dict[str, typing.Dict[str, typing.Any]],
+            max_workers: int = 16,
+            timeout: typing.Optional[float] = None
+    ) -> None:
+        self._names = list(hosts)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+        self._timeout = timeout
+        self._sessions: typing.Dict[str, remote.RemoteSession] = {}
+        self._errors: typing.Dict[str, BaseException] = {}
+
+        # connect
+
+        # notice: the timeout also bounds the ssh handshake, so a host
+        #         that never answers does not keep a worker busy
+        joins = self._submit(
+            lambda name: remote.RemoteSession(**{
+                'ssh_timeout': timeout,
+                **hosts[name],
+            }),
+            list(hosts)
+        )
+
+        for name, join in joins.items():
+            try:
+                self._sessions[name] = join()
+            except Exception as error:  # pylint: disable=broad-except
+                self._errors[name] = error
+
+    def _submit(
+            self,
+            function: typing.Callable[[str], T],
+            names: typing.List[str],
+            join_interval: float = 0.1
+    ) -> typing.Dict[str, typing.Callable[[], T]]:
+        start_times: typing.Dict[str, float] = {}
+
+        def run(name: str) -> T:
+            start_times[name] = time.perf_counter()
+
+            return function(name)
+
+        def make_join(
+                name: str,
+                future: 'concurrent.futures.Future[T]'
+        ) -> typing.Callable[[], T]:
+            def join() -> T:
+                # notice: the timeout of a host starts with its task
+                #         waiting in the queue is not counted
+                while self._timeout is not None and not future.done():
+                    start_time = start_times.get(name)
+
+                    if (
+                            start_time is not None
+                            and time.perf_counter() - start_time
+                            > self._timeout
+                    ):
+                        raise TimeoutError(
+                            f'{name} timed out after {self._timeout} seconds'
+                        )
+
+                    concurrent.futures.wait([future], join_interval)
+
+                return future.result()
+
+            return join
+
+        return {
+            name: make_join(name, self._executor.submit(run, name))
+            for name in names
+        }
+
+    def _map(
+            self,
+            function: typing.Callable[[remote.RemoteSession], T],
+            names: typing.Optional[typing.List[str]]
+    ) -> FleetResults:
+        real_names = self._names if names is None else names
+
+        joins = self._submit(
+            lambda name: function(self._sessions[name]),
+            [
+                name
+                for name in real_names
+                if name in self._sessions
+            ]
+        )
+
+        results: FleetResults = {}
+
+        for name in real_names:
+            if name in joins:
+                try:
+                    results[name] = joins[name](), None
+                except Exception as error:  # pylint: disable=broad-except
+                    results[name] = None, error
+            else:
+                results[name] = None, self._errors.get(name, KeyError(name))
+
+        return results
+
+    @property
+    def sessions(self) -> typing.Dict[str, remote.RemoteSession]:
+        return dict(self._sessions)
+
+    def get_pid(
+            self,
+            names: typing.Optional[typing.List[str]] = None
+    ) -> FleetResults:
+        return self._map(
+            lambda session: session.get_pid(),
+            names
+        )
+
+    def start(
+            self,
+            names: typing.Optional[typing.List[str]] = None,
+            ping_interval: float = 0.1,
+            ping_retry: int = 50
+    ) -> FleetResults:
+        return self._map(
+            lambda session: session.start(ping_interval, ping_retry),
+            names
+        )
+
+    def stop(
+            self,
+            names: typing.Optional[typing.List[str]] = None,
+            ping_interval: float = 0.1,
+            ping_retry: int = 50
+    ) -> FleetResults:
+        return self._map(
+            lambda session: session.stop(ping_interval, ping_retry),
+            names
+        )
+
+    def restart(
+            self,
+            names: typing.Optional[typing.List[str]] = None,
+            ping_interval: float = 0.1,
+            ping_retry: int = 50
+    ) -> FleetResults:
+        # notice: at most max_workers hosts are down at the same time
+        def restart_session(session: remote.RemoteSession) -> int:
+            session.stop(ping_interval, ping_retry)
+            pid = session.start(ping_interval, ping_retry)
+
+            if pid is None:
+                # pylint: disable=protected-access
+                raise exception.ServiceError(
+                    session._host,
+                    'server is still running after stop'
+                )
+
+            return pid
+
+        return self._map(restart_session, names)
+
+    def ping(
+            self,
+            names: typing.Optional[typing.List[str]] = None,
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ] = None
+    ) -> FleetResults:
+        return self._map(
+            lambda session: session.ping(method),
+            names
+        )
+
+    def query(
+            self,
+            query: str,
+            data: bytes = b'',
+            names: typing.Optional[typing.List[str]] = None,
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ] = None,
+            settings: typing.Optional[typing.Dict[str, str]] = None
+    ) -> FleetResults:
+        return self._map(
+            lambda session: session.query(query, data, method, settings),
+            names
+        )
+
+    def close(self) -> None:
+        # notice: queued tasks are only cancelled since python 3.9
+        if sys.version_info >= (3, 9):
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,72 @@
+import threading
+import typing
+
+
+class Flight:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._data: typing.Optional[bytes] = None
+        self._error: typing.Optional[BaseException] = None
+
+    def finish(
+            self,
+            data: typing.Optional[bytes],
+            error: typing.Optional[BaseException]
+    ) -> None:
+        self._data = data
+        self._error = error
+        self._event.set()
+
+    def wait(self) -> bytes:
+        self._event.wait()
+
+        if self._error is not None:
+            raise self._error
+
+        assert self._data is not None
+
+        return self._data
+
+
+def follow(
+        flight: Flight,
+        gen_stdin: typing.Generator[bytes, None, None],
+        gen_stdout: typing.Generator[None, bytes, None],
+        join_interval: float = 0.1
+) -> typing.Callable[[], None]:
+    error = None
+
+    # create thread
+
+    def receive_data() -> None:
+        nonlocal error
+
+        try:
+            gen_stdin.close()
+
+            data = flight.wait()
+
+            next(gen_stdout)
+
+            if data:
+                gen_stdout.send(data)
+
+            gen_stdout.send(b'')
+        except BaseException as raw_error:  # pylint: disable=broad-except
+            error = raw_error
+            gen_stdout.close()
+
+    thread = threading.Thread(target=receive_data)
+
+    thread.start()
+
+    # join thread
+
+    def join() -> None:
+        while error is None and thread.is_alive():
+            thread.join(join_interval)
+
+        if error is not None:
+            raise error  # pylint: disable=raising-bad-type
+
+    return join
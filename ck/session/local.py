@@ -1,18 +1,38 @@
+import json
 import os
 import pathlib
+import re
 import time
 import typing
+import uuid
 
 # third-party
 import typing_extensions
 
+if typing.TYPE_CHECKING:
+    import pyarrow  # type: ignore[import]
+
 from ck import clickhouse
 from ck import connection
 from ck import exception
 from ck import iteration
+from ck.clickhouse import control
+from ck.session import cache
+from ck.query import ast
 from ck.session import passive
 
 
+_INSERT_FORMAT = re.compile(
+    r'\s*insert\s+into\s+(.+?)\s+format\s+(\w+)\s*',
+    re.IGNORECASE | re.DOTALL
+)
+_ERROR_CODE = re.compile(rb'Code: ([0-9]+)')
+
+# notice: bad arguments, unknown function, file does not exist, readonly,
+#         access denied to the path, access denied
+_REJECTED_CODES = {36, 46, 107, 164, 291, 497}
+
+
 class LocalSession(passive.PassiveSession):
     def __init__(
             self,
@@ -34,7 +54,17 @@ class LocalSession(passive.PassiveSession):
             config: typing.Optional[typing.Dict[str, typing.Any]] = None,
             auto_start: bool = True,
             stop: bool = False,
-            start: bool = False
+            start: bool = False,
+            ssh_tunnel: bool = False,
+            ssh_compression: typing.Optional[
+                typing_extensions.Literal['transport', 'zstd']
+            ] = None,
+            query_cache: typing.Optional[cache.QueryCache] = None,
+            single_flight: bool = False,
+            storage: typing.Optional[
+                typing.Dict[str, typing.List[str]]
+            ] = None,
+            user_files_ingest: bool = True
     ) -> None:
         super().__init__(
             host,
@@ -49,7 +79,11 @@ class LocalSession(passive.PassiveSession):
             ssh_username,
             ssh_password,
             ssh_public_key,
-            ssh_command_prefix
+            ssh_command_prefix,
+            ssh_tunnel,
+            ssh_compression,
+            query_cache,
+            single_flight
         )
 
         if data_dir is None:
@@ -59,6 +93,8 @@ class LocalSession(passive.PassiveSession):
 
         self._memory_limit = memory_limit or 0
         self._config = config or {}
+        self._storage = storage or {}
+        self._user_files_ingest = user_files_ingest
         self._auto_start = auto_start
 
         if stop:
@@ -72,25 +108,7 @@ class LocalSession(passive.PassiveSession):
             self.start()
 
     def get_pid(self) -> typing.Optional[int]:
-        pid_path = self._path.joinpath('pid')
-
-        # get pid
-
-        try:
-            pid_text, = pid_path.open().read().splitlines()
-        except FileNotFoundError:
-            return None
-
-        pid = int(pid_text)
-
-        # find process
-
-        try:
-            os.kill(pid, 0)
-        except OSError:
-            return None
-
-        return pid
+        return control.status(str(self._path))
 
     def start(
             self,
@@ -118,11 +136,14 @@ class LocalSession(passive.PassiveSession):
             self._password,
             str(self._path),
             self._memory_limit,
-            self._config
+            self._config,
+            self._storage
         )
 
         # run
 
+        start_time = time.perf_counter()
+
         if connection.run_process(
                 [
                     clickhouse.binary_file(),
@@ -139,21 +160,17 @@ class LocalSession(passive.PassiveSession):
 
         # wait for server initialization
 
-        for _ in range(ping_retry):
-            pid = self.get_pid()
-
-            if pid is not None:
-                break
-
-            time.sleep(ping_interval)
-        else:
-            raise exception.ServiceError(self._host, 'pid')
-
-        while not self.ping():
-            time.sleep(ping_interval)
+        try:
+            pid = control.wait_ready(
+                str(self._path),
+                self._http_port,
+                ping_interval,
+                ping_retry
+            )
+        except exception.ServiceError as error:
+            raise exception.ServiceError(self._host, str(error)) from error
 
-            if self.get_pid() is None:
-                raise exception.ServiceError(self._host, f'pid_{pid}')
+        self._record_start(start_time)
 
         return pid
 
@@ -162,24 +179,305 @@ class LocalSession(passive.PassiveSession):
             ping_interval: float = 0.1,
             ping_retry: int = 50
     ) -> typing.Optional[int]:
-        pid = self.get_pid()
+        return control.stop(str(self._path), ping_interval, ping_retry)
+
+    def _user_files_path(self) -> pathlib.Path:
+        return pathlib.Path(
+            self._config.get(
+                'user_files_path',
+                self._path.joinpath('user_files')
+            )
+        )
 
-        if pid is None:
-            return None
+    def query_file_async(
+            self,
+            query: str,
+            path_in: typing.Optional[str] = None,
+            path_out: typing.Optional[str] = None,
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ] = None,
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
+    ) -> typing.Callable[[], None]:
+        match = _INSERT_FORMAT.fullmatch(query)
+
+        def stream() -> typing.Callable[[], None]:
+            return super(LocalSession, self).query_file_async(
+                query,
+                path_in,
+                path_out,
+                method,
+                settings,
+                external
+            )
+
+        if (
+                not self._user_files_ingest
+                or path_in is None
+                or path_out is not None
+                or external
+                or match is None
+        ):
+            return stream()
+
+        table, data_format = match.groups()
+
+        # notice: with the structure of the table, the file is matched by
+        #         names or positions in the same way as streamed data
 
-        # kill process
+        try:
+            structure_text = ', '.join(
+                f'{ast.escape_text(name, "`")} {type_text}'
+                for name, type_text, default_type, *_ in (
+                    json.loads(line)
+                    for line in self.query(
+                        f'describe table {table} format JSONCompactEachRow',
+                        method=method,
+                        settings=settings
+                    ).decode().splitlines()
+                )
+                if default_type in ('', 'DEFAULT')
+            )
+        except exception.QueryError:
+            return stream()
+
+        # notice: the server reads the file from user_files by itself and
+        #         parses it in parallel, so no data goes through the client
+        # notice: no symlinks, since servers reject links out of user_files
+
+        link_name = f'ck_ingest_{uuid.uuid4().hex}'
+        link_path = self._user_files_path().joinpath(link_name)
 
-        os.kill(pid, 15)
+        try:
+            link_path.parent.mkdir(parents=True, exist_ok=True)
+            os.link(path_in, link_path)
+        except OSError:
+            return stream()
 
-        for _ in range(ping_retry):
-            if self.get_pid() is None:
-                break
+        file_text = ', '.join(
+            ast.escape_text(text, '\'')
+            for text in (link_name, data_format, structure_text)
+        )
 
-            time.sleep(ping_interval)
-        else:
-            os.kill(pid, 9)
+        try:
+            join = super().query_file_async(
+                f'insert into {table} select * from file({file_text})',
+                None,
+                None,
+                method,
+                settings
+            )
+        except BaseException:
+            link_path.unlink(missing_ok=True)
+
+            raise
+
+        def join_and_unlink() -> None:
+            rejected = False
+
+            try:
+                join()
+            except exception.QueryError as error:
+                # notice: only errors raised before reading any data, so
+                #         nothing is inserted twice
+                code_match = _ERROR_CODE.search(error.args[-1])
+
+                if (
+                        code_match is None
+                        or int(code_match.group(1)) not in _REJECTED_CODES
+                ):
+                    raise
+
+                rejected = True
+            finally:
+                link_path.unlink(missing_ok=True)
+
+            if rejected:
+                stream()()
+
+        return join_and_unlink
+
+    def _query_empty_arrow(
+            self,
+            query: str,
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ],
+            settings: typing.Optional[typing.Dict[str, str]],
+            external: typing.Optional[typing.List[ast.ExternalTable]]
+    ) -> 'pyarrow.Table':
+        # pylint: disable=import-outside-toplevel
+        import pyarrow.ipc  # type: ignore[import]
+
+        # notice: describe does not run the query, but still needs the
+        #         external tables, whose data is already consumed
+        columns = [
+            json.loads(line)
+            for line in self.query(
+                f'describe ({query}) format JSONCompactEachRow',
+                method=method,
+                settings=settings,
+                external=[
+                    ast.ExternalTable(
+                        table.name,
+                        table.structure,
+                        iteration.empty_in(),
+                        table.data_format
+                    )
+                    for table in external or []
+                ]
+            ).decode().splitlines()
+        ]
+
+        columns_text = ', '.join(
+            f'defaultValueOfTypeName({ast.escape_value(type_text)}) '
+            f'as {ast.escape_text(name, "`")}'
+            for name, type_text, *_ in columns
+        )
 
-            while self.get_pid() is not None:
-                time.sleep(ping_interval)
+        return pyarrow.ipc.open_stream(self.query(
+            f'select {columns_text} limit 0 format ArrowStream',
+            method=method,
+            settings=settings
+        )).read_all()
 
-        return pid
+    def query_arrow_async(
+            self,
+            query: str,
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ] = None,
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
+    ) -> typing.Callable[[], 'pyarrow.Table']:
+        # notice: these are slow to import, so they are imported on demand
+        # pylint: disable=import-outside-toplevel
+        import pyarrow  # type: ignore[import]
+        import pyarrow.ipc  # type: ignore[import]
+
+        # notice: the server writes the result into user_files by itself,
+        #         and the table maps the file, so no data is copied
+        export_name = f'ck_export_{uuid.uuid4().hex}.arrow'
+        export_path = self._user_files_path().joinpath(export_name)
+        export_path.parent.mkdir(parents=True, exist_ok=True)
+
+        raw_join = self._run(
+            f'insert into function file(\'{export_name}\', \'Arrow\') '
+            f'{query}',
+            iteration.empty_in(),
+            iteration.empty_out(),
+            method,
+            settings,
+            external
+        )
+
+        def join() -> 'pyarrow.Table':
+            try:
+                raw_join()
+
+                source = pyarrow.memory_map(str(export_path))
+            except FileNotFoundError:
+                # notice: no file is written if the result is empty
+                return self._query_empty_arrow(
+                    query,
+                    method,
+                    settings,
+                    external
+                )
+            finally:
+                # notice: the mapping keeps the data alive until the table
+                #         is released, and the file is gone after that
+                export_path.unlink(missing_ok=True)
+
+            return pyarrow.ipc.open_file(source).read_all()
+
+        return join
+
+    def query_arrow(
+            self,
+            query: str,
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ] = None,
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
+    ) -> 'pyarrow.Table':
+        return self.query_arrow_async(
+            query,
+            method,
+            settings,
+            external
+        )()
+
+    def _snapshot_dirs(
+            self,
+            name: str
+    ) -> typing.List[typing.Tuple[pathlib.Path, pathlib.Path]]:
+        if name in ('', '.', '..') or pathlib.Path(name).name != name:
+            raise ValueError(f'invalid snapshot name: {name!r}')
+
+        dirs = [
+            (
+                self._path,
+                self._path.parent.joinpath(
+                    f'{self._path.name}_snapshots',
+                    name
+                ),
+            ),
+        ]
+
+        # notice: parts on storage disks belong to the snapshot as well
+        for tier_name, tier_dirs in self._storage.items():
+            for index, tier_dir in enumerate(tier_dirs):
+                dirs.append((
+                    pathlib.Path(tier_dir),
+                    self._path.parent.joinpath(
+                        f'{self._path.name}_snapshots_storage',
+                        name,
+                        f'{tier_name}_{index}'
+                    ),
+                ))
+
+        return dirs
+
+    def snapshot(
+            self,
+            name: str,
+            ping_interval: float = 0.1,
+            ping_retry: int = 50
+    ) -> None:
+        snapshot_dirs = self._snapshot_dirs(name)
+
+        # notice: stop the server, so the files are consistent
+        pid = self.stop(ping_interval, ping_retry)
+
+        try:
+            for live_path, snapshot_path in snapshot_dirs:
+                control.clone_dir(str(live_path), str(snapshot_path))
+        finally:
+            if pid is not None:
+                self.start(ping_interval, ping_retry)
+
+    def restore(
+            self,
+            name: str,
+            ping_interval: float = 0.1,
+            ping_retry: int = 50
+    ) -> None:
+        snapshot_dirs = self._snapshot_dirs(name)
+
+        if not all(
+                snapshot_path.is_dir()
+                for _, snapshot_path in snapshot_dirs
+        ):
+            raise exception.ServiceError(self._host, f'snapshot_{name}')
+
+        pid = self.stop(ping_interval, ping_retry)
+
+        try:
+            for live_path, snapshot_path in snapshot_dirs:
+                control.clone_dir(str(snapshot_path), str(live_path))
+        finally:
+            if pid is not None:
+                self.start(ping_interval, ping_retry)
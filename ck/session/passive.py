@@ -1,19 +1,28 @@
+import contextlib
+import os
+import shlex
+import shutil
+import tempfile
 import threading
+import time
 import typing
 import urllib.parse
 import uuid
 
 # third-party
-import numpy
-import pandas  # type: ignore[import]
-import paramiko
-import pyarrow  # type: ignore[import]
 import typing_extensions
 
+if typing.TYPE_CHECKING:
+    import pandas  # type: ignore[import]
+    import paramiko
+
 from ck import exception
 from ck import clickhouse
 from ck import connection
 from ck import iteration
+from ck.query import ast
+from ck.session import cache
+from ck.session import flight
 
 
 class PassiveSession:
@@ -31,7 +40,14 @@ class PassiveSession:
             ssh_username: typing.Optional[str] = None,
             ssh_password: typing.Optional[str] = None,
             ssh_public_key: typing.Optional[str] = None,
-            ssh_command_prefix: typing.Optional[typing.List[str]] = None
+            ssh_command_prefix: typing.Optional[typing.List[str]] = None,
+            ssh_tunnel: bool = False,
+            ssh_compression: typing.Optional[
+                typing_extensions.Literal['transport', 'zstd']
+            ] = None,
+            query_cache: typing.Optional[cache.QueryCache] = None,
+            single_flight: bool = False,
+            ssh_timeout: typing.Optional[float] = None
     ) -> None:
         self._host = host
         self._tcp_port = tcp_port
@@ -46,53 +62,139 @@ class PassiveSession:
         self._ssh_password = ssh_password
         self._ssh_public_key = ssh_public_key
         self._ssh_command_prefix = ssh_command_prefix or []
-
-        self._ssh_client: typing.Optional[paramiko.SSHClient] = None
+        self._ssh_tunnel = ssh_tunnel
+        self._ssh_compression = ssh_compression
+        self._query_cache = query_cache
+        self._single_flight = single_flight
+        self._ssh_timeout = ssh_timeout
+
+        self._ssh_lock = threading.Lock()
+        self._ssh_client: typing.Optional['paramiko.SSHClient'] = None
         self._ssh_default_data_dir: typing.Optional[str] = None
         self._ssh_binary_file: typing.Optional[str] = None
+        self._ssh_http_pool: typing.Optional[connection.HTTPPool] = None
 
-    def _require_ssh(self) -> None:
-        # connect
+        self._flight_lock = threading.Lock()
+        self._flights: typing.Dict[str, flight.Flight] = {}
 
-        if self._ssh_client is None:
-            self._ssh_client = connection.connect_ssh(
-                self._host,
-                self._ssh_port,
-                self._ssh_username,
-                self._ssh_password,
-                self._ssh_public_key
-            )
+        self._stats_lock = threading.Lock()
+        self._query_stats: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        self._start_stats: typing.Dict[str, typing.Any] = {
+            'count': 0,
+            'seconds': 0.0,
+            'last_seconds': None,
+        }
 
-        # lookup
+    def _require_ssh(self, lookup: bool = True) -> None:
+        with self._ssh_lock:
+            # connect
 
-        stdout_list: typing.List[bytes] = []
-        stderr_list: typing.List[bytes] = []
+            if self._ssh_client is not None:
+                transport = self._ssh_client.get_transport()
 
-        if connection.run_ssh(
-                self._ssh_client,
-                [
-                    *self._ssh_command_prefix,
-                    'python3',
-                    '-m',
-                    'ck.clickhouse.lookup',
-                ],
-                iteration.empty_in(),
-                iteration.collect_out(stdout_list),
-                iteration.collect_out(stderr_list)
-        )():
-            raise exception.ShellError(
-                self._host,
-                b''.join(stderr_list)
-            )
+                if transport is None or not transport.is_active():
+                    # notice: reconnect if the transport is dead
+                    self._ssh_client.close()
+                    self._ssh_client = None
 
-        (
-            self._ssh_default_data_dir,
-            self._ssh_binary_file,
-        ) = b''.join(stdout_list).decode().splitlines()
+            if self._ssh_client is None:
+                ssh_client = connection.connect_ssh(
+                    self._host,
+                    self._ssh_port,
+                    self._ssh_username,
+                    self._ssh_password,
+                    self._ssh_public_key,
+                    compress=self._ssh_compression == 'transport',
+                    timeout=self._ssh_timeout
+                )
+
+                if self._ssh_http_pool is not None:
+                    self._ssh_http_pool.close()
+
+                # notice: http connections are tunneled to the remote host
+                self._ssh_client = ssh_client
+                self._ssh_http_pool = connection.HTTPPool(
+                    'localhost',
+                    self._http_port,
+                    lambda: connection.open_tunnel(
+                        ssh_client,
+                        'localhost',
+                        self._http_port
+                    )
+                )
+
+            # lookup
+
+            if not lookup or self._ssh_binary_file is not None:
+                return
+
+            stdout_list: typing.List[bytes] = []
+            stderr_list: typing.List[bytes] = []
+
+            if connection.run_ssh(
+                    self._ssh_client,
+                    [
+                        *self._ssh_command_prefix,
+                        'python3',
+                        '-m',
+                        'ck.clickhouse.lookup',
+                    ],
+                    iteration.empty_in(),
+                    iteration.collect_out(stdout_list),
+                    iteration.collect_out(stderr_list)
+            )():
+                raise exception.ShellError(
+                    self._host,
+                    b''.join(stderr_list)
+                )
+
+            (
+                self._ssh_default_data_dir,
+                self._ssh_binary_file,
+            ) = b''.join(stdout_list).decode().splitlines()
 
     def _prepare(self) -> None:
         pass
 
+    def _fail(self) -> None:
+        pass
+
+    def _record(
+            self,
+            query: str,
+            start_time: float,
+            end_time: float,
+            error: bool
+    ) -> None:
+        query_pattern = ast.normalize_pattern(query)
+        query_fingerprint = ast.pattern_fingerprint(query_pattern)
+        duration = end_time - start_time
+
+        with self._stats_lock:
+            if query_fingerprint not in self._query_stats:
+                self._query_stats[query_fingerprint] = {
+                    'pattern': query_pattern,
+                    'count': 0,
+                    'errors': 0,
+                    'seconds': 0.0,
+                }
+
+            query_stat = self._query_stats[query_fingerprint]
+            query_stat['count'] += 1
+            query_stat['errors'] += int(error)
+            query_stat['seconds'] += duration
+
+    def _record_start(
+            self,
+            start_time: float
+    ) -> None:
+        duration = time.perf_counter() - start_time
+
+        with self._stats_lock:
+            self._start_stats['count'] += 1
+            self._start_stats['seconds'] += duration
+            self._start_stats['last_seconds'] = duration
+
     def _run(
             self,
             query: str,
@@ -101,20 +203,60 @@ class PassiveSession:
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ],
-            settings: typing.Optional[typing.Dict[str, str]]
+            settings: typing.Optional[typing.Dict[str, str]],
+            external: typing.Optional[typing.List[ast.ExternalTable]]
     ) -> typing.Callable[[], None]:
-        self._prepare()
+        start_time = time.perf_counter()
 
-        # create connection(s)
+        # notice: the query is done once its output ends
+        #         the caller may join much later
+        end_time_list: typing.List[float] = []
 
-        stderr_list: typing.List[bytes] = []
+        try:
+            raw_join = self._dispatch(
+                query,
+                gen_in,
+                iteration.timed_out(gen_out, end_time_list),
+                method,
+                settings,
+                external
+            )
+        except BaseException:
+            self._fail()
+            self._record(query, start_time, time.perf_counter(), True)
 
-        gen_stdin = iteration.concat_in(
-            iteration.given_in([f'{query}\n'.encode()]),
-            gen_in
-        )
-        gen_stdout = gen_out
-        gen_stderr = iteration.collect_out(stderr_list)
+            raise
+
+        def join() -> None:
+            try:
+                raw_join()
+            except BaseException:
+                self._fail()
+                self._record(query, start_time, time.perf_counter(), True)
+
+                raise
+
+            self._record(
+                query,
+                start_time,
+                end_time_list[0] if end_time_list else time.perf_counter(),
+                False
+            )
+
+        return join
+
+    def _dispatch(
+            self,
+            query: str,
+            gen_in: typing.Generator[bytes, None, None],
+            gen_out: typing.Generator[None, bytes, None],
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ],
+            settings: typing.Optional[typing.Dict[str, str]],
+            external: typing.Optional[typing.List[ast.ExternalTable]]
+    ) -> typing.Callable[[], None]:
+        self._prepare()
 
         real_method = method or self._method
         real_settings = {
@@ -129,30 +271,271 @@ class PassiveSession:
             **(settings or {}),
         }
 
-        if real_method == 'tcp':
-            raw_join = connection.run_process(
+        if (
+                self._query_cache is None and not self._single_flight
+                or not cache.is_cacheable(query)
+                or external
+        ):
+            return self._execute(
+                query,
+                gen_in,
+                gen_out,
+                real_method,
+                real_settings,
+                external or []
+            )
+
+        # notice: the input is part of the key, so it is read ahead
+        #         cacheable queries rarely have large inputs
+        input_list = list(gen_in)
+        gen_in = iteration.given_in(input_list)
+
+        query_key = cache.make_key(
+            query,
+            real_settings,
+            real_method,
+            self._host,
+            self._http_port if real_method == 'http' else self._tcp_port,
+            self._user,
+            self._password,
+            input_list
+        )
+
+        # lookup cache
+
+        if self._query_cache is not None:
+            cached_data = self._query_cache.get(query_key)
+
+            if cached_data is not None:
+                return cache.replay(cached_data, gen_in, gen_out)
+
+        # attach to an identical query in flight
+
+        query_flight = flight.Flight()
+
+        if self._single_flight:
+            with self._flight_lock:
+                if query_key in self._flights:
+                    return flight.follow(
+                        self._flights[query_key],
+                        gen_in,
+                        gen_out
+                    )
+
+                self._flights[query_key] = query_flight
+
+        def land(
+                data: typing.Optional[bytes],
+                error: typing.Optional[BaseException]
+        ) -> None:
+            if self._single_flight:
+                with self._flight_lock:
+                    del self._flights[query_key]
+
+            query_flight.finish(data, error)
+
+        # execute
+
+        data_list: typing.List[bytes] = []
+
+        try:
+            raw_join = self._execute(
+                query,
+                gen_in,
+                iteration.tee_out(gen_out, data_list),
+                real_method,
+                real_settings,
+                external or []
+            )
+        except BaseException as error:
+            land(None, error)
+
+            raise
+
+        # notice: the query completes in its own thread, so followers never
+        #         wait for the caller to join
+
+        def complete() -> None:
+            try:
+                raw_join()
+            except BaseException as error:  # pylint: disable=broad-except
+                land(None, error)
+
+                return
+
+            data = b''.join(data_list)
+
+            if self._query_cache is not None:
+                self._query_cache.put(query_key, data)
+
+            land(data, None)
+
+        threading.Thread(target=complete).start()
+
+        def join() -> None:
+            query_flight.wait()
+
+        return join
+
+    def _execute(
+            self,
+            query: str,
+            gen_in: typing.Generator[bytes, None, None],
+            gen_out: typing.Generator[None, bytes, None],
+            real_method: typing_extensions.Literal['tcp', 'http', 'ssh'],
+            real_settings: typing.Dict[str, str],
+            external: typing.List[ast.ExternalTable]
+    ) -> typing.Callable[[], None]:
+        # prepare external table(s)
+
+        external_args: typing.List[str] = []
+        external_headers: typing.Dict[str, str] = {}
+        fifo_dir: typing.Optional[str] = None
+        fifo_joins: typing.List[typing.Callable[[], None]] = []
+
+        def cleanup() -> None:
+            errors: typing.List[BaseException] = []
+
+            # notice: every fifo is joined, even if some of them fail
+            for fifo_join in fifo_joins:
+                try:
+                    fifo_join()
+                except BaseException as error:  # pylint: disable=broad-except
+                    errors.append(error)
+
+            if fifo_dir is not None:
+                shutil.rmtree(fifo_dir, ignore_errors=True)
+
+            if errors:
+                raise errors[0]
+
+        if not external:
+            gen_stdin = iteration.concat_in(
+                iteration.given_in([f'{query}\n'.encode()]),
+                gen_in
+            )
+        elif real_method == 'tcp':
+            # notice: each table is streamed through a fifo
+            fifo_dir = tempfile.mkdtemp(prefix='ck_external_')
+
+            try:
+                for index, table in enumerate(external):
+                    fifo_path = os.path.join(fifo_dir, str(index))
+                    fifo_joins.append(
+                        connection.run_fifo(fifo_path, table.gen_data)
+                    )
+                    external_args.extend([
+                        '--external',
+                        f'--file={fifo_path}',
+                        f'--name={table.name}',
+                        f'--structure={table.structure_text}',
+                        f'--format={table.data_format}',
+                    ])
+            except BaseException:
+                with contextlib.suppress(Exception):
+                    cleanup()
+
+                raise
+
+            external_args.insert(0, f'--query={query}')
+            gen_stdin = gen_in
+        elif real_method == 'http':
+            # notice: the body is a multipart form, so the query goes to url
+            if any(gen_in):
+                raise ValueError(
+                    'input data cannot be sent with external tables via http'
+                )
+
+            boundary = uuid.uuid4().hex
+            real_settings = {
+                **real_settings,
+                'query': query,
+            }
+
+            for table in external:
+                real_settings[f'{table.name}_structure'] = table.structure_text
+                real_settings[f'{table.name}_format'] = table.data_format
+
+            external_headers['Content-Type'] = \
+                f'multipart/form-data; boundary={boundary}'
+            gen_stdin = iteration.multipart_in(
+                boundary,
                 [
-                    clickhouse.binary_file(),
-                    'client',
-                    f'--host={self._host}',
-                    f'--port={self._tcp_port}',
-                    f'--user={self._user}',
-                    *(
-                        [f'--password={self._password}']
-                        if self._password
-                        else []
-                    ),
-                    *(
-                        f'--{key}={value}'
-                        for key, value in real_settings.items()
-                    ),
-                ],
-                gen_stdin,
-                gen_stdout,
-                gen_stderr
+                    (table.name, table.gen_data)
+                    for table in external
+                ]
             )
+        elif real_method == 'ssh':
+            # notice: the only table is streamed through stdin
+            if len(external) != 1:
+                raise ValueError(
+                    f'only one external table can be sent via ssh, '
+                    f'got {len(external)}'
+                )
+
+            if any(gen_in):
+                raise ValueError(
+                    'input data cannot be sent with external tables via ssh'
+                )
+
+            table, = external
+
+            external_args.extend([
+                f'--query={query}',
+                '--external',
+                '--file=-',
+                f'--name={table.name}',
+                f'--structure={table.structure_text}',
+                f'--format={table.data_format}',
+            ])
+            gen_stdin = table.gen_data
+
+        # create connection(s)
+
+        stderr_list: typing.List[bytes] = []
+
+        gen_stdout = gen_out
+        gen_stderr = iteration.collect_out(stderr_list)
+
+        if real_method == 'tcp':
+            try:
+                raw_join = connection.run_process(
+                    [
+                        clickhouse.binary_file(),
+                        'client',
+                        f'--host={self._host}',
+                        f'--port={self._tcp_port}',
+                        f'--user={self._user}',
+                        *(
+                            [f'--password={self._password}']
+                            if self._password
+                            else []
+                        ),
+                        *(
+                            f'--{key}={value}'
+                            for key, value in real_settings.items()
+                        ),
+                        *external_args,
+                    ],
+                    gen_stdin,
+                    gen_stdout,
+                    gen_stderr
+                )
+            except BaseException:
+                with contextlib.suppress(Exception):
+                    cleanup()
+
+                raise
+
             good_status = 0
         elif real_method == 'http':
+            http_pool = None
+
+            if self._ssh_tunnel:
+                self._require_ssh(lookup=False)
+
+                http_pool = self._ssh_http_pool
+
             raw_join = connection.run_http(
                 self._host,
                 self._http_port,
@@ -166,10 +549,12 @@ class PassiveSession:
                         if self._password
                         else {}
                     ),
+                    **external_headers,
                 },
                 gen_stdin,
                 gen_stdout,
-                gen_stderr
+                gen_stderr,
+                pool=http_pool
             )
             good_status = 200
         elif real_method == 'ssh':
@@ -178,24 +563,38 @@ class PassiveSession:
             assert self._ssh_client is not None
             assert self._ssh_binary_file is not None
 
+            ssh_args = [
+                *self._ssh_command_prefix,
+                self._ssh_binary_file,
+                'client',
+                f'--port={self._tcp_port}',
+                f'--user={self._user}',
+                *(
+                    [f'--password={self._password}']
+                    if self._password
+                    else []
+                ),
+                *(
+                    f'--{key}={value}'
+                    for key, value in real_settings.items()
+                ),
+                *external_args,
+            ]
+
+            if self._ssh_compression == 'zstd':
+                # notice: compress both directions of the channel end to end
+                ssh_args = [
+                    'bash',
+                    '-c',
+                    f'set -o pipefail; '
+                    f'zstd -dc | {shlex.join(ssh_args)} | zstd -c',
+                ]
+                gen_stdin = iteration.zstd_in(gen_stdin)
+                gen_stdout = iteration.zstd_out(gen_stdout)
+
             raw_join = connection.run_ssh(
                 self._ssh_client,
-                [
-                    *self._ssh_command_prefix,
-                    self._ssh_binary_file,
-                    'client',
-                    f'--port={self._tcp_port}',
-                    f'--user={self._user}',
-                    *(
-                        [f'--password={self._password}']
-                        if self._password
-                        else []
-                    ),
-                    *(
-                        f'--{key}={value}'
-                        for key, value in real_settings.items()
-                    ),
-                ],
+                ssh_args,
                 gen_stdin,
                 gen_stdout,
                 gen_stderr
@@ -205,7 +604,12 @@ class PassiveSession:
         # join connection(s)
 
         def join() -> None:
-            if raw_join() != good_status:
+            try:
+                status = raw_join()
+            finally:
+                cleanup()
+
+            if status != good_status:
                 raise exception.QueryError(
                     self._host,
                     query,
@@ -221,14 +625,22 @@ class PassiveSession:
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
-            settings: typing.Optional[typing.Dict[str, str]] = None
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
     ) -> typing.Callable[[], bytes]:
         stdout_list: typing.List[bytes] = []
 
         gen_in = iteration.given_in([data])
         gen_out = iteration.collect_out(stdout_list)
 
-        raw_join = self._run(query, gen_in, gen_out, method, settings)
+        raw_join = self._run(
+            query,
+            gen_in,
+            gen_out,
+            method,
+            settings,
+            external
+        )
 
         def join() -> bytes:
             raw_join()
@@ -244,9 +656,10 @@ class PassiveSession:
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
-            settings: typing.Optional[typing.Dict[str, str]] = None
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
     ) -> bytes:
-        return self.query_async(query, data, method, settings)()
+        return self.query_async(query, data, method, settings, external)()
 
     def query_stream_async(
             self,
@@ -256,7 +669,8 @@ class PassiveSession:
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
-            settings: typing.Optional[typing.Dict[str, str]] = None
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
     ) -> typing.Callable[[], None]:
         if stream_in is None:
             gen_in = iteration.empty_in()
@@ -268,7 +682,14 @@ class PassiveSession:
         else:
             gen_out = iteration.stream_out(stream_out)
 
-        return self._run(query, gen_in, gen_out, method, settings)
+        return self._run(
+            query,
+            gen_in,
+            gen_out,
+            method,
+            settings,
+            external
+        )
 
     def query_stream(
             self,
@@ -278,14 +699,16 @@ class PassiveSession:
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
-            settings: typing.Optional[typing.Dict[str, str]] = None
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
     ) -> None:
         self.query_stream_async(
             query,
             stream_in,
             stream_out,
             method,
-            settings
+            settings,
+            external
         )()
 
     def query_pipe_async(
@@ -294,12 +717,20 @@ class PassiveSession:
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
-            settings: typing.Optional[typing.Dict[str, str]] = None
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
     ) -> typing.Callable[[], None]:
         gen_in = iteration.pipe_in()
         gen_out = iteration.pipe_out()
 
-        return self._run(query, gen_in, gen_out, method, settings)
+        return self._run(
+            query,
+            gen_in,
+            gen_out,
+            method,
+            settings,
+            external
+        )
 
     def query_pipe(
             self,
@@ -307,12 +738,14 @@ class PassiveSession:
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
-            settings: typing.Optional[typing.Dict[str, str]] = None
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
     ) -> None:
         self.query_pipe_async(
             query,
             method,
-            settings
+            settings,
+            external
         )()
 
     def query_file_async(
@@ -323,7 +756,8 @@ class PassiveSession:
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
-            settings: typing.Optional[typing.Dict[str, str]] = None
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
     ) -> typing.Callable[[], None]:
         if path_in is None:
             gen_in = iteration.empty_in()
@@ -335,7 +769,14 @@ class PassiveSession:
         else:
             gen_out = iteration.file_out(path_out)
 
-        return self._run(query, gen_in, gen_out, method, settings)
+        return self._run(
+            query,
+            gen_in,
+            gen_out,
+            method,
+            settings,
+            external
+        )
 
     def query_file(
             self,
@@ -345,27 +786,135 @@ class PassiveSession:
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
-            settings: typing.Optional[typing.Dict[str, str]] = None
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
     ) -> None:
         self.query_file_async(
             query,
             path_in,
             path_out,
             method,
-            settings
+            settings,
+            external
+        )()
+
+    def query_binary_async(
+            self,
+            query: str,
+            data: typing.Any,
+            structure: typing.Dict[str, str],
+            binary_format: typing_extensions.Literal[
+                'RowBinary',
+                'Native'
+            ] = 'RowBinary',
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ] = None,
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
+    ) -> typing.Callable[[], None]:
+        if binary_format == 'RowBinary':
+            gen_in = iteration.rowbinary_in(data, structure)
+        else:
+            gen_in = iteration.native_in(data, structure)
+
+        gen_out = iteration.empty_out()
+
+        return self._run(
+            f'{query} format {binary_format}',
+            gen_in,
+            gen_out,
+            method,
+            settings,
+            external
+        )
+
+    def query_binary(
+            self,
+            query: str,
+            data: typing.Any,
+            structure: typing.Dict[str, str],
+            binary_format: typing_extensions.Literal[
+                'RowBinary',
+                'Native'
+            ] = 'RowBinary',
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ] = None,
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
+    ) -> None:
+        self.query_binary_async(
+            query,
+            data,
+            structure,
+            binary_format,
+            method,
+            settings,
+            external
+        )()
+
+    def query_values_async(
+            self,
+            query: str,
+            data: typing.Any,
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ] = None,
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
+    ) -> typing.Callable[[], None]:
+        gen_in = (
+            rows_text.encode()
+            for rows_text in ast.Rows(data).iterate_expression()
+        )
+        gen_out = iteration.empty_out()
+
+        return self._run(
+            f'{query} format Values',
+            gen_in,
+            gen_out,
+            method,
+            settings,
+            external
+        )
+
+    def query_values(
+            self,
+            query: str,
+            data: typing.Any,
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ] = None,
+            settings: typing.Optional[typing.Dict[str, str]] = None,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
+    ) -> None:
+        self.query_values_async(
+            query,
+            data,
+            method,
+            settings,
+            external
         )()
 
     def query_pandas_async(
             self,
             query: str,
-            dataframe: typing.Optional[pandas.DataFrame] = None,
+            dataframe: typing.Optional['pandas.DataFrame'] = None,
             encoding: typing.Optional[str] = 'utf-8',
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
             settings: typing.Optional[typing.Dict[str, str]] = None,
-            join_interval: float = 0.1
-    ) -> typing.Callable[[], typing.Optional[pandas.DataFrame]]:
+            join_interval: float = 0.1,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
+    ) -> typing.Callable[[], typing.Optional['pandas.DataFrame']]:
+        # notice: these are slow to import, so they are imported on demand
+        # pylint: disable=import-outside-toplevel
+        import numpy
+        import pandas  # type: ignore[import]
+        import pyarrow  # type: ignore[import]
+
         batch = None
         error = None
 
@@ -385,7 +934,8 @@ class PassiveSession:
             gen_in,
             gen_out,
             method,
-            settings
+            settings,
+            external
         )
 
         # create thread
@@ -540,7 +1090,7 @@ class PassiveSession:
 
         # join thread
 
-        def join() -> typing.Optional[pandas.DataFrame]:
+        def join() -> typing.Optional['pandas.DataFrame']:
             while error is None and thread.is_alive():
                 thread.join(join_interval)
 
@@ -556,23 +1106,36 @@ class PassiveSession:
     def query_pandas(
             self,
             query: str,
-            dataframe: typing.Optional[pandas.DataFrame] = None,
+            dataframe: typing.Optional['pandas.DataFrame'] = None,
             encoding: typing.Optional[str] = 'utf-8',
             method: typing.Optional[
                 typing_extensions.Literal['tcp', 'http', 'ssh']
             ] = None,
             settings: typing.Optional[typing.Dict[str, str]] = None,
-            join_interval: float = 0.1
-    ) -> typing.Optional[pandas.DataFrame]:
+            join_interval: float = 0.1,
+            external: typing.Optional[typing.List[ast.ExternalTable]] = None
+    ) -> typing.Optional['pandas.DataFrame']:
         return self.query_pandas_async(
             query,
             dataframe,
             encoding,
             method,
             settings,
-            join_interval
+            join_interval,
+            external
         )()
 
+    def query_stats(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        with self._stats_lock:
+            return {
+                query_fingerprint: dict(query_stat)
+                for query_fingerprint, query_stat in self._query_stats.items()
+            }
+
+    def start_stats(self) -> typing.Dict[str, typing.Any]:
+        with self._stats_lock:
+            return dict(self._start_stats)
+
     def ping(
             self,
             method: typing.Optional[
@@ -0,0 +1,172 @@
+import collections
+import concurrent.futures
+import pathlib
+import shutil
+import socket
+import tempfile
+import threading
+import typing
+
+from ck import clickhouse
+from ck.session import local
+
+
+def free_port() -> int:
+    # notice: the port may be taken again before the server binds it
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('localhost', 0))
+
+        port: int = sock.getsockname()[1]
+
+        return port
+
+
+class LocalSessionPool:
+    def __init__(
+            self,
+            size: int = 2,
+            data_dir: typing.Optional[str] = None,
+            tmpfs: bool = False,
+            memory_limit: typing.Optional[int] = None,
+            session_kwargs: typing.Optional[
+                typing.Dict[str, typing.Any]
+            ] = None,
+            max_sessions: typing.Optional[int] = None
+    ) -> None:
+        if data_dir is not None:
+            self._base_dir: typing.Optional[str] = data_dir
+        elif tmpfs:
+            self._base_dir = '/dev/shm'
+        else:
+            self._base_dir = None
+
+        # notice: pre-started and acquired servers run at the same time
+        real_max_sessions = max_sessions or 2 * size
+
+        # notice: the servers share the memory of the host
+        self._memory_limit = (
+            memory_limit
+            or int(clickhouse.detect_memory_size() * 0.8)
+        ) // real_max_sessions
+        self._session_kwargs = session_kwargs or {}
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(size)
+        self._destroy_executor = concurrent.futures.ThreadPoolExecutor(size)
+        self._slots = threading.BoundedSemaphore(real_max_sessions)
+        self._lock = threading.Lock()
+        self._ready: typing.Deque[
+            concurrent.futures.Future[local.LocalSession]
+        ] = collections.deque()
+        self._sessions: typing.Dict[
+            int,
+            typing.Tuple[local.LocalSession, pathlib.Path]
+        ] = {}
+        self._closed = False
+
+        # pre-start sessions
+
+        for _ in range(size):
+            self._ready.append(self._executor.submit(self._create))
+
+    def _create(
+            self,
+            join_interval: float = 0.1
+    ) -> local.LocalSession:
+        # notice: wait until a live server is destroyed
+        while not self._slots.acquire(timeout=join_interval):
+            if self._closed:
+                raise RuntimeError('session pool is closed')
+
+        try:
+            if self._base_dir is not None:
+                pathlib.Path(self._base_dir).mkdir(
+                    parents=True,
+                    exist_ok=True
+                )
+
+            path = pathlib.Path(tempfile.mkdtemp(
+                prefix='pyck_pool_',
+                dir=self._base_dir
+            ))
+        except BaseException:
+            self._slots.release()
+
+            raise
+
+        try:
+            session = local.LocalSession(
+                **{
+                    'memory_limit': self._memory_limit,
+                    **self._session_kwargs,
+                    'tcp_port': free_port(),
+                    'http_port': free_port(),
+                    'data_dir': str(path),
+                    'start': True,
+                }
+            )
+        except BaseException:
+            shutil.rmtree(path, ignore_errors=True)
+            self._slots.release()
+
+            raise
+
+        with self._lock:
+            self._sessions[id(session)] = session, path
+
+        return session
+
+    def _destroy(self, session: local.LocalSession) -> None:
+        with self._lock:
+            _, path = self._sessions.pop(id(session))
+
+        try:
+            session.stop()
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+            self._slots.release()
+
+    def acquire(self) -> local.LocalSession:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('session pool is closed')
+
+            future = self._ready.popleft()
+            self._ready.append(self._executor.submit(self._create))
+
+        return future.result()
+
+    def release(self, session: local.LocalSession) -> None:
+        with self._lock:
+            if self._closed:
+                return
+
+        # notice: never reuse a session, since tests may leave state
+        self._destroy_executor.submit(self._destroy, session)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+
+            for future in self._ready:
+                future.cancel()
+
+            self._ready.clear()
+
+        # notice: wait for pending starts, then stop every session
+
+        self._executor.shutdown()
+        self._destroy_executor.shutdown()
+
+        with self._lock:
+            sessions = [session for session, _ in self._sessions.values()]
+
+        errors: typing.List[BaseException] = []
+
+        for session in sessions:
+            try:
+                self._destroy(session)
+            except BaseException as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        if errors:
+            raise errors[0]
@@ -1,3 +1,4 @@
+import ast
 import pathlib
 import time
 import typing
@@ -8,9 +9,41 @@ import typing_extensions
 from ck import connection
 from ck import exception
 from ck import iteration
+from ck.query import ast as query_ast
+from ck.session import cache
 from ck.session import passive
 
 
+def _record_in(
+        gen_in: typing.Generator[bytes, None, None],
+        data_list: typing.List[bytes]
+) -> typing.Generator[bytes, None, None]:
+    for data in gen_in:
+        data_list.append(data)
+
+        yield data
+
+
+def _hold_out(
+        gen_out: typing.Generator[None, bytes, None],
+        started_list: typing.List[bool]
+) -> typing.Generator[None, bytes, None]:
+    # notice: the end of the output is held back, since a failed query may
+    #         still be retried
+    data = yield
+
+    while data:
+        if not started_list:
+            next(gen_out)
+            started_list.append(True)
+
+        gen_out.send(data)
+
+        data = yield
+
+    yield
+
+
 class RemoteSession(passive.PassiveSession):
     def __init__(
             self,
@@ -32,7 +65,17 @@ class RemoteSession(passive.PassiveSession):
             config: typing.Optional[typing.Dict[str, typing.Any]] = None,
             auto_start: bool = True,
             stop: bool = False,
-            start: bool = False
+            start: bool = False,
+            ssh_tunnel: bool = False,
+            ssh_compression: typing.Optional[
+                typing_extensions.Literal['transport', 'zstd']
+            ] = None,
+            query_cache: typing.Optional[cache.QueryCache] = None,
+            single_flight: bool = False,
+            storage: typing.Optional[
+                typing.Dict[str, typing.List[str]]
+            ] = None,
+            ssh_timeout: typing.Optional[float] = None
     ) -> None:
         super().__init__(
             host,
@@ -47,7 +90,12 @@ class RemoteSession(passive.PassiveSession):
             ssh_username,
             ssh_password,
             ssh_public_key,
-            ssh_command_prefix
+            ssh_command_prefix,
+            ssh_tunnel,
+            ssh_compression,
+            query_cache,
+            single_flight,
+            ssh_timeout
         )
 
         self._require_ssh()
@@ -61,7 +109,9 @@ class RemoteSession(passive.PassiveSession):
 
         self._memory_limit = memory_limit or 0
         self._config = config or {}
+        self._storage = storage or {}
         self._auto_start = auto_start
+        self._running = False
 
         if stop:
             self.stop()
@@ -70,87 +120,108 @@ class RemoteSession(passive.PassiveSession):
             self.start()
 
     def _prepare(self) -> None:
-        if self._auto_start:
+        # notice: the server is only checked again after a failure
+        if self._auto_start and not self._running:
             self.start()
 
-    def get_pid(self) -> typing.Optional[int]:
-        pid_path = self._path.joinpath('pid')
+    def _fail(self) -> None:
+        self._running = False
 
-        # get pid
+    def _dispatch(
+            self,
+            query: str,
+            gen_in: typing.Generator[bytes, None, None],
+            gen_out: typing.Generator[None, bytes, None],
+            method: typing.Optional[
+                typing_extensions.Literal['tcp', 'http', 'ssh']
+            ],
+            settings: typing.Optional[typing.Dict[str, str]],
+            external: typing.Optional[typing.List[query_ast.ExternalTable]]
+    ) -> typing.Callable[[], None]:
+        # notice: external tables can not be sent twice
+        if not self._auto_start or external:
+            return super()._dispatch(
+                query,
+                gen_in,
+                gen_out,
+                method,
+                settings,
+                external
+            )
 
-        stdout_list: typing.List[bytes] = []
+        input_list: typing.List[bytes] = []
+        started_list: typing.List[bool] = []
+
+        def attempt(
+                gen_attempt_in: typing.Generator[bytes, None, None]
+        ) -> typing.Callable[[], None]:
+            return super(RemoteSession, self)._dispatch(
+                query,
+                gen_attempt_in,
+                _hold_out(gen_out, started_list),
+                method,
+                settings,
+                external
+            )
 
-        assert self._ssh_client is not None
+        first_error: typing.Optional[Exception] = None
 
-        if connection.run_ssh(
-                self._ssh_client,
-                [
-                    'cat',
-                    str(pid_path),
-                ],
-                iteration.empty_in(),
-                iteration.collect_out(stdout_list),
-                iteration.ignore_out()
-        )():
-            return None
+        try:
+            raw_join = attempt(_record_in(gen_in, input_list))
+        except Exception as error:  # pylint: disable=broad-except
+            first_error = error
 
-        pid = int(b''.join(stdout_list).decode().strip())
+        def join() -> None:
+            try:
+                try:
+                    if first_error is not None:
+                        raise first_error
 
-        # find process
+                    raw_join()
+                except Exception:
+                    # notice: retry once if the server was down and is
+                    #         back, and no output has been delivered yet
+                    if started_list or not self._restart():
+                        raise
 
-        if connection.run_ssh(
-                self._ssh_client,
-                [
-                    'kill',
-                    '-0',
-                    str(pid),
-                ],
-                iteration.empty_in(),
-                iteration.empty_out(),
-                iteration.ignore_out()
-        )():
-            return None
+                    attempt(iteration.concat_in(
+                        iteration.given_in(input_list),
+                        gen_in
+                    ))()
+            except BaseException:
+                gen_out.close()
 
-        return pid
+                raise
 
-    def start(
-            self,
-            ping_interval: float = 0.1,
-            ping_retry: int = 50
-    ) -> typing.Optional[int]:
-        pid = self.get_pid()
+            if not started_list:
+                next(gen_out)
 
-        if pid is not None:
-            return None
+            gen_out.send(b'')
 
-        config_path = self._path.joinpath('config.xml')
-        pid_path = self._path.joinpath('pid')
+        return join
 
-        # create dir
+    def _restart(self) -> bool:
+        self._running = False
 
-        stderr_list: typing.List[bytes] = []
+        try:
+            return self.start() is not None
+        except Exception:  # pylint: disable=broad-except
+            return False
 
-        assert self._ssh_client is not None
+    def _control(
+            self,
+            commands: typing.List[
+                typing.Tuple[str, typing.Dict[str, typing.Any]]
+            ]
+    ) -> typing.List[typing.Any]:
+        self._require_ssh()
 
-        if connection.run_ssh(
-                self._ssh_client,
-                [
-                    'mkdir',
-                    '--parents',
-                    str(self._path),
-                ],
-                iteration.empty_in(),
-                iteration.empty_out(),
-                iteration.collect_out(stderr_list)
-        )():
-            raise exception.ShellError(
-                self._host,
-                b''.join(stderr_list)
-            )
+        assert self._ssh_client is not None
 
-        # setup
+        # notice: run all commands in one round trip
 
-        stderr_list = []
+        stdout_list: typing.List[bytes] = []
+        stderr_list: typing.List[bytes] = []
 
         if connection.run_ssh(
                 self._ssh_client,
@@ -158,18 +229,10 @@ class RemoteSession(passive.PassiveSession):
                     *self._ssh_command_prefix,
                     'python3',
                     '-m',
-                    'ck.clickhouse.setup',
+                    'ck.clickhouse.control',
                 ],
-                iteration.given_in([repr({
-                    'tcp_port': self._tcp_port,
-                    'http_port': self._http_port,
-                    'user': self._user,
-                    'password': self._password,
-                    'data_dir': str(self._path),
-                    'memory_limit': self._memory_limit,
-                    'config': self._config,
-                }).encode()]),
-                iteration.empty_out(),
+                iteration.given_in([f'{commands!r}\n'.encode()]),
+                iteration.collect_out(stdout_list),
                 iteration.collect_out(stderr_list)
         )():
             raise exception.ShellError(
@@ -177,103 +240,69 @@ class RemoteSession(passive.PassiveSession):
                 b''.join(stderr_list)
             )
 
-        # run
+        results, error = ast.literal_eval(b''.join(stdout_list).decode())
 
-        assert self._ssh_binary_file is not None
+        if error is not None:
+            raise exception.ServiceError(self._host, error)
 
-        if connection.run_ssh(
-                self._ssh_client,
-                [
-                    *self._ssh_command_prefix,
-                    self._ssh_binary_file,
-                    'server',
-                    '--daemon',
-                    f'--config-file={config_path}',
-                    f'--pid-file={pid_path}',
-                ],
-                iteration.empty_in(),
-                iteration.empty_out(),
-                iteration.empty_out()
-        )():
-            raise exception.ServiceError(self._host, 'daemon')
+        return typing.cast(typing.List[typing.Any], results)
 
-        # wait for server initialization
+    def get_pid(self) -> typing.Optional[int]:
+        pid, = self._control([
+            ('status', {
+                'data_dir': str(self._path),
+            }),
+        ])
 
-        for _ in range(ping_retry):
-            pid = self.get_pid()
+        return typing.cast(typing.Optional[int], pid)
 
-            if pid is not None:
-                break
+    def start(
+            self,
+            ping_interval: float = 0.1,
+            ping_retry: int = 50
+    ) -> typing.Optional[int]:
+        assert self._ssh_binary_file is not None
 
-            time.sleep(ping_interval)
-        else:
-            raise exception.ServiceError(self._host, 'pid')
+        start_time = time.perf_counter()
 
-        while not self.ping():
-            time.sleep(ping_interval)
+        pid, = self._control([
+            ('start', {
+                'binary_file': self._ssh_binary_file,
+                'config_kwargs': {
+                    'tcp_port': self._tcp_port,
+                    'http_port': self._http_port,
+                    'user': self._user,
+                    'password': self._password,
+                    'data_dir': str(self._path),
+                    'memory_limit': self._memory_limit,
+                    'config': self._config,
+                    'storage': self._storage,
+                },
+                'ping_interval': ping_interval,
+                'ping_retry': ping_retry,
+            }),
+        ])
+
+        if pid is not None:
+            self._record_start(start_time)
 
-            if self.get_pid() is None:
-                raise exception.ServiceError(self._host, f'pid_{pid}')
+        self._running = True
 
-        return pid
+        return typing.cast(typing.Optional[int], pid)
 
     def stop(
             self,
             ping_interval: float = 0.1,
             ping_retry: int = 50
     ) -> typing.Optional[int]:
-        pid = self.get_pid()
-
-        if pid is None:
-            return None
-
-        # kill process
-
-        stderr_list: typing.List[bytes] = []
-
-        assert self._ssh_client is not None
+        self._running = False
 
-        if connection.run_ssh(
-                self._ssh_client,
-                [
-                    'kill',
-                    '-15',
-                    str(pid),
-                ],
-                iteration.empty_in(),
-                iteration.empty_out(),
-                iteration.collect_out(stderr_list)
-        )():
-            raise exception.ShellError(
-                self._host,
-                b''.join(stderr_list)
-            )
-
-        for _ in range(ping_retry):
-            if self.get_pid() is None:
-                break
+        pid, = self._control([
+            ('stop', {
+                'data_dir': str(self._path),
+                'ping_interval': ping_interval,
+                'ping_retry': ping_retry,
+            }),
+        ])
 
-            time.sleep(ping_interval)
-        else:
-            stderr_list = []
-
-            if connection.run_ssh(
-                    self._ssh_client,
-                    [
-                        'kill',
-                        '-9',
-                        str(pid),
-                    ],
-                    iteration.empty_in(),
-                    iteration.empty_out(),
-                    iteration.collect_out(stderr_list)
-            )():
-                raise exception.ShellError(
-                    self._host,
-                    b''.join(stderr_list)
-                )
-
-            while self.get_pid() is not None:
-                time.sleep(ping_interval)
-
-        return pid
+        return typing.cast(typing.Optional[int], pid)
@@ -3,6 +3,7 @@ import setuptools  # type: ignore[import]
 
 if __name__ == '__main__':
     setuptools.setup(
+        extras_require={'zstd': ['zstandard']},
         install_requires=['paramiko', 'pyarrow', 'typing_extensions'],
         name='ck',
         package_data={'ck.clickhouse': ['clickhouse']},
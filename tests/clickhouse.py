@@ -0,0 +1,122 @@
+import pathlib
+import tempfile
+import xml.etree.ElementTree
+
+# third-party
+import pytest
+
+from ck import clickhouse
+from ck.clickhouse import control
+
+
+def test_clickhouse_config_tuning() -> None:
+    with tempfile.TemporaryDirectory() as data_dir:
+        clickhouse.create_config(
+            9000,
+            8123,
+            'default',
+            '',
+            data_dir,
+            0,
+            {
+                'mark_cache_size': '1024',
+                'profiles': {
+                    'default': {
+                        'max_threads': '3',
+                    },
+                },
+            }
+        )
+
+        root = xml.etree.ElementTree.parse(
+            pathlib.Path(data_dir).joinpath('config.xml')
+        ).getroot()
+
+    cpu_count = clickhouse.detect_cpu_count()
+
+    assert cpu_count >= 1
+    assert clickhouse.detect_memory_size() > 0
+    assert clickhouse.detect_numa_nodes() >= 1
+
+    assert root.findtext('mark_cache_size') == '1024'
+    assert root.findtext('profiles/default/max_threads') == '3'
+    assert root.findtext('background_pool_size') == str(max(2, cpu_count))
+    assert int(root.findtext('uncompressed_cache_size') or '0') > 0
+    assert int(root.findtext('query_cache/max_size_in_bytes') or '0') > 0
+
+
+def test_clickhouse_config_storage() -> None:
+    with tempfile.TemporaryDirectory() as data_dir:
+        clickhouse.create_config(
+            9000,
+            8123,
+            'default',
+            '',
+            data_dir,
+            0,
+            {
+                'merge_tree': {
+                    'parts_to_throw_insert': '600',
+                },
+            },
+            {
+                'hot': [f'{data_dir}/nvme_0', f'{data_dir}/nvme_1'],
+                'cold': [f'{data_dir}/hdd'],
+            }
+        )
+
+        root = xml.etree.ElementTree.parse(
+            pathlib.Path(data_dir).joinpath('config.xml')
+        ).getroot()
+
+        assert pathlib.Path(data_dir).joinpath('nvme_1').is_dir()
+        assert root.findtext('storage_configuration/disks/hot_1/path') \
+            == f'{data_dir}/nvme_1/'
+
+    volumes = root.find('storage_configuration/policies/tiered/volumes')
+
+    assert volumes is not None
+    assert [volume.tag for volume in volumes] == ['hot', 'cold']
+    assert [disk.text for disk in volumes.iterfind('hot/disk')] \
+        == ['default', 'hot_0', 'hot_1']
+    assert [disk.text for disk in volumes.iterfind('cold/disk')] \
+        == ['cold_0']
+    assert root.findtext('merge_tree/storage_policy') == 'tiered'
+    assert root.findtext('merge_tree/parts_to_throw_insert') == '600'
+
+
+def test_clickhouse_clone_dir() -> None:
+    with tempfile.TemporaryDirectory() as work_dir:
+        source_path = pathlib.Path(work_dir).joinpath('source')
+        target_path = pathlib.Path(work_dir).joinpath('target')
+
+        source_path.joinpath('part').mkdir(parents=True)
+        source_path.joinpath('part', 'checksums.txt').write_bytes(b'1')
+        source_path.joinpath('part', 'data.bin').write_bytes(b'2')
+        source_path.joinpath('status').write_bytes(b'3')
+        target_path.mkdir()
+        target_path.joinpath('stale').write_bytes(b'4')
+
+        control.clone_dir(str(source_path), str(target_path))
+
+        assert target_path.joinpath('part', 'data.bin').read_bytes() == b'2'
+        assert target_path.joinpath('status').read_bytes() == b'3'
+        assert not target_path.joinpath('stale').exists()
+        assert sorted(
+            path.name
+            for path in pathlib.Path(work_dir).iterdir()
+        ) == ['source', 'target']
+
+        # notice: a failed clone keeps the target
+
+        with pytest.raises(OSError):
+            control.clone_dir(
+                str(pathlib.Path(work_dir).joinpath('missing')),
+                str(target_path)
+            )
+
+        assert target_path.joinpath('status').read_bytes() == b'3'
+        assert sorted(
+            path.name
+            for path in pathlib.Path(work_dir).iterdir()
+        ) == ['source', 'target']
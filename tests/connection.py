@@ -24,6 +24,18 @@ def test_connection_process() -> None:
     assert status == 0
 
 
+def test_connection_fifo() -> None:
+    fifo_join = connection.run_fifo(
+        '/tmp/pyck_test_connection_fifo',
+        iteration.given_in([b'1\n', b'2\n'])
+    )
+
+    with open('/tmp/pyck_test_connection_fifo', 'rb') as stream:
+        assert stream.read() == b'1\n2\n'
+
+    fifo_join()
+
+
 def test_connection_http() -> None:
     ck.LocalSession(stop=True, start=True)
 
@@ -42,6 +54,36 @@ def test_connection_http() -> None:
     assert status == 200
 
 
+def test_connection_http_tunnel() -> None:
+    ck.LocalSession(stop=True, start=True)
+
+    ssh_client = connection.connect_ssh('localhost', 22)
+    http_pool = connection.HTTPPool(
+        'localhost',
+        8123,
+        lambda: connection.open_tunnel(ssh_client, 'localhost', 8123)
+    )
+
+    for _ in range(4):
+        stdout_list: typing.List[bytes] = []
+        status = connection.run_http(
+            'localhost',
+            8123,
+            '/',
+            {},
+            iteration.given_in([b'select 1']),
+            iteration.collect_out(stdout_list),
+            iteration.empty_out(),
+            pool=http_pool
+        )()
+
+        assert stdout_list == [b'1\n']
+        assert status == 200
+
+    http_pool.close()
+    ssh_client.close()
+
+
 def test_connection_ssh() -> None:
     ck.LocalSession(stop=True, start=True)
 
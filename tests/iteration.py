@@ -1,5 +1,9 @@
 import typing
 
+# third-party
+import numpy
+import pytest
+
 from ck import iteration
 
 
@@ -24,6 +28,40 @@ def test_iteration_concat_in() -> None:
     assert list(gen_in) == [b'1', b'2', b'3']
 
 
+def test_iteration_multipart_in() -> None:
+    gen_in = iteration.multipart_in(
+        'test',
+        [('x', iteration.given_in([b'1\n', b'2\n']))]
+    )
+
+    assert b''.join(gen_in) == (
+        b'--test\r\n'
+        b'Content-Disposition: form-data; name="x"; filename="x"\r\n'
+        b'Content-Type: application/octet-stream\r\n'
+        b'\r\n'
+        b'1\n2\n\r\n'
+        b'--test--\r\n'
+    )
+
+
+def test_iteration_zstd_in() -> None:
+    pytest.importorskip('zstandard')
+
+    stdout_list: typing.List[bytes] = []
+
+    gen_in = iteration.zstd_in(iteration.given_in([b'1' * 1000, b'2']))
+    gen_out = iteration.zstd_out(iteration.collect_out(stdout_list))
+
+    next(gen_out)
+
+    for data in gen_in:
+        gen_out.send(data)
+
+    gen_out.send(b'')
+
+    assert b''.join(stdout_list) == b'1' * 1000 + b'2'
+
+
 def test_iteration_empty_out() -> None:
     gen_out = iteration.empty_out()
     next(gen_out)
@@ -67,6 +105,42 @@ def test_iteration_collect_out() -> None:
     assert not list(gen_out)
 
 
+def test_iteration_tee_out() -> None:
+    data_list_1: typing.List[bytes] = []
+    data_list_2: typing.List[bytes] = []
+    gen_out = iteration.tee_out(
+        iteration.collect_out(data_list_1),
+        data_list_2
+    )
+    next(gen_out)
+    gen_out.send(b'1')
+    gen_out.send(b'2')
+    gen_out.send(b'')
+
+    assert data_list_1 == [b'1', b'2']
+    assert data_list_2 == [b'1', b'2']
+    assert not list(gen_out)
+
+
+def test_iteration_timed_out() -> None:
+    data_list: typing.List[bytes] = []
+    time_list: typing.List[float] = []
+    gen_out = iteration.timed_out(
+        iteration.collect_out(data_list),
+        time_list
+    )
+    next(gen_out)
+    gen_out.send(b'1')
+
+    assert not time_list
+
+    gen_out.send(b'')
+
+    assert data_list == [b'1']
+    assert len(time_list) == 1
+    assert not list(gen_out)
+
+
 def test_iteration_stream_in() -> None:
     open('/tmp/pyck_test_iteration_1', 'wb').write(b'hello\n')
     gen_in = iteration.stream_in(open('/tmp/pyck_test_iteration_1', 'rb'))
@@ -130,3 +204,70 @@ def test_iteration_echo_io() -> None:
     data = read_stream.read()
 
     assert data == b''
+
+
+def test_iteration_rowbinary_in() -> None:
+    gen_in = iteration.rowbinary_in(
+        [(1, 'a'), (2, 'bc')],
+        {'x': 'UInt16', 'y': 'String'}
+    )
+
+    assert b''.join(gen_in) == b'\x01\x00\x01a\x02\x00\x02bc'
+
+    gen_in = iteration.rowbinary_in(
+        {'x': [1, 2], 'y': [-1., None]},
+        {'x': 'Int8', 'y': 'Nullable(Float32)'}
+    )
+
+    assert b''.join(gen_in) == b'\x01\x00\x00\x00\x80\xbf\x02\x01'
+
+    gen_in = iteration.rowbinary_in(
+        {'x': numpy.arange(3), 'y': numpy.arange(3) * 2},
+        {'x': 'UInt8', 'y': 'UInt16'},
+        block_size=2
+    )
+
+    assert list(gen_in) == [b'\x00\x00\x00\x01\x02\x00', b'\x02\x04\x00']
+
+
+def test_iteration_binary_in_empty_structure() -> None:
+    with pytest.raises(ValueError):
+        list(iteration.rowbinary_in([(), ()], {}))
+
+    with pytest.raises(ValueError):
+        list(iteration.native_in({}, {}))
+
+
+def test_iteration_binary_in_mismatch() -> None:
+    structure = {'x': 'UInt8', 'y': 'UInt8'}
+
+    for encode in (iteration.rowbinary_in, iteration.native_in):
+        with pytest.raises(ValueError):
+            list(encode([(1, 2, 3)], structure))
+
+        with pytest.raises(ValueError):
+            list(encode([(1, 2), (3,)], structure))
+
+        with pytest.raises(ValueError):
+            list(encode({'x': [1, 2], 'y': [3]}, structure))
+
+        with pytest.raises(ValueError):
+            list(encode(
+                {'x': numpy.arange(2), 'y': numpy.arange(3)},
+                structure
+            ))
+
+
+def test_iteration_native_in() -> None:
+    gen_in = iteration.native_in(
+        iter([(1, 'a', [1]), (2, 'bc', [])]),
+        {'x': 'UInt16', 'y': 'String', 'z': 'Array(UInt8)'}
+    )
+
+    assert b''.join(gen_in) == b'\x03\x02' \
+        b'\x01x\x06UInt16\x01\x00\x02\x00' \
+        b'\x01y\x06String\x01a\x02bc' \
+        b'\x01z\x0cArray(UInt8)' \
+        b'\x01\x00\x00\x00\x00\x00\x00\x00' \
+        b'\x01\x00\x00\x00\x00\x00\x00\x00' \
+        b'\x01'
@@ -1,3 +1,21 @@
+import builtins
+import datetime
+import dis
+import gc
+import inspect
+import math
+import sys
+import types
+import typing
+import weakref
+
+# third-party
+import numpy
+import pandas  # type: ignore[import]
+import pytest
+import pytest_benchmark.fixture  # type: ignore[import]
+
+from ck import iteration
 from ck import query
 
 
@@ -11,6 +29,32 @@ def test_query_escape_buffer() -> None:
     assert query.ast.escape_buffer(b'test!', '!') == '!test\\!!'
 
 
+@pytest.mark.parametrize('size', [1 << 16, 1 << 20, 1 << 24])
+def test_query_escape_text_benchmark(
+        benchmark: pytest_benchmark.fixture.BenchmarkFixture,
+        size: int
+) -> None:
+    text = 'test\n\'' * (size // 6)
+
+    def run() -> None:
+        query.ast.escape_text(text, '\'')
+
+    benchmark(run)
+
+
+@pytest.mark.parametrize('size', [1 << 16, 1 << 20, 1 << 24])
+def test_query_escape_buffer_benchmark(
+        benchmark: pytest_benchmark.fixture.BenchmarkFixture,
+        size: int
+) -> None:
+    buffer = bytes(range(256)) * (size // 256)
+
+    def run() -> None:
+        query.ast.escape_buffer(buffer, '\'')
+
+    benchmark(run)
+
+
 def test_query_escape_value() -> None:
     assert query.ast.escape_value(None) == 'null'
     assert query.ast.escape_value(Ellipsis) == '*'
@@ -36,6 +80,102 @@ def test_query_escape_value() -> None:
     assert query.ast.escape_value(frozenset({1, 2, 3})) == 'array(1, 2, 3)'
     assert query.ast.escape_value({}) == 'array()'
     assert query.ast.escape_value({1: 2}) == 'array(tuple(1, 2))'
+    assert query.ast.escape_value(numpy.int8(123)) == '123'
+    assert query.ast.escape_value(numpy.arange(3)) == 'array(0, 1, 2)'
+
+
+def test_query_escape_rows() -> None:
+    assert list(query.ast.escape_rows(
+        iter([(1, 'test'), (2, None)]),
+        block_size=1
+    )) == ['(1, \'test\')', ', (2, null)']
+    assert list(query.ast.escape_rows({
+        'x': numpy.arange(2),
+        'y': numpy.array([.5, numpy.inf]),
+        'z': numpy.array([True, False]),
+        'w': numpy.array(['2000-01-01', 'NaT'], dtype='datetime64[s]'),
+    })) == [
+        '(0, 0.5, true, \'2000-01-01 00:00:00\'), (1, inf, false, null)'
+    ]
+    assert list(query.ast.escape_rows(
+        numpy.arange(4).reshape(2, 2)
+    )) == ['(0, 1), (2, 3)']
+    assert list(query.ast.escape_rows([(
+        datetime.datetime(2000, 1, 1, 0, 0, 1, 250000),
+        datetime.date(2000, 1, 2),
+    )])) == ['(\'2000-01-01 00:00:01.250000\', \'2000-01-02\')']
+    assert list(query.ast.escape_rows({
+        'w': numpy.array(['2000-01-01T00:00:01.5'], dtype='datetime64[ms]'),
+    })) == ['(\'2000-01-01 00:00:01.500\')']
+    assert list(query.ast.escape_rows(pandas.DataFrame({
+        'x': [1, 2],
+        'y': ['a', None],
+    }))) == ['(1, \'a\'), (2, null)']
+
+    with pytest.raises(ValueError):
+        list(query.ast.escape_rows([(1, 'a'), (2,)]))
+
+
+def test_query_escape_rows_benchmark(
+        benchmark: pytest_benchmark.fixture.BenchmarkFixture
+) -> None:
+    data = {
+        'x': numpy.arange(1000000),
+        'y': numpy.arange(1000000) / 7,
+    }
+
+    def run() -> None:
+        for _ in query.ast.escape_rows(data):
+            pass
+
+    benchmark(run)
+
+
+def test_query_infer_type() -> None:
+    assert query.ast.infer_type(True) == 'Bool'
+    assert query.ast.infer_type(123) == 'Int64'
+    assert query.ast.infer_type(1 << 63) == 'UInt64'
+    assert query.ast.infer_type(1 << 64) is None
+    assert query.ast.infer_type(123.) == 'Float64'
+    assert query.ast.infer_type('test') == 'String'
+    assert query.ast.infer_type(datetime.date(2000, 1, 1)) == 'Date'
+    assert query.ast.infer_type(
+        datetime.datetime(2000, 1, 1)
+    ) == 'DateTime'
+    assert query.ast.infer_type(
+        datetime.datetime(2000, 1, 1, 0, 0, 0, 500000)
+    ) == 'DateTime64(6)'
+    assert query.ast.infer_type(
+        datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+    ) == 'DateTime(\'UTC\')'
+    assert query.ast.infer_type(datetime.datetime(
+        2000, 1, 1, 0, 0, 0, 500000,
+        tzinfo=datetime.timezone.utc
+    )) == 'DateTime64(6, \'UTC\')'
+    assert query.ast.infer_type([1, 2]) == 'Array(Int64)'
+    assert query.ast.infer_type([1, 'test']) is None
+    assert query.ast.infer_type([]) is None
+    assert query.ast.infer_type((1, 'test')) == 'Tuple(Int64, String)'
+    assert query.ast.infer_type(None) is None
+    assert query.ast.infer_type(b'test') is None
+
+
+def test_query_escape_parameter() -> None:
+    assert query.ast.escape_parameter(True) == 'true'
+    assert query.ast.escape_parameter(123) == '123'
+    assert query.ast.escape_parameter('\t\'\\') == '\\t\'\\\\'
+    assert query.ast.escape_parameter(
+        datetime.datetime(2000, 1, 1, 12)
+    ) == '2000-01-01 12:00:00'
+    assert query.ast.escape_parameter(
+        datetime.datetime(2020, 1, 1, 0, 0, 0, 500000)
+    ) == '2020-01-01 00:00:00.500000'
+    assert query.ast.escape_parameter(datetime.datetime(
+        2020, 1, 1, 8,
+        tzinfo=datetime.timezone(datetime.timedelta(hours=8))
+    )) == '2020-01-01 00:00:00'
+    assert query.ast.escape_parameter(['test\'', 1]) == '[\'test\\\'\', 1]'
+    assert query.ast.escape_parameter((1, [2])) == '(1, [2])'
 
 
 def test_query_raw() -> None:
@@ -52,6 +192,15 @@ def test_query_value() -> None:
     assert value.render_statement() == 'select tuple(\'test\', 1)'
 
 
+def test_query_rows() -> None:
+    rows = query.ast.Rows([(1, 'test'), (2, 'test')])
+
+    assert rows.render_expression() == '(1, \'test\'), (2, \'test\')'
+    assert list(query.ast.Rows(
+        iter([(1, 'test'), (2, 'test')])
+    ).iterate_expression()) == ['(1, \'test\'), (2, \'test\')']
+
+
 def test_query_identifier() -> None:
     identifier_1 = query.ast.Identifier('test')
     identifier_2 = query.ast.Identifier('test`')
@@ -62,6 +211,26 @@ def test_query_identifier() -> None:
     assert identifier_2.render_statement() == 'select `test\\``'
 
 
+def test_query_parameter() -> None:
+    parameter = query.ast.Parameter('test', 'Array(String)')
+
+    assert parameter.render_expression() == '{test:Array(String)}'
+    assert parameter.render_statement() == 'select {test:Array(String)}'
+
+
+def test_query_external_table() -> None:
+    external_table = query.ast.ExternalTable(
+        'test',
+        {'x': 'Int64', 'y': 'String'},
+        iteration.given_in([b'1\ta\n'])
+    )
+
+    assert external_table.structure_text == 'x Int64, y String'
+    assert external_table.data_format == 'TabSeparated'
+    assert external_table.render_expression() == '`test`'
+    assert external_table.render_statement() == 'select `test`'
+
+
 def test_query_call() -> None:
     identifier = query.ast.Identifier('test')
     call_1 = query.ast.Call(identifier)
@@ -103,3 +272,583 @@ def test_query_list_clause() -> None:
     assert clause_1.render_statement() == 'select'
     assert clause_2.render_expression() == '(select 1, (select), 2 as `test`)'
     assert clause_2.render_statement() == 'select 1, (select), 2 as `test`'
+
+
+def test_query_immutable() -> None:
+    call_1 = query.ast.Call(query.ast.Identifier('test'), 1)
+    call_2 = query.ast.Call(query.ast.Identifier('test'), 1)
+
+    assert call_1 == call_2
+    assert call_1 != query.ast.Raw('`test`(1)')
+    assert len({call_1, call_2}) == 1
+
+    with pytest.raises(AttributeError):
+        call_1._args = ()  # pylint: disable=protected-access
+
+    with pytest.raises(AttributeError):
+        call_1.test = 1  # type: ignore[attr-defined]
+
+
+def test_query_clause_chain_benchmark(
+        benchmark: pytest_benchmark.fixture.BenchmarkFixture
+) -> None:
+    def run() -> None:
+        statement: query.ast.BaseStatement = query.ast.Initial('select')
+
+        for index in range(100000):
+            statement = query.ast.ListClause(
+                query.ast.SimpleClause(statement, 'union_all_select'),
+                index
+            )
+
+        assert statement.render_statement().endswith(
+            'union all select 99999'
+        )
+
+    benchmark(run)
+
+
+def test_query_extract_common() -> None:
+    identifier = query.ast.Identifier('x')
+    call_1 = query.ast.Call(query.ast.Raw('plus'), identifier, 1)
+    call_2 = query.ast.Call(query.ast.Raw('multiply'), call_1, call_1)
+    initial = query.ast.Initial('select')
+    clause = query.ast.ListClause(initial, call_2, y=call_2)
+    statement = query.ast.ListClause(
+        query.ast.SimpleClause(clause, 'order_by'),
+        call_2
+    )
+
+    result_1, saved_size_1 = query.ast.extract_common(statement, 16)
+    result_2, saved_size_2 = query.ast.extract_common(statement, 64)
+
+    assert result_1.render_statement() == (
+        'with multiply(plus(`x`, 1), plus(`x`, 1)) as `_common_0` '
+        'select `_common_0`, `_common_0` as `y` order by `_common_0`'
+    )
+    assert saved_size_1 == len(statement.render_statement()) \
+        - len(result_1.render_statement())
+    assert saved_size_1 > 0
+    assert result_2 is statement
+    assert saved_size_2 == 0
+
+    # notice: the second select could not see the alias
+    union_statement = query.ast.ListClause(
+        query.ast.SimpleClause(clause, 'union_all_select'),
+        call_2
+    )
+    result_3, saved_size_3 = query.ast.extract_common(union_statement, 16)
+
+    assert result_3 is union_statement
+    assert saved_size_3 == 0
+
+
+def test_query_fingerprint() -> None:
+    identifier = query.ast.Identifier('x')
+    statement = query.ast.ListClause(
+        query.ast.SimpleClause(
+            query.ast.ListClause(
+                query.ast.Initial('select'),
+                query.ast.Call(query.ast.Raw('plus'), identifier, -1),
+                y='test'
+            ),
+            'where'
+        ),
+        query.ast.Call(query.ast.Raw('in'), identifier, [1, 2, 3])
+    )
+
+    assert query.ast.normalize_pattern(
+        'SELECT  x,y FROM `T` WHERE x IN (1, 2,3) AND s = \'a\\\'b\''
+    ) == 'select x, y from `T` where x in(?) and s = ?'
+    assert query.ast.normalize_pattern(statement) == (
+        'select plus(`x`, -?), ? as `y` where in(`x`, array(?))'
+    )
+    assert query.ast.normalize_pattern(statement) \
+        == query.ast.normalize_pattern(statement.render_statement())
+    assert query.ast.fingerprint(statement) \
+        == query.ast.fingerprint(statement.render_statement())
+    assert query.ast.fingerprint('select 1') \
+        == query.ast.fingerprint('SELECT 2')
+    assert query.ast.fingerprint('select 1') \
+        != query.ast.fingerprint('select x')
+    assert query.ast.normalize_space(
+        ' SELECT  x,\n\'a  b\'  FROM `T  1` '
+    ) == 'SELECT x, \'a  b\' FROM `T  1`'
+
+
+# notice: the template interpreter runs python 3.8 bytecode
+SQL_BYTECODE = pytest.mark.skipif(
+    sys.version_info[:2] != (3, 8),
+    reason='sql templates are compiled from python 3.8 bytecode'
+)
+
+# pylint: disable=undefined-variable,unused-variable,global-variable-undefined
+
+
+def _template_pop_top(x):  # type: ignore[no-untyped-def]
+    x  # pylint: disable=pointless-statement
+    return select(x)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_rot_two(x, y):  # type: ignore[no-untyped-def]
+    x, y = y, x
+    return select(x, y)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_rot_three(x, y, z):  # type: ignore[no-untyped-def]
+    x, y, z = z, y, x
+    return select(x, y, z)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_dup_top(x):  # type: ignore[no-untyped-def]
+    a = b = x
+    return select(a, b)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_dup_top_two(x, y):  # type: ignore[no-untyped-def]
+    x[1] += y
+    return select(x)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_store_subscr(x, y):  # type: ignore[no-untyped-def]
+    x[1] = y
+    return select(x)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_delete_subscr(x):  # type: ignore[no-untyped-def]
+    del x[1]
+    return select(x)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_inplace(x, y):  # type: ignore[no-untyped-def]
+    x **= y
+    x *= y
+    x @= y
+    x //= y
+    x /= y
+    x %= y
+    x += y
+    x -= y
+    x <<= y
+    x >>= y
+    x &= y
+    x ^= y
+    x |= y
+    return select(x)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_unpack_sequence(x):  # type: ignore[no-untyped-def]
+    a, b = x
+    return select(b, a)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_unpack_ex(x):  # type: ignore[no-untyped-def]
+    a, *b = x
+    return select(a, b)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_global(x):  # type: ignore[no-untyped-def]
+    global g
+    g = x
+    y = g
+    del g
+    return select(y)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_delete_fast(x, y):  # type: ignore[no-untyped-def]
+    del y
+    return select(x)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_import():  # type: ignore[no-untyped-def]
+    # pylint: disable=import-outside-toplevel
+    from math import pi
+    return select(pi)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_deref(x):  # type: ignore[no-untyped-def]
+    y = x
+
+    def h():  # type: ignore[no-untyped-def]
+        return y  # type: ignore[name-defined]  # noqa: F821
+
+    z = h()
+    del y
+    return select(z)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_load_attr(x):  # type: ignore[no-untyped-def]
+    s = select(x)  # type: ignore[name-defined]  # noqa: F821
+    g = s.from_
+    return g(t)  # type: ignore[name-defined]  # noqa: F821
+
+
+def _template_make_function(x):  # type: ignore[no-untyped-def]
+    def g(v: int, *, w=2):  # type: ignore[no-untyped-def]
+        return plus(v, w)  # type: ignore[name-defined]  # noqa: F821
+    return select(g(x))  # type: ignore[name-defined]  # noqa: F821
+
+
+# notice: the expected texts are rendered by the former interpreter
+SQL_CASES: typing.List[typing.Tuple[typing.Any, typing.Any, typing.Any]] = [
+    (
+        lambda x: select(  # type: ignore[name-defined]  # noqa: F821
+            +x, -x, not x, ~x
+        ),
+        (1,),
+        'select negate(negate(1)), negate(1), not(1), bitNot(1)',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            x ** y, x * y, x @ y, x // y, x / y, x % y
+        ),
+        (3, 2),
+        'select pow(3, 2), multiply(3, 2), cast(3, 2), intDiv(3, 2), '
+        'divide(3, 2), modulo(3, 2)',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            x + y, x - y, x[y], x << y, x >> y
+        ),
+        (3, 2),
+        'select plus(3, 2), minus(3, 2), arrayElement(3, 2), '
+        'bitShiftLeft(3, 2), bitShiftRight(3, 2)',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            x & y, x ^ y, x | y
+        ),
+        (3, 2),
+        'select bitAnd(3, 2), bitXor(3, 2), bitOr(3, 2)',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            x < y, x <= y, x == y, x != y, x > y, x >= y
+        ),
+        (3, 'a'),
+        'select less(3, \'a\'), lessOrEquals(3, \'a\'), equals(3, \'a\'), '
+        'notEquals(3, \'a\'), greater(3, \'a\'), greaterOrEquals(3, \'a\')',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            x in y, x not in y, x is y, x is not y
+        ),
+        (3, [1, 2]),
+        'select in(3, array(1, 2)), notIn(3, array(1, 2)), '
+        'and(equals(toTypeName(3), toTypeName(array(1, 2))), '
+        'equals(3, array(1, 2))), '
+        'or(notEquals(toTypeName(3), toTypeName(array(1, 2))), '
+        'notEquals(3, array(1, 2)))',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            (x, y), [x, y], {x, y}
+        ),
+        (1, 2),
+        'select tuple(1, 2), array(1, 2), array(1, 2)',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            {x: y}, {'a': x, 'b': y}
+        ),
+        (1, 'b'),
+        'select array(tuple(1, \'b\')), '
+        'array(tuple(\'a\', 1), tuple(\'b\', \'b\'))',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            f'{x}-{y!r}-{x!s:>4}-{y!a}'
+        ),
+        (1, 'é'),
+        'select \'1-\\\'é\\\'-   1-\\\'\\\\xe9\\\'\'',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            (*x, *y), [*x, *y], {*x, *y}
+        ),
+        ((1,), (2,)),
+        'select tuple(1, 2), array(1, 2), array(1, 2)',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            {**x, **y}
+        ),
+        ({1: 2}, {3: 4}),
+        'select array(tuple(1, 2), tuple(3, 4))',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            *x, *y
+        ),
+        ((1,), (2,)),
+        'select 1, 2',
+    ),
+    (
+        lambda x, y: create_table(  # type: ignore[name-defined]  # noqa: F821
+            t, **x, **y  # type: ignore[name-defined]  # noqa: F821
+        ).engine(Memory()),  # type: ignore[name-defined]  # noqa: F821
+        ({'a': 'String'}, {'b': 'UInt8'}),
+        'create table `t`, \'String\' as `a`, \'UInt8\' as `b` '
+        'engine = `Memory`()',
+    ),
+    (
+        lambda x: create_table(  # type: ignore[name-defined]  # noqa: F821
+            t, x=String, y=x  # type: ignore[name-defined]  # noqa: F821
+        ).engine(Memory()),  # type: ignore[name-defined]  # noqa: F821
+        ('Int8',),
+        'create table `t`, `String` as `x`, \'Int8\' as `y` '
+        'engine = `Memory`()',
+    ),
+    (
+        lambda x: select(  # type: ignore[name-defined]  # noqa: F821
+            count(x),  # type: ignore[name-defined]  # noqa: F821
+            arrayMap(  # type: ignore[name-defined]  # noqa: F821
+                lambda v=1: v * 2, x
+            )
+        ),
+        ([1, 2],),
+        'select `count`(array(1, 2)), '
+        '`arrayMap`(lambda(tuple(\'v\'), multiply(`v`, 2)), array(1, 2))',
+    ),
+    (
+        lambda x: select(  # type: ignore[name-defined]  # noqa: F821
+            x.a, x[1]
+        ),
+        ((1, 2),),
+        'select tupleElement(tuple(1, 2), \'a\'), '
+        'arrayElement(tuple(1, 2), 1)',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            x + 1, y
+        ).from_(t).where(  # type: ignore[name-defined]  # noqa: F821
+            z == y  # type: ignore[name-defined]  # noqa: F821
+        ).limit(x),
+        (3, 'ab'),
+        'select plus(3, 1), \'ab\' from `t` where equals(`z`, \'ab\') '
+        'limit 3',
+    ),
+    (
+        lambda x, y: select(  # type: ignore[name-defined]  # noqa: F821
+            x, y
+        ).from_(
+            t  # type: ignore[name-defined]  # noqa: F821
+        ).group_by(x).settings(
+            max_threads=2
+        ),
+        (1, b'\xff'),
+        'select 1, \'\\xff\' from `t` group by 1 settings 2 as `max_threads`',
+    ),
+    (
+        lambda x: with_(  # type: ignore[name-defined]  # noqa: F821
+            x
+        ).select(1),
+        (1,),
+        'with 1 select 1',
+    ),
+    (
+        lambda x: select(x),  # type: ignore[name-defined]  # noqa: F821
+        (None,),
+        'select null',
+    ),
+    (
+        lambda: select(1),  # type: ignore[name-defined]  # noqa: F821
+        (),
+        'select 1',
+    ),
+    (lambda x: x, ({1: 2},), 'select array(tuple(1, 2))'),
+    (
+        lambda *xs, **kws: select(  # type: ignore[name-defined]  # noqa: F821
+            *xs, **kws
+        ),
+        (1, 2),
+        'select 1, 2',
+    ),
+    (
+        lambda a, b=2: select(  # type: ignore[name-defined]  # noqa: F821
+            a, b
+        ),
+        (1,),
+        'select 1, 2',
+    ),
+    (_template_pop_top, (1,), 'select 1'),
+    (_template_rot_two, (1, 2), 'select 2, 1'),
+    (_template_rot_three, (1, 2, 3), 'select 3, 2, 1'),
+    (_template_dup_top, (1,), 'select 1, 1'),
+    (_template_dup_top_two, ([1, 2], 3), AssertionError),
+    (_template_store_subscr, ([1, 2], 3), AssertionError),
+    (_template_delete_subscr, ([1, 2],), AssertionError),
+    (
+        _template_inplace,
+        (3, 2),
+        'select bitOr(bitXor(bitAnd(bitShiftRight(bitShiftLeft(minus(plus('
+        'modulo(divide(intDiv(cast(multiply(pow(3, 2), 2), 2), 2), 2), 2), '
+        '2), 2), 2), 2), 2), 2), 2)',
+    ),
+    (_template_unpack_sequence, ((1, 2),), 'select 2, 1'),
+    (_template_unpack_ex, ((1, 2, 3),), 'select tuple(2, 3), 1'),
+    (_template_global, (1,), 'select 1'),
+    (_template_delete_fast, (1, 2), 'select 1'),
+    (_template_import, (), TypeError),
+    (_template_deref, (1,), 'select 1'),
+    (_template_load_attr, (1,), 'select 1 from `t`'),
+    (_template_make_function, (1,), TypeError),
+]
+
+# pylint: enable=undefined-variable,unused-variable,global-variable-undefined
+
+
+def _render_result(result: typing.Any) -> str:
+    if isinstance(result, query.ast.BaseAST):
+        return result.render_statement()
+
+    return query.ast.Value(result).render_statement()
+
+
+@SQL_BYTECODE
+def test_query_sql_render() -> None:
+    for function, args, expected in SQL_CASES:
+        if isinstance(expected, str):
+            # notice: the second call may take the skeleton fast path
+            assert query.sql_render(function, *args) == expected
+            assert query.sql_render(function, *args) == expected
+            assert _render_result(
+                query.sql_template(function)(*args)
+            ) == expected
+        else:
+            with pytest.raises(expected):
+                query.sql_render(function, *args)
+
+            with pytest.raises(expected):
+                query.sql_template(function)(*args)
+
+
+@SQL_BYTECODE
+def test_query_sql_skeleton() -> None:
+    # pylint: disable=protected-access
+
+    def skeleton(function: typing.Any) -> typing.Any:
+        return query.sql._skeleton(function, inspect.signature(function))
+
+    function_1 = SQL_CASES[16][0]
+    function_2 = SQL_CASES[8][0]
+
+    # notice: arguments used on the python side give up the skeleton
+    assert skeleton(function_1) is not None
+    assert skeleton(function_2) is None
+
+    # notice: ast arguments and callables bypass the skeleton
+    assert query.sql_render(
+        function_1,
+        query.ast.Identifier('x'),
+        'ab'
+    ) == (
+        'select plus(`x`, 1), \'ab\' from `t` where equals(`z`, \'ab\') '
+        'limit `x`'
+    )
+    assert query.sql_render(function_1, 4, 'c\'d') == (
+        'select plus(4, 1), \'c\\\'d\' from `t` '
+        'where equals(`z`, \'c\\\'d\') limit 4'
+    )
+
+    # notice: skeletons do not keep code objects alive
+    namespace: typing.Dict[str, typing.Any] = {}
+    # pylint: disable=exec-used
+    exec('function = lambda x: select(x)', namespace)
+
+    assert query.sql_render(namespace['function'], 1) == 'select 1'
+
+    code = namespace.pop('function').__code__
+    code_ref = weakref.ref(code)
+    del code
+    query.sql._compile.cache_clear()
+    gc.collect()
+
+    assert code_ref() is None
+
+
+@SQL_BYTECODE
+def test_query_sql_handlers() -> None:
+    # pylint: disable=protected-access
+
+    def run(
+            opname: str,
+            stack: typing.List[typing.Any],
+            arg: typing.Any = None,
+            argval: typing.Any = None,
+            local_dict: typing.Optional[typing.Dict[str, typing.Any]] = None,
+            cells: typing.Tuple[typing.Any, ...] = ()
+    ) -> typing.List[typing.Any]:
+        query.sql._HANDLERS[opname](
+            {'g': 1},
+            {} if local_dict is None else local_dict,
+            cells,
+            stack,
+            arg,
+            argval
+        )
+
+        return stack
+
+    assert run('NOP', [1]) == [1]
+    assert run('ROT_FOUR', [1, 2, 3, 4]) == [4, 1, 2, 3]
+    assert list(run('GET_ITER', [[1, 2]])[0]) == [1, 2]
+    assert list(run('GET_YIELD_FROM_ITER', [[1, 2]])[0]) == [1, 2]
+    assert run('LIST_APPEND', [[1], 2], 1) == [[1, 2]]
+    assert run('SET_ADD', [{1}, 2], 1) == [{1, 2}]
+    assert run('MAP_ADD', [{}, 1, 2], 1) == [{1: 2}]
+    assert run('PRINT_EXPR', [1]) == []
+    assert run('LOAD_BUILD_CLASS', []) == [builtins.__build_class__]
+    assert isinstance(run('BUILD_SLICE', [1, 2], 2)[0], slice)
+
+    local_dict: typing.Dict[str, typing.Any] = {}
+
+    run('SETUP_ANNOTATIONS', [], local_dict=local_dict)
+    run('IMPORT_STAR', [math], local_dict=local_dict)
+    run('STORE_NAME', [1], argval='x', local_dict=local_dict)
+
+    assert local_dict['__annotations__'] == {}
+    assert local_dict['pi'] == math.pi
+    assert run('LOAD_NAME', [], argval='x', local_dict=local_dict) == [1]
+    assert run('LOAD_NAME', [], argval='g', local_dict=local_dict) == [1]
+    assert run(
+        'LOAD_NAME',
+        [],
+        argval='y',
+        local_dict=local_dict
+    ) == [query.ast.Identifier('y')]
+
+    run('DELETE_NAME', [], argval='x', local_dict=local_dict)
+
+    assert 'x' not in local_dict
+
+    cell = types.CellType(1)  # type: ignore[attr-defined]
+
+    assert run('LOAD_CLASSDEREF', [], 0, cells=(cell,)) == [1]
+
+
+@SQL_BYTECODE
+def test_query_sql_handler_coverage() -> None:
+    # pylint: disable=protected-access
+
+    opnames = {
+        'NOP', 'ROT_FOUR', 'GET_ITER', 'GET_YIELD_FROM_ITER', 'LIST_APPEND',
+        'SET_ADD', 'MAP_ADD', 'PRINT_EXPR', 'LOAD_BUILD_CLASS', 'BUILD_SLICE',
+        'SETUP_ANNOTATIONS', 'IMPORT_STAR', 'STORE_NAME', 'LOAD_NAME',
+        'DELETE_NAME', 'LOAD_CLASSDEREF',
+    }
+    codes = [function.__code__ for function, _, _ in SQL_CASES]
+
+    while codes:
+        code = codes.pop()
+        opnames.update(
+            instruction.opname
+            for instruction in dis.get_instructions(code)
+        )
+        codes.extend(
+            const
+            for const in code.co_consts
+            if isinstance(const, types.CodeType)
+        )
+
+    assert set(query.sql._HANDLERS) <= opnames
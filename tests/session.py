@@ -1,12 +1,19 @@
 import io
+import pathlib
+import subprocess
+import sys
+import time
 import typing
 
 # third-party
+import numpy
 import pandas  # type: ignore[import]
+import pytest
 import pytest_benchmark.fixture  # type: ignore[import]
 import typing_extensions
 
 import ck
+from ck import clickhouse
 from ck import iteration
 
 
@@ -15,6 +22,36 @@ METHODS: typing.List[
 ] = ['tcp', 'http', 'ssh']
 
 
+def test_session_import_time() -> None:
+    result = subprocess.run(
+        [
+            sys.executable,
+            '-X',
+            'importtime',
+            '-c',
+            'import ck',
+        ],
+        capture_output=True,
+        check=True
+    )
+
+    import_times = {
+        fields[2].strip(): int(fields[1])
+        for fields in (
+            line.decode().split('|')
+            for line in result.stderr.splitlines()
+        )
+        if fields[1].strip().isdigit()
+    }
+
+    # notice: these are imported on demand
+    for name in ['numpy', 'pandas', 'pyarrow', 'paramiko']:
+        assert name not in import_times
+
+    # notice: in microseconds
+    assert import_times['ck'] < 250000
+
+
 def test_session_passive() -> None:
     local_session = ck.LocalSession(
         tcp_port=9001,
@@ -125,6 +162,222 @@ def test_session_remote() -> None:
         )() == b'1\n'
 
 
+def test_session_ssh_reconnect() -> None:
+    local_session = ck.LocalSession(stop=True)
+
+    assert local_session.query('select 1', method='ssh') == b'1\n'
+
+    # pylint: disable=protected-access
+    ssh_client_1 = local_session._ssh_client
+
+    assert ssh_client_1 is not None
+
+    ssh_client_1.close()
+
+    assert local_session.query('select 1', method='ssh') == b'1\n'
+
+    # pylint: disable=protected-access
+    ssh_client_2 = local_session._ssh_client
+
+    assert ssh_client_2 is not None
+    assert ssh_client_2 is not ssh_client_1
+
+    joins = [
+        local_session.query_async('select 1', method='ssh')
+        for _ in range(8)
+    ]
+
+    for join in joins:
+        assert join() == b'1\n'
+
+    # pylint: disable=protected-access
+    assert local_session._ssh_client is ssh_client_2
+
+
+def test_session_ssh_tunnel() -> None:
+    local_session = ck.LocalSession(ssh_tunnel=True, stop=True)
+
+    for _ in range(4):
+        assert local_session.query('select 1', method='http') == b'1\n'
+
+    # pylint: disable=protected-access
+    assert local_session._ssh_client is not None
+
+
+def test_session_fleet() -> None:
+    fleet = ck.Fleet({
+        'test1': {
+            'tcp_port': 9001,
+            'http_port': 8124,
+            'data_dir': '/tmp/pyck_test_session_fleet_1',
+            'auto_start': False,
+        },
+        'test2': {
+            'tcp_port': 9002,
+            'http_port': 8125,
+            'data_dir': '/tmp/pyck_test_session_fleet_2',
+            'auto_start': False,
+        },
+        'test3': {
+            'ssh_port': 1,
+        },
+    })
+
+    fleet.stop(['test1', 'test2'])
+
+    start_results = fleet.start(['test1', 'test2'])
+    query_results = fleet.query('select 1', names=['test1', 'test2'])
+    restart_results = fleet.restart(['test1', 'test2'])
+    stop_results = fleet.stop()
+
+    for name in ['test1', 'test2']:
+        assert start_results[name][0] is not None
+        assert query_results[name] == (b'1\n', None)
+        assert restart_results[name][0] is not None
+        assert restart_results[name][0] != start_results[name][0]
+        assert stop_results[name] == (restart_results[name][0], None)
+
+    assert stop_results['test3'][0] is None
+    assert stop_results['test3'][1] is not None
+
+    fleet.close()
+
+
+def test_session_fleet_errors() -> None:
+    fleet = ck.Fleet({'test': {'ssh_port': 1}}, timeout=0.1)
+
+    get_pid_results = fleet.get_pid(['test', 'missing'])
+
+    assert isinstance(get_pid_results['test'][1], Exception)
+    assert isinstance(get_pid_results['missing'][1], KeyError)
+
+    # pylint: disable=protected-access
+    joins = fleet._submit(lambda name: time.sleep(1), ['slow'])
+
+    with pytest.raises(TimeoutError):
+        joins['slow']()
+
+    start_time = time.perf_counter()
+    fleet.close()
+
+    assert time.perf_counter() - start_time < 0.5
+
+
+def test_session_local_cluster() -> None:
+    cluster = ck.LocalCluster(
+        shards=2,
+        replicas=2,
+        tcp_port=9100,
+        http_port=8200,
+        data_dir='/tmp/pyck_test_session_local_cluster',
+        keeper=True,
+        auto_start=False,
+        stop=True,
+        start=True
+    )
+    session = cluster.session
+
+    session.query(
+        f'create table if not exists test_local_cluster '
+        f'on cluster {cluster.cluster_name} (x UInt64) '
+        f'engine=ReplicatedMergeTree('
+        f'\'/clickhouse/tables/{{shard}}/test_local_cluster\', '
+        f'\'{{replica}}\') '
+        f'order by x'
+    )
+    session.query(
+        f'create table if not exists test_local_cluster_all '
+        f'on cluster {cluster.cluster_name} as test_local_cluster '
+        f'engine=Distributed({cluster.cluster_name}, default, '
+        f'test_local_cluster, x)'
+    )
+    session.query(
+        'insert into test_local_cluster_all '
+        'select number from numbers(1000)',
+        settings={'insert_distributed_sync': '1'}
+    )
+
+    assert session.query(
+        'select count() from test_local_cluster_all'
+    ) == b'1000\n'
+    assert int(session.query(
+        'select count() from test_local_cluster'
+    )) < 1000
+
+    cluster.stop()
+    cluster.close()
+
+
+def test_session_local_pool() -> None:
+    session_pool = ck.LocalSessionPool(size=2, tmpfs=True)
+
+    session_1 = session_pool.acquire()
+    session_2 = session_pool.acquire()
+
+    assert session_1.query('select 1') == b'1\n'
+    assert session_2.query('select 2') == b'2\n'
+    assert session_1.get_pid() != session_2.get_pid()
+
+    session_pool.release(session_1)
+    session_pool.close()
+
+    assert session_2.get_pid() is None
+
+
+def test_session_snapshot() -> None:
+    local_session = ck.LocalSession(
+        tcp_port=9003,
+        http_port=8126,
+        data_dir='/tmp/pyck_test_session_snapshot',
+        stop=True
+    )
+
+    local_session.query('drop table if exists test_snapshot')
+    local_session.query(
+        'create table test_snapshot (x UInt64) engine=MergeTree order by x'
+    )
+    local_session.query(
+        'insert into test_snapshot select number from numbers(1000)'
+    )
+    local_session.snapshot('test')
+    local_session.query('truncate table test_snapshot')
+
+    assert local_session.query(
+        'select count() from test_snapshot'
+    ) == b'0\n'
+
+    local_session.restore('test')
+
+    assert local_session.query(
+        'select count() from test_snapshot'
+    ) == b'1000\n'
+
+    local_session.stop()
+
+
+def test_session_snapshot_dirs() -> None:
+    local_session = ck.LocalSession(
+        data_dir='/tmp/pyck_test_session_snapshot',
+        storage={'cold': ['/tmp/pyck_test_session_snapshot_cold']}
+    )
+
+    for name in ['', '..', '../x', 'x/y']:
+        with pytest.raises(ValueError):
+            local_session.snapshot(name)
+
+        with pytest.raises(ValueError):
+            local_session.restore(name)
+
+    # pylint: disable=protected-access
+    assert [
+        str(snapshot_path)
+        for _, snapshot_path in local_session._snapshot_dirs('test')
+    ] == [
+        '/tmp/pyck_test_session_snapshot_snapshots/test',
+        '/tmp/pyck_test_session_snapshot_snapshots_storage/test/cold_0',
+    ]
+
+
 def test_session_settings() -> None:
     # TODO: default_settings?
     local_session = ck.LocalSession(stop=True)
@@ -218,6 +471,96 @@ def test_session_gen_file() -> None:
     local_session.query('drop table pyck_test')
 
 
+def test_session_user_files_ingest() -> None:
+    local_session = ck.LocalSession(
+        tcp_port=9004,
+        http_port=8127,
+        data_dir='/tmp/pyck_test_session_user_files',
+        stop=True
+    )
+
+    local_session.query('drop table if exists pyck_test')
+    local_session.query('create table pyck_test (x UInt64) engine = Memory')
+
+    open('/tmp/pyck_test_session_3', 'wb').write(
+        b''.join(b'%d\n' % number for number in range(1000))
+    )
+
+    for method in METHODS:
+        local_session.query_file(
+            'insert into pyck_test format TSV',
+            path_in='/tmp/pyck_test_session_3',
+            method=method
+        )
+
+    assert local_session.query(
+        'select count(), sum(x) from pyck_test'
+    ) == f'{1000 * len(METHODS)}\t{499500 * len(METHODS)}\n'.encode()
+    assert not list(
+        pathlib.Path('/tmp/pyck_test_session_user_files/user_files').iterdir()
+    )
+
+    # notice: the columns of the file are ordered differently
+
+    local_session.query('drop table pyck_test')
+    local_session.query(
+        'create table pyck_test (x UInt64, y String) engine = Memory'
+    )
+
+    open('/tmp/pyck_test_session_3', 'wb').write(b'{"y": "a", "x": 1}\n')
+
+    for method in METHODS:
+        local_session.query_file(
+            'insert into pyck_test format JSONEachRow',
+            path_in='/tmp/pyck_test_session_3',
+            method=method
+        )
+
+    # notice: column lists are not rewritten, but streamed
+
+    open('/tmp/pyck_test_session_3', 'wb').write(b'2\n')
+
+    local_session.query_file(
+        'insert into pyck_test (x) format TSV',
+        path_in='/tmp/pyck_test_session_3'
+    )
+
+    assert local_session.query(
+        'select x, y from pyck_test order by x format TSV'
+    ) == b'1\ta\n' * len(METHODS) + b'2\t\n'
+
+    local_session.query('drop table pyck_test')
+    local_session.stop()
+
+
+def test_session_query_arrow() -> None:
+    local_session = ck.LocalSession(stop=True)
+
+    table = local_session.query_arrow(
+        'select number as x, toString(number) as y from numbers(1000000)'
+    )
+
+    assert table.num_rows == 1000000
+    assert table.column('x').to_pylist()[-1] == 999999
+    assert not [
+        path
+        for path in pathlib.Path(
+            clickhouse.default_data_dir()
+        ).joinpath('user_files').iterdir()
+        if path.name.startswith('ck_export_')
+    ]
+
+    # notice: an empty result keeps its columns, and runs only once
+
+    empty_query = 'select number as x from numbers(10) where x > 100'
+    empty_table = local_session.query_arrow(empty_query)
+
+    assert empty_table.num_rows == 0
+    assert empty_table.column_names == ['x']
+    assert str(empty_table.schema.field('x').type) == 'uint64'
+    assert ck.query.fingerprint(empty_query) not in local_session.query_stats()
+
+
 def test_session_gen_pandas() -> None:
     local_session = ck.LocalSession(stop=True)
 
@@ -238,6 +581,281 @@ def test_session_gen_pandas() -> None:
     local_session.query('drop table pyck_test')
 
 
+def test_session_gen_binary() -> None:
+    local_session = ck.LocalSession(stop=True)
+
+    local_session.query('drop table if exists pyck_test')
+    local_session.query(
+        'create table pyck_test (x Int64, y String) engine = Memory'
+    )
+
+    local_session.query_binary(
+        'insert into pyck_test',
+        ((index, str(index)) for index in range(1000000)),
+        {'x': 'Int64', 'y': 'String'}
+    )
+    local_session.query_binary(
+        'insert into pyck_test',
+        {'x': numpy.arange(1000000), 'y': ['a'] * 1000000},
+        {'x': 'Int64', 'y': 'String'},
+        binary_format='Native'
+    )
+
+    assert local_session.query(
+        'select count(), sum(x) from pyck_test format TSV'
+    ) == b'2000000\t999999000000\n'
+
+    local_session.query('drop table pyck_test')
+
+
+def test_session_gen_values() -> None:
+    local_session = ck.LocalSession(stop=True)
+
+    local_session.query('drop table if exists pyck_test')
+    local_session.query(
+        'create table pyck_test (x Int64, y String) engine = Memory'
+    )
+
+    local_session.query_values(
+        'insert into pyck_test',
+        {'x': numpy.arange(1000000), 'y': ['a'] * 1000000}
+    )
+
+    assert local_session.query(
+        'select count(), sum(x) from pyck_test format TSV'
+    ) == b'1000000\t499999500000\n'
+
+    local_session.query('drop table pyck_test')
+
+
+def test_session_query_cache() -> None:
+    query_cache = ck.QueryCache(max_bytes=4, ttl=60)
+
+    query_cache.put('a', b'12')
+    query_cache.put('b', b'34')
+
+    assert query_cache.get('a') == b'12'
+
+    query_cache.put('c', b'56')
+
+    assert query_cache.get('a') == b'12'
+    assert query_cache.get('b') is None
+    assert query_cache.get('c') == b'56'
+    assert query_cache.metrics()['hits'] == 3
+    assert query_cache.metrics()['misses'] == 1
+    assert query_cache.metrics()['evictions'] == 1
+
+    query_cache = ck.QueryCache(disk_dir='/tmp/pyck_test_session_cache')
+    query_cache.clear()
+    query_cache.put('a', b'12')
+    query_cache = ck.QueryCache(disk_dir='/tmp/pyck_test_session_cache')
+
+    assert query_cache.get('a') == b'12'
+    assert query_cache.metrics()['disk_hits'] == 1
+
+    query_cache = ck.QueryCache(
+        max_bytes=1,
+        disk_dir='/tmp/pyck_test_session_cache',
+        disk_max_bytes=4
+    )
+    query_cache.clear()
+    query_cache.put('a', b'12')
+    query_cache.put('b', b'34')
+
+    assert query_cache.get('a') == b'12'
+
+    query_cache.put('c', b'56')
+
+    assert query_cache.get('a') == b'12'
+    assert query_cache.get('b') is None
+
+    assert ck.session.cache.make_key(
+        'select 1', {}, 'tcp', 'localhost', 9000, 'default', '', []
+    ) != ck.session.cache.make_key(
+        'select 1', {}, 'tcp', 'localhost', 9001, 'default', '', []
+    )
+    assert ck.session.cache.make_key(
+        'select 1', {}, 'tcp', 'localhost', 9000, 'default', '', [b'1']
+    ) != ck.session.cache.make_key(
+        'select 1', {}, 'tcp', 'localhost', 9000, 'default', '', [b'2']
+    )
+    assert ck.session.cache.make_key(
+        'select  \'a\'', {}, 'tcp', 'localhost', 9000, 'default', '', []
+    ) == ck.session.cache.make_key(
+        'select \'a\'\n', {}, 'tcp', 'localhost', 9000, 'default', '', []
+    )
+    assert ck.session.cache.make_key(
+        'select \'a\'', {}, 'tcp', 'localhost', 9000, 'default', '', []
+    ) != ck.session.cache.make_key(
+        'select \'a \'', {}, 'tcp', 'localhost', 9000, 'default', '', []
+    )
+    assert ck.session.cache.make_key(
+        'select 1 -- c\n, 2', {}, 'tcp', 'localhost', 9000, 'default', '', []
+    ) != ck.session.cache.make_key(
+        'select 1 -- c , 2', {}, 'tcp', 'localhost', 9000, 'default', '', []
+    )
+
+    query_cache = ck.QueryCache()
+    local_session = ck.LocalSession(
+        query_cache=query_cache,
+        stop=True
+    )
+
+    for method in METHODS:
+        assert local_session.query('select 1', method=method) == b'1\n'
+        assert local_session.query('select  1', method=method) == b'1\n'
+
+    dataframe_1 = local_session.query_pandas('select 1 as x')
+    dataframe_2 = local_session.query_pandas('select 1 as x')
+
+    assert dataframe_1 is not None
+    assert dataframe_2 is not None
+    assert dataframe_2.x.to_list() == dataframe_1.x.to_list()
+    assert query_cache.metrics()['hits'] == len(METHODS) + 1
+
+
+def test_session_single_flight() -> None:
+    local_session = ck.LocalSession(single_flight=True, stop=True)
+
+    query_text = 'select sleep(1), 1'
+
+    for method in METHODS:
+        joins = [
+            local_session.query_async(query_text, method=method)
+            for _ in range(8)
+        ]
+
+        # pylint: disable=protected-access
+        assert len(local_session._flights) == 1
+
+        for join in joins:
+            assert join() == b'0\t1\n'
+
+        # pylint: disable=protected-access
+        assert not local_session._flights
+
+    # notice: a follower may join before the query owner
+    join_1 = local_session.query_async(query_text)
+    join_2 = local_session.query_async(query_text)
+
+    assert join_2() == b'0\t1\n'
+    assert join_1() == b'0\t1\n'
+
+    # notice: inputs are part of the key, so these are not merged
+    input_text = 'select x from input(\'x UInt8\') format TSV'
+    join_1 = local_session.query_async(input_text, b'1\n')
+    join_2 = local_session.query_async(input_text, b'2\n')
+
+    assert join_1() == b'1\n'
+    assert join_2() == b'2\n'
+
+
+# notice: the template interpreter runs python 3.8 bytecode
+@pytest.mark.skipif(
+    sys.version_info[:2] != (3, 8),
+    reason='sql templates are compiled from python 3.8 bytecode'
+)
+def test_session_parameters() -> None:
+    local_session = ck.LocalSession(stop=True)
+
+    query_text, parameters = ck.sql_render_parameters(
+        lambda x, y: (  # type: ignore[arg-type]
+            select(x + 1, y)  # type: ignore[name-defined]  # noqa: F821
+        ),
+        1,
+        'test'
+    )
+
+    for method in METHODS:
+        assert local_session.query(
+            query_text,
+            method=method,
+            settings=parameters
+        ) == b'2\ttest\n'
+
+
+def test_session_external() -> None:
+    local_session = ck.LocalSession(stop=True)
+
+    for method in METHODS:
+        external_table = ck.ExternalTable(
+            'pyck_test',
+            {'x': 'Int64'},
+            iteration.given_in([b'1\n2\n3\n'])
+        )
+
+        assert local_session.query(
+            'select count(), sum(x) from pyck_test',
+            method=method,
+            external=[external_table]
+        ) == b'3\t6\n'
+
+
+def test_session_external_invalid() -> None:
+    passive_session = ck.PassiveSession()
+
+    def external_table() -> ck.ExternalTable:
+        return ck.ExternalTable(
+            'pyck_test',
+            {'x': 'Int64'},
+            iteration.given_in([b'1\n'])
+        )
+
+    for method in typing.cast(
+            typing.List[typing_extensions.Literal['http', 'ssh']],
+            ['http', 'ssh']
+    ):
+        with pytest.raises(ValueError, match='input data'):
+            passive_session.query(
+                'select * from pyck_test',
+                data=b'1\n',
+                method=method,
+                external=[external_table()]
+            )
+
+    with pytest.raises(ValueError, match='one external table'):
+        passive_session.query(
+            'select * from pyck_test',
+            method='ssh',
+            external=[external_table(), external_table()]
+        )
+
+
+def test_session_query_stats() -> None:
+    local_session = ck.LocalSession(stop=True)
+
+    for method in METHODS:
+        local_session.query('select 1 as x', method=method)
+        local_session.query('SELECT 2 AS x', method=method)
+
+    query_stat = local_session.query_stats()[
+        ck.query.fingerprint('select 1 as x')
+    ]
+
+    assert query_stat['pattern'] == 'select ? as x'
+    assert query_stat['count'] == 2 * len(METHODS)
+    assert query_stat['errors'] == 0
+
+
+def test_session_start_stats() -> None:
+    local_session = ck.LocalSession(stop=True)
+
+    assert local_session.start_stats()['count'] == 0
+    assert local_session.start_stats()['last_seconds'] is None
+
+    local_session.query('select 1')
+
+    assert local_session.start_stats()['count'] == 1
+
+    local_session.stop()
+    local_session.start()
+
+    start_stat = local_session.start_stats()
+
+    assert start_stat['count'] == 2
+    assert 0 < start_stat['last_seconds'] <= start_stat['seconds']
+
+
 def test_session_method_tcp_benchmark(
         benchmark: pytest_benchmark.fixture.BenchmarkFixture
 ) -> None:
@@ -266,10 +884,17 @@ def test_session_method_http_benchmark(
     benchmark(run)
 
 
+@pytest.mark.parametrize('ssh_compression', [None, 'transport', 'zstd'])
 def test_session_method_ssh_benchmark(
-        benchmark: pytest_benchmark.fixture.BenchmarkFixture
+        benchmark: pytest_benchmark.fixture.BenchmarkFixture,
+        ssh_compression: typing.Optional[
+            typing_extensions.Literal['transport', 'zstd']
+        ]
 ) -> None:
-    local_session = ck.LocalSession(stop=True)
+    local_session = ck.LocalSession(
+        ssh_compression=ssh_compression,
+        stop=True
+    )
 
     def run() -> None:
         local_session.query(